@@ -0,0 +1,93 @@
+"""/analyze one-by-one vs one /analyzeBatch request, over real HTTP on localhost.
+
+Run from software/backend:  python -m bench.bench_batch
+The result cache is cleared before every request so repeats are recomputed.
+Localhost hides network round trips, so the table also projects wall time
+with a WIFI_RTT_MS round trip per HTTP request (what the kiosk clients see)."""
+import contextlib
+import io
+import logging
+import http.client
+import os
+import sys
+import threading
+import time
+import uuid
+
+import cv2
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from werkzeug.serving import make_server
+
+import main
+
+PHOTO_DIR = os.path.join(BACKEND_DIR, 'data', 'test-photos')
+PHOTOS = ['test1.png', 'test3.png', 'test4.png']
+WIFI_RTT_MS = 40.0
+
+
+def _jpeg(name):
+    img = cv2.imread(os.path.join(PHOTO_DIR, name))
+    return cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+
+def _multipart(field, blobs):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for i, blob in enumerate(blobs):
+        parts.append((f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; '
+                      f'filename="img{i}.jpg"\r\nContent-Type: image/jpeg\r\n\r\n').encode())
+        parts.append(blob)
+        parts.append(b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def _post(port, path, field, blobs):
+    body, content_type = _multipart(field, blobs)
+    main.ANALYSIS_CACHE.clear()
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    conn.request('POST', path, body=body, headers={'Content-Type': content_type})
+    resp = conn.getresponse()
+    resp.read()
+    conn.close()
+    assert resp.status == 200, resp.status
+
+
+def main_bench():
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, main.app, threaded=True)
+    port = server.server_port
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    blobs = [_jpeg(name) for name in PHOTOS]
+    with contextlib.redirect_stdout(io.StringIO()):
+        _post(port, '/analyze', 'image', blobs[:1])  # first-request costs out of the way
+
+    rows = []
+    with contextlib.redirect_stdout(io.StringIO()):  # the pipeline is chatty
+        for n in (1, 5, 10, 20):
+            images = [blobs[i % len(blobs)] for i in range(n)]
+            t0 = time.perf_counter()
+            for blob in images:
+                _post(port, '/analyze', 'image', [blob])
+            single = (time.perf_counter() - t0) * 1000.0
+            t0 = time.perf_counter()
+            _post(port, '/analyzeBatch', 'images', images)
+            batch = (time.perf_counter() - t0) * 1000.0
+            rows.append((n, single, batch))
+
+    print(f"{'images':>6}{'single ms':>11}{'batch ms':>10}"
+          f"{'single+RTT':>12}{'batch+RTT':>11}{'saved/img':>11}")
+    for n, single, batch in rows:
+        single_rtt = single + n * WIFI_RTT_MS
+        batch_rtt = batch + WIFI_RTT_MS
+        print(f"{n:>6}{single:>11.1f}{batch:>10.1f}{single_rtt:>12.1f}{batch_rtt:>11.1f}"
+              f"{(single_rtt - batch_rtt) / n:>11.1f}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,111 @@
+"""Chart localization: Otsu + largest contour vs keypoint matching.
+
+Run from software/backend:  python -m bench.bench_chart_locator
+Reports per-photo latency at the analysis resolution and whether the chart
+was found (IoU of the located quad's bounding box with a hand-marked box >= 0.5),
+plus the cold / cached cost of the reference features."""
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from src import chart_locator, image_io
+from src import face_ref_scan_static as frs
+from src.frame_context import FrameContext
+
+PHOTO_DIR = os.path.join(BACKEND_DIR, 'data', 'test-photos')
+REPEATS = 3
+
+# Chart (patch grid plus dark frame) bounding boxes, marked by hand in
+# source-image pixels: x1, y1, x2, y2
+CHART_BOXES = {
+    "test1.png": (410, 1066, 1200, 1589),
+    "test2.png": (267, 860, 817, 1200),
+    "test3.png": (310, 793, 800, 1100),
+    "test4.png": (417, 777, 840, 1050),
+}
+
+
+def box_iou(a, b):
+    ix = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    return inter / float((a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter)
+
+
+def contour_quad(img):
+    ctx = FrameContext(img)
+    _, sheet = frs.detect_sheet(img, ctx=ctx)
+    if sheet is None:
+        return None
+    x, y, w, h = cv2.boundingRect(sheet)
+    sheet_ctx = ctx.crop(x, y, w, h)
+    return frs.locate_chart(sheet_ctx.img, ctx=sheet_ctx) + (x, y)
+
+
+def auto_quad(img):
+    # same policy as analyze_frame with CHART_LOCATOR=auto: a contour that does
+    # not look like a chart is dropped, whether or not matching then finds one
+    quad = contour_quad(img)
+    stats = None if quad is None else frs.macbeth_patch_stats(
+        frs.rectify_chart(img, quad), outer_margin=0.08, inner_margin=0.05)
+    if chart_locator.looks_like_chart(quad, stats, img.shape):
+        return quad
+    return chart_locator.locate_chart_features(img)
+
+
+def run(locate, img, scale, truth):
+    best, quad = float('inf'), None
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            quad = locate(img)
+        best = min(best, time.perf_counter() - t0)
+    if quad is None:
+        return best * 1000.0, 0.0
+    q = np.asarray(quad) / scale
+    return best * 1000.0, box_iou((q[:, 0].min(), q[:, 1].min(), q[:, 0].max(), q[:, 1].max()), truth)
+
+
+def main():
+    cache_dir = tempfile.mkdtemp()
+    try:
+        t0 = time.perf_counter()
+        chart_locator._features.clear()
+        chart_locator.reference_features(cache_dir=cache_dir)
+        cold = (time.perf_counter() - t0) * 1000.0
+        chart_locator._features.clear()
+        t0 = time.perf_counter()
+        chart_locator.reference_features(cache_dir=cache_dir)
+        cached = (time.perf_counter() - t0) * 1000.0
+    finally:
+        shutil.rmtree(cache_dir)
+    print(f"reference features: {cold:.1f} ms computed, {cached:.1f} ms from disk cache\n")
+
+    methods = (("contour", contour_quad), ("features", chart_locator.locate_chart_features),
+               ("auto", auto_quad))
+    found = {name: 0 for name, _ in methods}
+    header = "".join(f"{name + ' ms':>14}{'IoU':>6}" for name, _ in methods)
+    print(f"{'image':<11}{header}")
+    for name in sorted(CHART_BOXES):
+        img, scale, _ = image_io.load_image_for_analysis(os.path.join(PHOTO_DIR, name))
+        row = f"{name:<11}"
+        for method, locate in methods:
+            ms, iou = run(locate, img, scale, CHART_BOXES[name])
+            found[method] += iou >= 0.5
+            row += f"{ms:>14.1f}{iou:>6.2f}"
+        print(row)
+    print("found:     " + "".join(f"{found[m]:>14}/{len(CHART_BOXES):<5}" for m, _ in methods))
+
+
+if __name__ == "__main__":
+    main()
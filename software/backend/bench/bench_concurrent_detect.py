@@ -0,0 +1,74 @@
+"""End-to-end analyze_image latency, face / chart detection one after the other
+vs side by side, on 1, 2 and 4 cores.
+
+Run from software/backend:  python -m bench.bench_concurrent_detect
+Each configuration runs in its own process pinned to the first N CPUs, with
+OpenCV limited to N threads. Configurations needing more CPUs than this
+machine has are skipped."""
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+PHOTO_DIR = os.path.join(BACKEND_DIR, 'data', 'test-photos')
+# test2 is rejected by the quality gate (underexposed), like in the pool bench
+PHOTOS = ['test1.png', 'test3.png', 'test4.png']
+REPEATS = 5
+CORES = (1, 2, 4)
+
+
+def worker(cores):
+    """Runs inside the pinned child process; prints {photo: best ms} as JSON."""
+    import cv2
+    from src import face_detector
+    from src import face_ref_scan_static as frs
+
+    cv2.setNumThreads(cores)
+    face_detector.warmup()
+    results = {}
+    for name in PHOTOS:
+        with open(os.path.join(PHOTO_DIR, name), 'rb') as f:
+            data = f.read()
+        best = float('inf')
+        for _ in range(REPEATS):
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                frs.analyze_image(data)
+            best = min(best, time.perf_counter() - t0)
+        results[name] = best * 1000.0
+    print(json.dumps(results))
+
+
+def run(cores, detect_threads):
+    env = dict(os.environ, DETECT_THREADS=str(detect_threads))
+    cpus = sorted(os.sched_getaffinity(0))[:cores]
+    out = subprocess.run(
+        [sys.executable, "-c",
+         "import os, sys; os.sched_setaffinity(0, %r); sys.path.insert(0, %r);"
+         "from bench.bench_concurrent_detect import worker; worker(%d)" % (cpus, BACKEND_DIR, cores)],
+        env=env, cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    available = len(os.sched_getaffinity(0))
+    print(f"CPUs available: {available}\n")
+    print(f"{'cores':<7}{'image':<11}{'serial ms':>11}{'parallel ms':>13}{'speedup':>9}")
+    for cores in CORES:
+        if cores > available:
+            print(f"{cores:<7}skipped (only {available} CPU{'s' if available > 1 else ''})")
+            continue
+        serial, parallel = run(cores, 1), run(cores, 2)
+        for name in serial:
+            print(f"{cores:<7}{name:<11}{serial[name]:>11.1f}{parallel[name]:>13.1f}"
+                  f"{serial[name] / parallel[name]:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Decode time and peak RSS: full-resolution decode vs analysis-resolution decode.
+
+Run from software/backend:  python -m bench.bench_decode
+Uses data/test-photos as-is (PNG) plus 12 MP and 48 MP JPEG re-encodes of test1."""
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from src import image_io
+
+PHOTO_DIR = os.path.join(BACKEND_DIR, 'data', 'test-photos')
+REPEATS = 5
+
+
+def _decode_full(data):
+    return image_io.load_image(data)
+
+
+def _decode_analysis(data):
+    return image_io.load_image_for_analysis(data)[0]
+
+
+MODES = {"full": _decode_full, "analysis": _decode_analysis}
+
+
+def _status_kib(field):
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1])
+    return 0
+
+
+def _reset_peak_rss():
+    # writing 5 to clear_refs resets VmHWM (Linux >= 4.0)
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+
+
+def _run(path, mode, queue):
+    with open(path, 'rb') as f:
+        data = f.read()
+    decode = MODES[mode]
+    decode(data)  # first call pays for codec init, keep it out of the numbers
+
+    times, peaks = [], []
+    for _ in range(REPEATS):
+        _reset_peak_rss()
+        rss_before = _status_kib('VmRSS')
+        t0 = time.perf_counter()
+        img = decode(data)
+        times.append(time.perf_counter() - t0)
+        peaks.append(_status_kib('VmHWM') - rss_before)
+        del img
+    queue.put((min(times) * 1000.0, max(peaks) / 1024.0))
+
+
+def measure(path, mode):
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run, args=(path, mode, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def _synthetic_jpegs(tmp_dir):
+    src = cv2.imread(os.path.join(PHOTO_DIR, 'test1.png'))
+    paths = []
+    for name, size in (("12mp.jpg", (3000, 4000)), ("48mp.jpg", (6000, 8000))):
+        big = cv2.resize(src, size, interpolation=cv2.INTER_CUBIC)
+        path = os.path.join(tmp_dir, name)
+        cv2.imwrite(path, big, [cv2.IMWRITE_JPEG_QUALITY, 92])
+        paths.append(path)
+    return paths
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = sorted(os.path.join(PHOTO_DIR, p) for p in os.listdir(PHOTO_DIR))
+        paths += _synthetic_jpegs(tmp_dir)
+
+        print("peak MiB = peak RSS growth during one decode")
+        print(f"{'image':<12}{'full ms':>10}{'full MiB':>10}{'anal. ms':>10}{'anal. MiB':>11}")
+        for path in paths:
+            full_ms, full_mb = measure(path, "full")
+            an_ms, an_mb = measure(path, "analysis")
+            print(f"{os.path.basename(path):<12}{full_ms:>10.1f}{full_mb:>10.1f}{an_ms:>10.1f}{an_mb:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Color difference: a direct CIEDE2000 transcription vs color.delta_e2000.
+
+Run from software/backend:  python -m bench.bench_delta_e
+One target against N candidates, and N independent pairs; then the
+lab_to_mix grid search (every 5% mix of the five bases)."""
+import os
+import sys
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from src import color, lab_to_mix
+from bench.bench_robust_stats import best_ms
+
+
+def direct_delta_e2000(lab1, lab2):
+    # the formula as printed: hypot, ** 7, hue angles in degrees, four cosines
+    L1, a1, b1 = np.moveaxis(np.asarray(lab1, dtype=np.float64), -1, 0)
+    L2, a2, b2 = np.moveaxis(np.asarray(lab2, dtype=np.float64), -1, 0)
+    C = (np.hypot(a1, b1) + np.hypot(a2, b2)) / 2
+    G = 0.5 * (1 - np.sqrt(C ** 7 / (C ** 7 + 25.0 ** 7)))
+    a1p, a2p = (1 + G) * a1, (1 + G) * a2
+    C1p, C2p = np.hypot(a1p, b1), np.hypot(a2p, b2)
+    h1p = np.degrees(np.arctan2(b1, a1p)) % 360
+    h2p = np.degrees(np.arctan2(b2, a2p)) % 360
+    chromatic = C1p * C2p != 0
+    dhp = h2p - h1p
+    dhp = np.where(dhp > 180, dhp - 360, np.where(dhp < -180, dhp + 360, dhp))
+    dhp = np.where(chromatic, dhp, 0)
+    dHp = 2 * np.sqrt(C1p * C2p) * np.sin(np.radians(dhp / 2))
+    hsum = h1p + h2p
+    hp = np.where(np.abs(h1p - h2p) <= 180, hsum / 2, np.where(hsum < 360, (hsum + 360) / 2, (hsum - 360) / 2))
+    hp = np.where(chromatic, hp, hsum)
+    T = (1 - 0.17 * np.cos(np.radians(hp - 30)) + 0.24 * np.cos(np.radians(2 * hp))
+         + 0.32 * np.cos(np.radians(3 * hp + 6)) - 0.20 * np.cos(np.radians(4 * hp - 63)))
+    Lp = (L1 + L2) / 2
+    Cp = (C1p + C2p) / 2
+    SL = 1 + 0.015 * (Lp - 50) ** 2 / np.sqrt(20 + (Lp - 50) ** 2)
+    SC = 1 + 0.045 * Cp
+    SH = 1 + 0.015 * Cp * T
+    RT = -2 * np.sqrt(Cp ** 7 / (Cp ** 7 + 25.0 ** 7)) * np.sin(np.radians(60 * np.exp(-((hp - 275) / 25) ** 2)))
+    dL, dC, dH = (L2 - L1) / SL, (C2p - C1p) / SC, dHp / SH
+    return np.sqrt(dL ** 2 + dC ** 2 + dH ** 2 + RT * dC * dH)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    target = np.array([62.0, 12.0, 22.0])
+    print(f"{'':>22}{'direct':>10}{'float64':>10}{'float32':>10}{'dE76':>8}{'dE94':>8}  ms")
+    for n in (10 ** 4, 10 ** 5, 10 ** 6):
+        grid = rng.uniform((0, -80, -80), (100, 80, 80), (n, 3))
+        others = rng.uniform((0, -80, -80), (100, 80, 80), (n, 3))
+        assert np.allclose(direct_delta_e2000(target, grid), color.delta_e2000(target, grid))
+        for label, lab1 in (("1 x %d" % n, target), ("%d pairs" % n, others)):
+            times = (best_ms(lambda: direct_delta_e2000(lab1, grid)),
+                     best_ms(lambda: color.delta_e2000(lab1, grid)),
+                     best_ms(lambda: color.delta_e2000(lab1, grid, dtype=np.float32)),
+                     best_ms(lambda: color.delta_e76(lab1, grid)),
+                     best_ms(lambda: color.delta_e94(lab1, grid)))
+            print(f"{label:>22}" + "".join(f"{t:>10.1f}" for t in times[:3]) + "".join(f"{t:>8.1f}" for t in times[3:]))
+
+    print()
+    for steps in (20, 40):
+        lab_to_mix.simplex_grid(5, steps)
+        ms = best_ms(lambda: lab_to_mix.grid_proportion_calculation(target, steps))
+        prop, de = lab_to_mix.grid_proportion_calculation(target, steps)
+        print(f"grid 1/{steps}: {len(lab_to_mix.simplex_grid(5, steps)):>7} mixes  {ms:7.1f} ms  dE00 {de:.2f}  {prop}")
+    solved = lab_to_mix.proportion_calculation(target)
+    print(f"proportion_calculation:                   dE00 {lab_to_mix.mix_delta_e(target, solved):.2f}  {solved.round(3)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Face detection: exhaustive full-frame search vs coarse-to-fine pyramid.
+
+Run from software/backend:  python -m bench.bench_face_detect
+Reports per-photo latency for both modes and the IoU of the two boxes,
+at full resolution and at the analysis resolution."""
+import os
+import sys
+import time
+
+import cv2
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from src import face_detector, image_io
+from src.face_detector import iou
+
+PHOTO_DIR = os.path.join(BACKEND_DIR, 'data', 'test-photos')
+REPEATS = 5
+
+
+def timed(gray, mode):
+    best, box = float('inf'), None
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        box = face_detector.locate_face(gray, mode=mode)
+        best = min(best, time.perf_counter() - t0)
+    return box, best * 1000.0
+
+
+def main():
+    face_detector.warmup()
+    print(f"{'image':<11}{'res':>6}{'exh. ms':>9}{'pyr. ms':>9}{'IoU':>7}  boxes (exhaustive / pyramid)")
+    for name in sorted(os.listdir(PHOTO_DIR)):
+        path = os.path.join(PHOTO_DIR, name)
+        for long_edge in (None, image_io.ANALYSIS_LONG_EDGE):
+            img, _, _ = image_io.load_image_for_analysis(path, long_edge)
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            exh_box, exh_ms = timed(gray, "exhaustive")
+            pyr_box, pyr_ms = timed(gray, "pyramid")
+            res = max(gray.shape)
+            print(f"{name:<11}{res:>6}{exh_ms:>9.1f}{pyr_ms:>9.1f}{iou(exh_box, pyr_box):>7.2f}  "
+                  f"{exh_box} / {pyr_box}")
+
+
+if __name__ == "__main__":
+    main()
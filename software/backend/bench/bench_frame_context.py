@@ -0,0 +1,67 @@
+"""Per-stage preprocessing: every stage on its own vs one shared FrameContext.
+
+Run from software/backend:  python -m bench.bench_frame_context
+"separate" calls define_face / detect_sheet / crop_to_chart_only without a
+context, so each stage redoes grayscale → blur → Otsu → morphology, which is
+what the static pipeline did before. "shared" passes one context to all of them."""
+import contextlib
+import io
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from src import face_detector, image_io
+from src import face_ref_scan_static as frs
+from src.frame_context import FrameContext
+
+PHOTO_DIR = os.path.join(BACKEND_DIR, 'data', 'test-photos')
+REPEATS = 7
+STAGES = ("face", "sheet", "chart")
+
+
+def run_stages(img, shared):
+    ctx = FrameContext(img) if shared else None
+    times = {}
+    for stage, fn in (("face", frs.define_face), ("sheet", frs.detect_sheet),
+                      ("chart", frs.crop_to_chart_only)):
+        t0 = time.perf_counter()
+        fn(img, ctx=ctx)
+        times[stage] = (time.perf_counter() - t0) * 1000.0
+    return times
+
+
+def best_of(img, shared):
+    best = {s: float('inf') for s in STAGES}
+    for _ in range(REPEATS):
+        with contextlib.redirect_stdout(io.StringIO()):
+            times = run_stages(img, shared)
+        for s in STAGES:
+            best[s] = min(best[s], times[s])
+    return best
+
+
+def main():
+    face_detector.warmup()
+    header = "".join(f"{s + ' ms':>10}" for s in STAGES)
+    print(f"{'image':<11}{'path':<10}{header}{'total':>10}")
+    for name in sorted(os.listdir(PHOTO_DIR)):
+        img, _, _ = image_io.load_image_for_analysis(os.path.join(PHOTO_DIR, name))
+        for label, shared in (("separate", False), ("shared", True)):
+            best = best_of(img, shared)
+            cols = "".join(f"{best[s]:>10.2f}" for s in STAGES)
+            print(f"{name:<11}{label:<10}{cols}{sum(best.values()):>10.2f}")
+
+    # breakdown of one shared run through the whole pipeline
+    img, _, _ = image_io.load_image_for_analysis(os.path.join(PHOTO_DIR, sorted(os.listdir(PHOTO_DIR))[0]))
+    ctx = FrameContext(img)
+    with contextlib.redirect_stdout(io.StringIO()):
+        frs.analyze_frame(img, ctx=ctx)
+    print("\nanalyze_frame timings (ms):",
+          ", ".join(f"{k}={v:.2f}" for k, v in ctx.timings.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""sRGB linearization of skin pixels: float pow path vs the uint8 lookup table.
+
+Run from software/backend:  python -m bench.bench_gamma_lut
+Pixel counts are those of dense skin sampling (the four SKIN_REGIONS cover
+~31% of the face box) for square face boxes of the given side at analysis
+resolution."""
+import os
+import sys
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from src import rgb_to_lab as rtl
+from src.color_algorithm import skin_pixels_to_lab
+from src.face_ref_scan_static import skin_region_boxes
+
+FACE_SIDES = (96, 192, 384, 768, 1536)
+
+
+def best_ms(fn, budget_s=0.5):
+    best, spent, runs = float('inf'), 0.0, 0
+    while runs < 3 or (spent < budget_s and runs < 200):
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        best, spent, runs = min(best, dt), spent + dt, runs + 1
+    return best * 1000.0
+
+
+def skin_pixel_count(side):
+    x1, y1, x2, y2 = skin_region_boxes((side, side)).T
+    return int(((x2 - x1) * (y2 - y1)).sum())
+
+
+def main():
+    rng = np.random.default_rng(0)
+    reference = rng.uniform(30, 220, (24, 3))
+    print(f"{'face px':>8}{'pixels':>10}{'linearize float':>17}{'lut':>8}{'speedup':>9}"
+          f"{'to Lab float':>14}{'lut':>8}{'speedup':>9}   (ms)")
+    for side in FACE_SIDES:
+        n = skin_pixel_count(side)
+        skin = rng.integers(0, 256, (n, 3)).astype(np.uint8)
+        lin_f = best_ms(lambda: rtl.gamma_to_linear(skin.astype(np.float64)))
+        lin_u = best_ms(lambda: rtl.gamma_to_linear(skin))
+        lab_f = best_ms(lambda: skin_pixels_to_lab(skin.astype(np.float64), reference))
+        lab_u = best_ms(lambda: skin_pixels_to_lab(skin, reference))
+        print(f"{side:>8}{n:>10}{lin_f:>17.3f}{lin_u:>8.3f}{lin_f / lin_u:>9.1f}"
+              f"{lab_f:>14.3f}{lab_u:>8.3f}{lab_f / lab_u:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""uint8 sRGB -> Lab: exact three-step path vs the 3D LUT engine.
+
+Run from software/backend:  python -m bench.bench_lab_lut
+Part 1: error of each table size against the exact path over all 2^24 codes,
+and over skin-like codes (R >= 60, R > G). Part 2: latency on dense skin-sample
+counts (see bench_gamma_lut), without and with a lighting correction.
+With a per-photo correction the shared table is used on the corrected,
+re-encoded codes (the table is never rebuilt per photo)."""
+import os
+import sys
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from src import lab_lut
+from src.lib import constants as const
+from src.rgb_to_lab import gamma_to_linear, lighting_correction_matrix, linear_to_xyz, xyz_to_lab
+from bench.bench_gamma_lut import FACE_SIDES, best_ms, skin_pixel_count
+
+NODES = (17, 33, 65)
+CHUNK = 1 << 20
+
+
+def exact(rgb, correction=None):
+    lin = gamma_to_linear(rgb)
+    if correction is not None:
+        lin = lin @ correction
+    return xyz_to_lab(linear_to_xyz(lin))
+
+
+def all_codes(start, stop):
+    k = np.arange(start, stop, dtype=np.uint32)
+    return np.stack((k >> 16, (k >> 8) & 255, k & 255), axis=1).astype(np.uint8)
+
+
+def error_table():
+    print(f"{'nodes':>6}{'max dE76':>10}{'mean dE76':>11}{'skin max':>10}{'skin mean':>11}{'table KB':>10}")
+    for nodes in NODES:
+        lut = lab_lut.build_lut(nodes)
+        worst, total, skin_worst, skin_total, skin_n = 0.0, 0.0, 0.0, 0.0, 0
+        for start in range(0, 1 << 24, CHUNK):
+            rgb = all_codes(start, start + CHUNK)
+            de = np.linalg.norm(lab_lut.rgb8_to_lab(rgb, lut) - exact(rgb), axis=1)
+            skin = (rgb[:, 0] >= 60) & (rgb[:, 0] > rgb[:, 1])
+            worst, total = max(worst, de.max()), total + de.sum()
+            if skin.any():
+                skin_worst = max(skin_worst, de[skin].max())
+                skin_total, skin_n = skin_total + de[skin].sum(), skin_n + int(skin.sum())
+        print(f"{nodes:>6}{worst:>10.3f}{total / (1 << 24):>11.4f}{skin_worst:>10.3f}"
+              f"{skin_total / skin_n:>11.4f}{lut.nbytes / 1024:>10.0f}")
+
+
+def latency_table():
+    rng = np.random.default_rng(0)
+    correction = lighting_correction_matrix(gamma_to_linear(const.REFERENCE_GAMMA_RGB * 0.9 + 5))
+    lut = lab_lut.build_lut(lab_lut.LUT_NODES)
+    print(f"\n{lab_lut.LUT_NODES} nodes; build {best_ms(lambda: lab_lut.build_lut(lab_lut.LUT_NODES)):.2f} ms")
+    print(f"{'face px':>8}{'pixels':>10}{'exact':>9}{'lut':>8}{'speedup':>9}"
+          f"{'corrected exact':>17}{'corr+lut':>11}{'speedup':>9}   (ms)")
+    for side in FACE_SIDES:
+        n = skin_pixel_count(side)
+        skin = rng.integers(0, 256, (n, 3)).astype(np.uint8)
+        e = best_ms(lambda: exact(skin))
+        t = best_ms(lambda: lab_lut.rgb8_to_lab(skin, lut))
+        ec = best_ms(lambda: exact(skin, correction))
+        tc = best_ms(lambda: lab_lut.corrected_rgb8_to_lab(skin, correction, lut))
+        print(f"{side:>8}{n:>10}{e:>9.3f}{t:>8.3f}{e / t:>9.1f}{ec:>17.3f}{tc:>11.3f}{ec / tc:>9.1f}")
+
+
+def main():
+    error_table()
+    latency_table()
+
+
+if __name__ == "__main__":
+    main()
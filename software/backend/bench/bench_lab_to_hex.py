@@ -0,0 +1,30 @@
+"""Lab -> hex: lab_to_hex_single per row vs one lab_to_hex call, 10 to 10^5 colours.
+
+Run from software/backend:  python -m bench.bench_lab_to_hex"""
+import os
+import sys
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from src.color_algorithm import lab_to_hex, lab_to_hex_single, lab_to_rgb8
+from bench.bench_robust_stats import best_ms
+
+SIZES = [10 ** k for k in range(1, 6)]
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'colours':>8}{'per row':>11}{'batched':>10}{'speedup':>9}{'rgb8 only':>11}   (ms)")
+    for n in SIZES:
+        labs = np.column_stack((rng.uniform(0, 100, n), rng.uniform(-80, 80, (n, 2))))
+        scalar = best_ms(lambda: [lab_to_hex_single(lab) for lab in labs], budget_s=1.0)
+        batched = best_ms(lambda: lab_to_hex(labs))
+        rgb8 = best_ms(lambda: lab_to_rgb8(labs))
+        print(f"{n:>8}{scalar:>11.2f}{batched:>10.2f}{scalar / batched:>9.0f}{rgb8:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Lighting correction: the original per-call pinv fit vs the shared solver.
+
+Run from software/backend:  python -m bench.bench_lighting
+Fit times are per photo (24 patches); "apply" corrects N skin pixels."""
+import os
+import sys
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from src import lighting
+from src.lib import constants as const
+from bench.bench_robust_stats import best_ms
+
+
+def original_correction(captured):
+    return np.linalg.inv(np.linalg.pinv(const.REFERENCE_LINEAR_RGB) @ captured)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    captured = const.REFERENCE_LINEAR_RGB @ np.diag([0.8, 0.7, 0.55]) + rng.normal(0, 0.002, (24, 3))
+    captured[5] += 0.2   # one glare patch
+    solver = lighting.solver_for()
+    print(f"{'fit':<34}{'ms':>8}")
+    for name, fn in (("original (pinv + inv per call)", lambda: original_correction(captured)),
+                     ("solver, least squares + checks", lambda: solver.correction_matrix(captured, "lstsq")),
+                     ("solver, robust IRLS + checks", lambda: solver.correction_matrix(captured, "robust"))):
+        print(f"{name:<34}{best_ms(fn):>8.3f}")
+    _, weights = solver.robust_fit(captured)
+    print(f"glare patch weight after IRLS: {weights[5]:.2f}\n")
+
+    correction = solver.correction_matrix(captured)
+    print(f"{'pixels':>10}{'apply ms':>10}")
+    for n in (10 ** 4, 10 ** 5, 10 ** 6):
+        pixels = rng.random((n, 3))
+        print(f"{n:>10}{best_ms(lambda: lighting.LightingSolver.apply(pixels, correction, out=pixels)):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Analysis throughput vs. worker-process count.
+
+Run from software/backend:  python -m bench.bench_pool
+Each configuration analyzes JOBS JPEG uploads (test photos round-robin)
+through AnalysisPool with cores // workers OpenCV threads per worker."""
+import os
+
+for _var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "NUMEXPR_NUM_THREADS"):
+    os.environ.setdefault(_var, "1")
+
+import contextlib
+import io
+import sys
+import time
+
+import cv2
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from src import face_detector
+from src.analysis_pool import CPU_COUNT, AnalysisPool
+
+PHOTO_DIR = os.path.join(BACKEND_DIR, 'data', 'test-photos')
+PHOTOS = ['test1.png', 'test3.png', 'test4.png']
+JOBS = 24
+
+
+def _jpeg(name):
+    img = cv2.imread(os.path.join(PHOTO_DIR, name))
+    return cv2.imencode('.jpg', img, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+
+def main():
+    face_detector.warmup()
+    blobs = [_jpeg(name) for name in PHOTOS]
+    print(f"cores: {CPU_COUNT}")
+    print(f"{'workers':>7}{'cv threads':>12}{'img/s':>8}{'p50 ms':>9}{'p95 ms':>9}")
+    for workers in (1, 2, 4):
+        with contextlib.redirect_stdout(io.StringIO()):
+            pool = AnalysisPool(workers=workers)
+            t0 = time.perf_counter()
+            latencies, futures = [], []
+            for i in range(JOBS):
+                submitted = time.perf_counter()
+                future = pool.analyze(blobs[i % len(blobs)])
+                future.add_done_callback(
+                    lambda f, s=submitted: latencies.append((time.perf_counter() - s) * 1000.0))
+                futures.append(future)
+            for future in futures:
+                future.result()
+            wall = time.perf_counter() - t0
+            pool.shutdown()
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2]
+        p95 = latencies[int(0.95 * (len(latencies) - 1))]
+        print(f"{workers:>7}{pool.cv_threads:>12}{JOBS / wall:>8.2f}{p50:>9.0f}{p95:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
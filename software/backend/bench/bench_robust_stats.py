@@ -0,0 +1,61 @@
+"""Skin pixel statistics: np.percentile / np.median vs src.robust_stats,
+from 10 to 10^7 pixels.
+
+Run from software/backend:  python -m bench.bench_robust_stats
+"lum p95" is the percentile selection alone and "cutoff" the whole 95th-percentile
+luminance filter of filter_skin_pixels, "median" the per-channel Lab median of
+image_to_lab."""
+import os
+import sys
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from src import robust_stats as rs
+
+SIZES = [10 ** k for k in range(1, 8)]
+
+
+def best_ms(fn, budget_s=0.5):
+    best, spent, runs = float('inf'), 0.0, 0
+    while runs < 3 or (spent < budget_s and runs < 200):
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        best, spent, runs = min(best, dt), spent + dt, runs + 1
+    return best * 1000.0
+
+
+def old_cutoff(rgb):
+    lum = 0.2126 * rgb[:, 0] + 0.7152 * rgb[:, 1] + 0.0722 * rgb[:, 2]
+    return rgb[lum <= np.percentile(lum, 95)]
+
+
+def new_cutoff(rgb):
+    return rgb[rs.below_luminance_percentile(rgb, 95)]
+
+
+def old_median(lab):
+    return np.array([np.median(lab[:, c]) for c in range(3)])
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'pixels':>10}{'lum p95 old':>13}{'new':>9}{'cutoff old':>12}{'new':>9}"
+          f"{'median old':>12}{'new':>9}   (ms)")
+    for n in SIZES:
+        rgb = rng.integers(0, 256, (n, 3)).astype(np.uint8)
+        lab = rng.normal((60, 15, 20), (8, 4, 5), (n, 3))
+        lum = rs.luminance(rgb)
+        row = [best_ms(lambda: np.percentile(lum, 95)), best_ms(lambda: rs.percentile(lum, 95)),
+               best_ms(lambda: old_cutoff(rgb)), best_ms(lambda: new_cutoff(rgb)),
+               best_ms(lambda: old_median(lab)), best_ms(lambda: rs.column_median(lab))]
+        print(f"{n:>10}{row[0]:>13.3f}{row[1]:>9.3f}{row[2]:>12.3f}{row[3]:>9.3f}"
+              f"{row[4]:>12.3f}{row[5]:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
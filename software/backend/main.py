@@ -1,68 +1,227 @@
+import os
+
+# Single-threaded BLAS: analysis runs in parallel worker processes and its matrices
+# are tiny. Has to be set before numpy is first imported.
+for _var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "NUMEXPR_NUM_THREADS"):
+    os.environ.setdefault(_var, "1")
+
 from flask import Flask, request, jsonify
 from flask_cors import CORS
+import cv2
 import numpy as np
-import tempfile
 import lgpio
 import time
-import os
+import uuid
 
 from src import rgb_to_lab as rgb2lab
 from src import dispenser as disp
 from src import face_ref_scan_static as frs
-from src.color_algorithm import image_to_hex
+from src import face_detector
+from src import chart_locator
+from src import calibration
+from src import lab_lut
+from src.deadline import Deadline
+from src.quality_gate import ImageRejected
+from src.lib import constants as const
+from src.result_cache import ResultCache, content_key
+from src.analysis_pool import AnalysisPool
+from src.color_algorithm import ALGORITHM_VERSION, combine_labs, lab_to_hex, lab_to_hex_single
 
 app = Flask(__name__)
 CORS(app)
 
+# This process only warms up and forks the analysis workers. Keep its OpenCV
+# sequential so no OpenCV threads exist at the fork; each worker sets its own count.
+cv2.setNumThreads(0)
+
+# Parse the face cascade and touch OpenCV / BLAS once before the first customer does
+STARTUP_STATS = {"warmup_ms": face_detector.warmup(), "first_request_ms": None}
+print("Analysis warmup: %.1f ms" % STARTUP_STATS["warmup_ms"])
+
+# Reference chart keypoints, from the on-disk cache after the first run
+if chart_locator.CHART_LOCATOR != "contour":
+    chart_locator.reference_features()
+
+# Calibration profiles of every kiosk this server answers for (compiled on the
+# first run, then memory-mapped); requests pick one with ?profile=<name>
+PROFILES = calibration.load_all()
+print("Calibration profiles:", ", ".join("%s (%s)" % (p.name, p.fingerprint) for p in PROFILES.values()))
+# ... and the sRGB -> Lab table all of them share, mapped before the workers fork
+if lab_lut.LAB_ENGINE == "lut":
+    lab_lut.lab_lut()
+
+# Analysis runs in preforked worker processes (forked after the warmup above, so
+# they start with a parsed cascade); request threads only wait on the result
+ANALYSIS_POOL = AnalysisPool()
+print("Analysis workers: %d x %d detection x %d OpenCV threads"
+      % (ANALYSIS_POOL.workers, frs.DETECT_THREADS, ANALYSIS_POOL.cv_threads))
+
+# Retries of the same photo (flaky Wi-Fi) are answered from here; concurrent
+# identical uploads share one computation
+ANALYSIS_CACHE = ResultCache(max_entries=256, ttl_s=900.0)
+
+# Dispense plans from /analyzeAndPlan, by plan id, until the customer confirms
+DISPENSE_PLANS = ResultCache(max_entries=64, ttl_s=1800.0)
+
+def request_profile():
+    """Calibration profile named by ?profile= (default CALIBRATION_PROFILE), or None if unknown."""
+    return PROFILES.get(request.args.get("profile") or calibration.CALIBRATION_PROFILE)
+
+def unknown_profile():
+    return jsonify({"error": "Unknown calibration profile.", "profiles": sorted(PROFILES)}), 400
+
+def analyze_upload(img_bytes, profile, budget_ms, deadline):
+    """Analysis of one uploaded photo ({"hex", "lab", "degraded"}), from the cache
+    when it has been seen before. Raises ImageRejected."""
+    start = time.perf_counter()
+
+    # USE NEW COLOR ALGORITHM (decoded in memory, no temp file, in a worker process)
+    def compute():
+        remaining_ms = deadline.remaining_ms() if budget_ms is not None else None
+        return ANALYSIS_POOL.analyze(img_bytes, remaining_ms, profile.name).result()
+
+    # degraded answers are returned but never cached
+    # only requests under the same budget share a computation: an unbudgeted one
+    # must not be handed a degraded result, a budgeted one not wait for a full run
+    key = content_key(img_bytes, ALGORITHM_VERSION, const.CALIBRATION_VERSION, profile.fingerprint)
+    analysis = ANALYSIS_CACHE.get_or_compute(key, compute, cacheable=lambda r: not r["degraded"],
+                                             group=budget_ms)
+
+    if STARTUP_STATS["first_request_ms"] is None:
+        STARTUP_STATS["first_request_ms"] = (time.perf_counter() - start) * 1000.0
+        print("First analyze request: %.1f ms" % STARTUP_STATS["first_request_ms"])
+    return analysis
+
 @app.route("/ping", methods=["GET"])
 def ping():
     return jsonify({"status": "ok"}), 200
 
+@app.route("/stats", methods=["GET"])
+def stats():
+    return jsonify({"startup": STARTUP_STATS, "analysis_cache": ANALYSIS_CACHE.stats(),
+                    "dispense_plans": DISPENSE_PLANS.stats()}), 200
+
 @app.route("/analyze", methods=["POST"])
 def analyze():
     if "image" not in request.files:
         return jsonify({"error": "No image file provided."}), 400
     file = request.files["image"]
+    profile = request_profile()
+    if profile is None:
+        return unknown_profile()
     try:
-        img_bytes = file.read()
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as tmp:
-            tmp.write(img_bytes)
-            temp_path = tmp.name
+        budget_ms = request.args.get("budget_ms", type=float)
+        deadline = Deadline(budget_ms)
+        analysis = analyze_upload(file.read(), profile, budget_ms, deadline)
 
-        # USE NEW COLOR ALGORITHM
-        from src.color_algorithm import image_to_hex
-        hex_color = image_to_hex(temp_path, debug=False)
+        result = {"hex": analysis["hex"]}
+        if budget_ms is not None:
+            result["degraded"] = analysis["degraded"]
+            result["elapsed_ms"] = round(deadline.elapsed_ms(), 1)
+        return jsonify(result), 200
+
+    except ImageRejected as e:
+        # the client prompts a retake based on the reason codes
+        print("Analyze rejected:", e)
+        return jsonify({"error": "Image rejected.", "reasons": e.reasons, "metrics": e.metrics}), 422
 
-        os.remove(temp_path)
-        return jsonify({"hex": hex_color}), 200
-    
     except Exception as e:
         print("Test analyze error:", e)
 
     return jsonify({"error": "Failed to analyze image."}), 500
 
-@app.route("/dispense", methods=["POST"])
-def dispense():
+@app.route("/analyzeAndPlan", methods=["POST"])
+def analyzeAndPlan():
+    """/analyze plus the dispense plan for the result, kept under "plan_id" so
+    /dispense needs nothing else (no hex -> Lab round trip on the client).
+    Degraded analyses get no plan_id."""
+    if "image" not in request.files:
+        return jsonify({"error": "No image file provided."}), 400
+    file = request.files["image"]
+    profile = request_profile()
+    if profile is None:
+        return unknown_profile()
     try:
-        lab = request.get_json()
+        budget_ms = request.args.get("budget_ms", type=float)
+        deadline = Deadline(budget_ms)
+        img_bytes = file.read()
+        analysis = analyze_upload(img_bytes, profile, budget_ms, deadline)
+
+        plan = disp.plan_dispense(np.array(analysis["lab"]), profile)
+        result = {"hex": analysis["hex"], **plan}
+        # a fresh id per request, so a plan a client holds is never replaced; plans
+        # from degraded analyses are shown but cannot be dispensed by id
+        if not analysis["degraded"]:
+            result["plan_id"] = uuid.uuid4().hex
+            DISPENSE_PLANS.put(result["plan_id"], plan)
+        if budget_ms is not None:
+            result["degraded"] = analysis["degraded"]
+            result["elapsed_ms"] = round(deadline.elapsed_ms(), 1)
+        return jsonify(result), 200
+
+    except ImageRejected as e:
+        print("Analyze rejected:", e)
+        return jsonify({"error": "Image rejected.", "reasons": e.reasons, "metrics": e.metrics}), 422
+
+    except Exception as e:
+        print("Analyze and plan error:", e)
+
+    return jsonify({"error": "Failed to analyze image."}), 500
+
+@app.route("/analyzeBatch", methods=["POST"])
+def analyzeBatch():
+    files = request.files.getlist("images")
+    if not files:
+        return jsonify({"error": "No image files provided."}), 400
+    profile = request_profile()
+    if profile is None:
+        return unknown_profile()
+    try:
+        labs, errors = ANALYSIS_POOL.analyze_batch([f.read() for f in files], profile.name).result()
+
+        ok_rows = [k for k, e in enumerate(errors) if e is None]
+        hexes = dict(zip(ok_rows, lab_to_hex(labs[ok_rows])))
+        results = []
+        for k, (lab, error) in enumerate(zip(labs, errors)):
+            if error is None:
+                results.append({"hex": hexes[k], "lab": lab.tolist()})
+            else:
+                results.append({"error": error})
+
+        combined = combine_labs(labs)
+        if combined is None:
+            return jsonify({"error": "Failed to analyze images.", "results": results}), 500
+        return jsonify({
+            "results": results,
+            "combined": {"hex": lab_to_hex_single(combined), "lab": combined.tolist()},
+        }), 200
+
+    except Exception as e:
+        print("Batch analyze error:", e)
 
-        if not lab or "lab" not in lab:
-            return jsonify({"error": "No LAB array provided."}), 400
+    return jsonify({"error": "Failed to analyze images."}), 500
 
-        lab_code = np.array(lab["lab"], dtype=float)
+@app.route("/dispense", methods=["POST"])
+def dispense():
+    try:
+        body = request.get_json()
+
+        # {"plan_id": ...} from /analyzeAndPlan, or {"lab": [L, a, b]}
+        if body and "plan_id" in body:
+            plan = DISPENSE_PLANS.get(body["plan_id"])
+            if plan is None:
+                return jsonify({"error": "Unknown or expired plan."}), 404
+            steps = plan["steps"]
+        elif body and "lab" in body:
+            profile = request_profile()
+            if profile is None:
+                return unknown_profile()
+            steps = disp.calculate_steps(np.array(body["lab"], dtype=float), profile)
+        else:
+            return jsonify({"error": "No LAB array or plan id provided."}), 400
 
-        DELAY = 5
         chip = lgpio.gpiochip_open(0)
-        steps = disp.calculate_steps(lab_code)
-        disp.dispense_foundation(disp.WHITE_MOTOR_PINS, disp.WHITE_SWITCH_PIN, int(steps[disp.WHITE_IND]), chip)
-        time.sleep(DELAY)
-        disp.dispense_foundation(disp.BLACK_MOTOR_PINS, disp.BLACK_SWITCH_PIN, int(steps[disp.BLACK_IND]), chip)
-        time.sleep(DELAY)
-        disp.dispense_foundation(disp.RED_MOTOR_PINS, disp.RED_SWITCH_PIN, int(steps[disp.RED_IND]), chip)
-        time.sleep(DELAY)
-        disp.dispense_foundation(disp.BLUE_MOTOR_PINS, disp.BLUE_SWITCH_PIN, int(steps[disp.BLUE_IND]), chip)
-        time.sleep(DELAY)
-        disp.dispense_foundation(disp.YELLOW_MOTOR_PINS, disp.YELLOW_SWITCH_PIN, int(steps[disp.YELLOW_IND]), chip)
+        disp.dispense_all(steps, chip)
         lgpio.gpiochip_close(chip)
 
         return jsonify({"status": "ok"}), 200
@@ -414,4 +573,6 @@ def emptyYellow():
         return jsonify({"error": "Empty failed."}), 500
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
+    # no reloader: it re-runs this module in a child process, which would warm up
+    # and fork a second set of analysis workers next to the first
+    app.run(host="0.0.0.0", port=5000, debug=True, use_reloader=False)
\ No newline at end of file
@@ -0,0 +1,90 @@
+import concurrent.futures as cf
+import multiprocessing as mp
+import os
+import threading
+
+import cv2
+
+from . import calibration, face_detector
+from .color_algorithm import image_to_lab, images_to_lab, lab_to_hex_single
+from .deadline import Deadline
+from .face_ref_scan_static import DETECT_THREADS
+
+# Worker processes for /analyze. Each one runs DETECT_THREADS detection threads,
+# each of which may run OpenCV's own threads, so the OpenCV thread count is what
+# is left of the cores after that: on the 4-core Pi, 2 workers x 2 detection
+# threads x 1 OpenCV thread.
+CPU_COUNT = os.cpu_count() or 1
+ANALYSIS_WORKERS = int(os.environ.get("ANALYSIS_WORKERS", max(1, CPU_COUNT // 2)))
+
+# BLAS reads its thread count once, when numpy is first imported, so main.py pins
+# it to 1 before importing anything; forked workers inherit that. The matrices
+# here are 3x3 / 24x3, parallel BLAS would only fight the workers for cores.
+
+# ---------- WORKER SIDE ----------
+
+def _init_worker(cv_threads):
+    cv2.setNumThreads(cv_threads)
+    # forked workers inherit the parent's parsed cascades; make sure there is one
+    # and pay the first-call costs here instead of in the first request
+    # (calibration profiles are loaded, memory-mapped, in the parent before the fork)
+    face_detector.warmup()
+
+def _ready():
+    return os.getpid()
+
+def _analyze(image_bytes, budget_ms, profile_name=None):
+    deadline = Deadline(budget_ms)
+    profile = calibration.load_profile(profile_name)
+    lab = image_to_lab(image_bytes, debug=False, deadline=deadline, profile=profile)
+    return {"hex": lab_to_hex_single(lab), "lab": lab.tolist(), "degraded": deadline.degraded}
+
+def _analyze_batch(images, profile_name=None):
+    return images_to_lab(images, profile=calibration.load_profile(profile_name))
+
+# ---------- PARENT SIDE ----------
+
+class AnalysisPool:
+    """Preforked process pool running the analysis pipeline off the request threads.
+
+    Methods return concurrent.futures.Future objects; request handlers wait on
+    them while the server keeps answering /ping and motor endpoints."""
+
+    def __init__(self, workers=ANALYSIS_WORKERS, cv_threads=None):
+        self.workers = workers
+        self.cv_threads = cv_threads or max(1, CPU_COUNT // (workers * DETECT_THREADS))
+        self._lock = threading.Lock()
+        self._executor = self._start()
+
+    def _start(self):
+        # fork: workers start with the parent's warmed-up cascade registry
+        executor = cf.ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=mp.get_context("fork"),
+            initializer=_init_worker,
+            initargs=(self.cv_threads,),
+        )
+        # start every worker now rather than on the first requests
+        for f in [executor.submit(_ready) for _ in range(self.workers)]:
+            f.result()
+        return executor
+
+    def submit(self, fn, *args):
+        with self._lock:
+            try:
+                return self._executor.submit(fn, *args)
+            except cf.process.BrokenProcessPool:
+                print("Analysis pool broken, restarting workers.")
+                self._executor = self._start()
+                return self._executor.submit(fn, *args)
+
+    def analyze(self, image_bytes, budget_ms=None, profile_name=None):
+        """Future resolving to {"hex": ..., "lab": [L, a, b], "degraded": [...]}."""
+        return self.submit(_analyze, image_bytes, budget_ms, profile_name)
+
+    def analyze_batch(self, images, profile_name=None):
+        """Future resolving to images_to_lab(images) under that calibration profile."""
+        return self.submit(_analyze_batch, images, profile_name)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
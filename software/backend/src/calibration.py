@@ -0,0 +1,195 @@
+import csv
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+
+import numpy as np
+
+from . import color
+from .lib import constants as const
+from .lighting import LightingSolver
+
+# ---------- PROFILE SOURCES ----------
+# One profile per kiosk (camera + pigment batch). Its sources are two CSVs with
+# a header row:
+#   Reference_Color_Sheet.csv     24 rows  R,G,B   the chart patches (0..255) as
+#                                                  this camera sees them under
+#                                                  the reference light, chart order
+#   Physical_Experiment_Data.csv   5 rows  L,a,b   the base pigments, dispenser
+#                                                  order (white, black, red, blue, yellow)
+# The "default" profile reads data/*.csv, any other from data/calibration/<name>/.
+# A missing or empty CSV falls back to the values in lib/constants.py.
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.abspath(os.path.join(SCRIPT_DIR, '..', 'data'))
+CALIBRATION_DIR = os.path.join(DATA_DIR, 'calibration')
+REFERENCE_CSV = 'Reference_Color_Sheet.csv'
+BASES_CSV = 'Physical_Experiment_Data.csv'
+
+DEFAULT_PROFILE = "default"
+CALIBRATION_PROFILE = os.environ.get("CALIBRATION_PROFILE", DEFAULT_PROFILE)
+
+# ---------- COMPILED PROFILES ----------
+# A compiled profile is a directory of .npy arrays plus profile.json, named by a
+# fingerprint of its sources, the format and the constants it was derived with;
+# on load every array is memory-mapped, so processes (and forked workers) share
+# the pages and nothing is derived per request.
+PROFILE_CACHE_DIR = os.environ.get("CALIBRATION_CACHE", os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+    "foundation-fix", "profiles"))
+
+# Bump when the arrays stored (or how they are derived) change
+#   2  no sRGB -> Lab table: it is the same for every profile, see lab_lut.lab_lut
+PROFILE_FORMAT = 2
+
+MIX_EPS = 1e-8   # ridge term of the mixing normal equations (lab_to_mix)
+
+# ---------- READING SOURCES ----------
+
+def _read_rows(path, columns, n_rows):
+    """(n_rows, len(columns)) float array from a CSV, or None if it is missing or empty."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+    with open(path, newline='') as f:
+        rows = [r for r in csv.DictReader(f) if any((v or '').strip() for v in r.values())]
+    if not rows:
+        return None
+    try:
+        values = np.array([[float(r[c]) for c in columns] for r in rows])
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError("%s: expected columns %s (%s)" % (path, ",".join(columns), e))
+    if values.shape[0] != n_rows:
+        raise ValueError("%s: expected %d rows, found %d" % (path, n_rows, values.shape[0]))
+    return values
+
+def profile_names():
+    """Every profile that has sources: "default" plus data/calibration/<name>/."""
+    names = [DEFAULT_PROFILE]
+    if os.path.isdir(CALIBRATION_DIR):
+        names += sorted(d for d in os.listdir(CALIBRATION_DIR)
+                        if os.path.isdir(os.path.join(CALIBRATION_DIR, d)) and d != DEFAULT_PROFILE)
+    return names
+
+def source_dir(name):
+    if name == DEFAULT_PROFILE:
+        return DATA_DIR
+    path = os.path.join(CALIBRATION_DIR, name)
+    if not os.path.isdir(path):
+        raise KeyError("Unknown calibration profile: %s" % name)
+    return path
+
+def read_sources(name):
+    """Raw profile inputs: reference_gamma_rgb, reference_linear_rgb and base_labs."""
+    folder = source_dir(name)
+    gamma = _read_rows(os.path.join(folder, REFERENCE_CSV), ("R", "G", "B"), len(const.REFERENCE_GAMMA_RGB))
+    bases = _read_rows(os.path.join(folder, BASES_CSV), ("L", "a", "b"), len(const.BASE_LABS))
+    if gamma is None:
+        # the measured linear values, not re-derived, so the default profile
+        # reproduces the constants exactly
+        gamma, linear = const.REFERENCE_GAMMA_RGB, const.REFERENCE_LINEAR_RGB
+    else:
+        linear = color.srgb_to_linear(gamma)
+    return {
+        "reference_gamma_rgb": np.asarray(gamma, dtype=np.float64),
+        "reference_linear_rgb": np.asarray(linear, dtype=np.float64),
+        "base_labs": np.asarray(const.BASE_LABS if bases is None else bases, dtype=np.float64),
+    }
+
+def fingerprint(sources):
+    h = hashlib.sha1()
+    h.update(b"format %d" % PROFILE_FORMAT)
+    for key in sorted(sources):
+        h.update(key.encode())
+        h.update(np.ascontiguousarray(sources[key], dtype=np.float64).tobytes())
+    for arr in (const.RGB_TO_XYZ_MATRIX, const.WHITEPOINT_D65, np.float64(const.GAMMA)):
+        h.update(np.ascontiguousarray(arr, dtype=np.float64).tobytes())
+    return h.hexdigest()[:16]
+
+# ---------- COMPILING ----------
+
+def derive(sources):
+    """All arrays of a profile: the sources plus what requests would otherwise
+    recompute (reference pseudo-inverse and outer products for the lighting fit,
+    the mixing normal matrix)."""
+    arrays = dict(sources)
+    solver = LightingSolver(sources["reference_linear_rgb"])
+    arrays["reference_pinv"] = solver.pinv
+    arrays["reference_outer"] = solver.outer
+    bases = sources["base_labs"]
+    arrays["mix_gram"] = bases @ bases.T + MIX_EPS * np.eye(len(bases))
+    return arrays
+
+def compile_profile(name=DEFAULT_PROFILE, cache_dir=None):
+    """Compile `name` into cache_dir (default PROFILE_CACHE_DIR, if not already
+    there); returns its directory."""
+    cache_dir = cache_dir or PROFILE_CACHE_DIR
+    sources = read_sources(name)
+    digest = fingerprint(sources)
+    path = os.path.join(cache_dir, "%s-v%d-%s" % (name, PROFILE_FORMAT, digest))
+    if os.path.exists(os.path.join(path, "profile.json")):
+        return path
+
+    arrays = derive(sources)
+    tmp = path + ".%d.tmp" % os.getpid()
+    os.makedirs(tmp, exist_ok=True)
+    try:
+        for key, value in arrays.items():
+            np.save(os.path.join(tmp, key + ".npy"), np.ascontiguousarray(value))
+        meta = {"name": name, "format": PROFILE_FORMAT, "fingerprint": digest,
+                "sources": source_dir(name), "arrays": sorted(arrays)}
+        with open(os.path.join(tmp, "profile.json"), 'w') as f:
+            json.dump(meta, f, indent=1)
+        try:
+            os.rename(tmp, path)
+        except OSError:
+            # another process compiled the same profile first
+            shutil.rmtree(tmp, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return path
+
+# ---------- LOADED PROFILES ----------
+
+class CalibrationProfile:
+    """A compiled profile; every array is a read-only memory map, available as
+    an attribute (profile.base_labs, profile.reference_pinv, ...)."""
+
+    def __init__(self, path):
+        with open(os.path.join(path, "profile.json")) as f:
+            meta = json.load(f)
+        self.name = meta["name"]
+        self.fingerprint = meta["fingerprint"]
+        self.path = path
+        self.arrays = {key: np.load(os.path.join(path, key + ".npy"), mmap_mode="r")
+                       for key in meta["arrays"]}
+        self.__dict__.update(self.arrays)
+        self.solver = LightingSolver(self.reference_linear_rgb, pinv=self.reference_pinv,
+                                     outer=self.reference_outer)
+
+    def __repr__(self):
+        return "CalibrationProfile(%r, %s)" % (self.name, self.fingerprint)
+
+_profiles_lock = threading.Lock()
+_profiles = {}   # name -> CalibrationProfile
+
+def load_profile(name=None, cache_dir=None):
+    """Compiled, memory-mapped profile `name` (default CALIBRATION_PROFILE).
+    Compiled on first use; later calls in the process return the same object."""
+    name = name or CALIBRATION_PROFILE
+    with _profiles_lock:
+        if name not in _profiles:
+            _profiles[name] = CalibrationProfile(compile_profile(name, cache_dir))
+        return _profiles[name]
+
+def load_all(cache_dir=None):
+    return {name: load_profile(name, cache_dir) for name in profile_names()}
+
+if __name__ == "__main__":
+    # python -m src.calibration [name ...]: compile profiles ahead of deployment
+    for profile_name in sys.argv[1:] or profile_names():
+        profile = load_profile(profile_name)
+        size = sum(a.nbytes for a in profile.arrays.values())
+        print("%-12s %s  %d arrays, %.0f KB" % (profile.name, profile.path, len(profile.arrays), size / 1024))
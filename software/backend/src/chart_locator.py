@@ -0,0 +1,196 @@
+import hashlib
+import os
+import threading
+
+import cv2
+import numpy as np
+
+from .lib import constants as const
+
+# Reference chart, and where its precomputed features are kept between runs
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REF_PATH = os.path.abspath(os.path.join(SCRIPT_DIR, '..', 'data', 'macbeth_color_ref.png'))
+FEATURE_CACHE_DIR = os.environ.get("CHART_FEATURE_CACHE", os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")), "foundation-fix"))
+
+# "contour": Otsu + largest blob (locate_chart) only, "features": keypoint
+# matching against the reference chart only, "auto": contour first, matching
+# when what it found does not look like a chart
+CHART_LOCATOR = os.environ.get("CHART_LOCATOR", "auto")
+
+# Bump when the detector or what gets stored changes; old cache files are ignored
+FEATURE_VERSION = 1
+MATCH_LONG_EDGE = 640     # input is downscaled to this before matching
+RATIO_TEST = 0.8
+MIN_INLIERS = 10
+# Median per-patch standard deviation above which a rectified "chart" is taken
+# to be something else (real charts are flat patches, ~8-13 on the test photos;
+# a face or a wall picked as the largest blob is 25+)
+MAX_PATCH_STD = 20.0
+# Flat is not enough: any dark, even quad (a shadowed wall, the table) is flat.
+# The 24 patch means must also follow the chart's colours: their correlation
+# with the reference patches is 0.86-0.89 for the charts on the test photos and
+# about 0 for a flat quad picked instead.
+MIN_REFERENCE_CORRELATION = 0.5
+
+# Patch grid of the reference image (x1, y1, x2, y2), from first patch corner to
+# last. The matched quad is this box grown by the chart outer margin, so the
+# rectified chart has the same layout as one found by locate_chart.
+REF_GRID_BOX = (16, 21, 244, 172)
+CHART_OUTER_MARGIN = 0.08
+
+# ---------- REFERENCE FEATURES ----------
+
+def _detector():
+    # SIFT is in the main OpenCV package since 4.4; ORB is the fallback
+    if hasattr(cv2, "SIFT_create"):
+        return "sift", cv2.SIFT_create(), cv2.NORM_L2
+    return "orb", cv2.ORB_create(2000), cv2.NORM_HAMMING
+
+def _channels(img):
+    # matching per Lab channel: the reference and the print only agree on which
+    # neighbouring patch is brighter / redder / bluer, not on gray levels
+    return cv2.split(cv2.cvtColor(img, cv2.COLOR_BGR2LAB))
+
+def compute_features(img, detector=None, mask=None):
+    """(points (N, 2) float32, descriptors) over all Lab channels of a BGR image,
+    only where the uint8 `mask` (if any) is non-zero."""
+    _, det, _ = detector or _detector()
+    pts, descs = [], []
+    for channel in _channels(img):
+        kps, desc = det.detectAndCompute(channel, mask)
+        if desc is None:
+            continue
+        pts.extend(k.pt for k in kps)
+        descs.append(desc)
+    if not descs:
+        return np.empty((0, 2), np.float32), None
+    return np.array(pts, dtype=np.float32), np.vstack(descs)
+
+def ref_quad(grid_box=REF_GRID_BOX, outer_margin=CHART_OUTER_MARGIN):
+    """Chart corners (TL, TR, BR, BL) in reference image coordinates."""
+    x1, y1, x2, y2 = grid_box
+    pad = outer_margin / (1.0 - 2.0 * outer_margin)
+    px, py = pad * (x2 - x1), pad * (y2 - y1)
+    return np.array([(x1 - px, y1 - py), (x2 + px, y1 - py),
+                     (x2 + px, y2 + py), (x1 - px, y2 + py)], dtype=np.float32)
+
+_features_lock = threading.Lock()
+_features = {}   # (path, detector name) -> (points, descriptors)
+
+def _cache_file(data, name, cache_dir):
+    digest = hashlib.sha1(data).hexdigest()[:16]
+    return os.path.join(cache_dir, "chartref-%s-v%d-%s.npz" % (name, FEATURE_VERSION, digest))
+
+def reference_features(path=REF_PATH, cache_dir=FEATURE_CACHE_DIR):
+    """Keypoints / descriptors of the reference chart.
+
+    Computed once per process and stored in `cache_dir`, keyed by the reference
+    image contents, detector and FEATURE_VERSION, so restarts just load them."""
+    detector = _detector()
+    name = detector[0]
+    key = (os.path.abspath(path), name)
+    with _features_lock:
+        if key in _features:
+            return _features[key]
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        cache_file = _cache_file(data, name, cache_dir) if cache_dir else None
+        if cache_file and os.path.exists(cache_file):
+            with np.load(cache_file) as z:
+                feats = (z["points"], z["descriptors"])
+        else:
+            img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+            feats = compute_features(img, detector)
+            if cache_file and feats[1] is not None:
+                try:
+                    os.makedirs(cache_dir, exist_ok=True)
+                    tmp = cache_file + ".%d.tmp" % os.getpid()
+                    with open(tmp, 'wb') as f:
+                        np.savez(f, points=feats[0], descriptors=feats[1])
+                    os.replace(tmp, cache_file)
+                except OSError as e:
+                    print("Could not cache chart features:", e)
+        _features[key] = feats
+        return feats
+
+# ---------- MATCHING ----------
+
+def _plausible(quad, frame_shape, min_area_fraction=0.01):
+    """Reject degenerate homographies: the chart must be a convex quad of sane
+    size, roughly the reference's aspect ratio, and mostly inside the frame."""
+    if not cv2.isContourConvex(quad.reshape(-1, 1, 2)):
+        return False
+    H, W = frame_shape[:2]
+    area = cv2.contourArea(quad)
+    if not min_area_fraction * H * W <= area <= H * W:
+        return False
+    top, bottom = np.linalg.norm(quad[1] - quad[0]), np.linalg.norm(quad[2] - quad[3])
+    left, right = np.linalg.norm(quad[3] - quad[0]), np.linalg.norm(quad[2] - quad[1])
+    ref = ref_quad()
+    ref_aspect = (ref[1, 0] - ref[0, 0]) / (ref[3, 1] - ref[0, 1])
+    aspect = (top + bottom) / max(left + right, 1e-6)
+    if not 0.6 * ref_aspect <= aspect <= 1.6 * ref_aspect:
+        return False
+    margin = 0.1 * max(H, W)
+    return bool(np.all(quad >= -margin) and np.all(quad[:, 0] <= W + margin)
+                and np.all(quad[:, 1] <= H + margin))
+
+def looks_like_chart(corners, patch_stats, frame_shape):
+    """True when `corners` is a plausible chart quad and its rectified patches
+    are flat enough to be colour patches and coloured like the chart's."""
+    if corners is None or patch_stats is None:
+        return False
+    if not _plausible(np.asarray(corners, dtype=np.float32), frame_shape):
+        return False
+    patch_std = np.sqrt(patch_stats["variances"].mean(axis=1))
+    if float(np.median(patch_std)) > MAX_PATCH_STD:
+        return False
+    rgb = np.asarray(patch_stats["means"], dtype=np.float64)[:, ::-1]
+    if rgb.std() == 0:
+        return False
+    return np.corrcoef(rgb.ravel(), const.REFERENCE_GAMMA_RGB.ravel())[0, 1] >= MIN_REFERENCE_CORRELATION
+
+def _search_mask(shape, exclude, scale):
+    """Keypoint mask of a frame of `shape` with the (x0, y0, x1, y1) `exclude`
+    boxes (full-frame coordinates, scaled by `scale`) cleared; None if no boxes."""
+    if not exclude:
+        return None
+    mask = np.full(shape[:2], 255, np.uint8)
+    for box in exclude:
+        x0, y0, x1, y1 = (int(round(v * scale)) for v in box)
+        mask[max(0, y0):max(0, y1), max(0, x0):max(0, x1)] = 0
+    return mask
+
+def locate_chart_features(img, long_edge=MATCH_LONG_EDGE, exclude=()):
+    """Chart corners (TL, TR, BR, BL) in `img` coordinates from keypoint
+    matching against the reference chart, or None if no plausible match.
+    No keypoints are taken inside the `exclude` boxes (e.g. the claimed face)."""
+    if img is None or img.size == 0:
+        return None
+    detector = _detector()
+    ref_pts, ref_desc = reference_features()
+    if ref_desc is None:
+        return None
+
+    scale = min(1.0, long_edge / max(img.shape[:2]))
+    small = img if scale == 1.0 else cv2.resize(img, None, fx=scale, fy=scale,
+                                                interpolation=cv2.INTER_AREA)
+    pts, desc = compute_features(small, detector, _search_mask(small.shape, exclude, scale))
+    if desc is None or len(desc) < 2:
+        return None
+
+    pairs = cv2.BFMatcher(detector[2]).knnMatch(ref_desc, desc, k=2)
+    good = [m for m, n in (p for p in pairs if len(p) == 2) if m.distance < RATIO_TEST * n.distance]
+    if len(good) < MIN_INLIERS:
+        return None
+
+    src = ref_pts[[m.queryIdx for m in good]]
+    dst = pts[[m.trainIdx for m in good]]
+    M, inliers = cv2.findHomography(src, dst, cv2.RANSAC, 5.0)
+    if M is None or int(inliers.sum()) < MIN_INLIERS:
+        return None
+
+    quad = cv2.perspectiveTransform(ref_quad().reshape(-1, 1, 2), M).reshape(4, 2) / scale
+    return quad if _plausible(quad, img.shape) else None
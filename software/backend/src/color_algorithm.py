@@ -1,50 +1,68 @@
 # src/color_algorithm.py
-from face_ref_scan_static import analyze_image
-from rgb_to_lab import gamma_to_linear, lighting_correction, linear_to_xyz, xyz_to_lab, median_lab
+from .calibration import load_profile
+from .deadline import allows
+from .lab_lut import LAB_ENGINE, LUT_NODES, corrected_rgb8_to_lab, lab_lut, rgb8_to_lab
+from .face_ref_scan_static import analyze_image
+from .quality_gate import ImageRejected
+from .color import lab_to_srgb, linear_to_xyz, xyz_to_lab
+from .lighting import LightingSolver, correction_for
+from .rgb_to_lab import gamma_to_linear
+from .robust_stats import below_luminance_percentile, column_median, column_trimmed_mean
 import numpy as np
+import os
+
+# Bump whenever a change here or in the image analysis alters the output for the
+# same photo (cached /analyze results are keyed on it)
+#   2  robust lighting fit
+#   3  output changes that went in without a bump: batch aggregation, dense skin
+#      sampling, the view-based pipeline
+#   4  a chart blob that fails validation is no longer used as the reference
+#   5  ... nor a flat quad whose patches are not coloured like the chart's
+#   6  keypoint matching skips the face's claimed region too
+ALGORITHM_VERSION = 6
 
 # ---------- BASE SKIN TONE ----------
 # You can adjust this to your preferred canonical skin tone
 BASE_SKIN_LAB = np.array([70.0, 15.0, 20.0])  # L*, a*, b*
 
+# How per-pixel skin Lab values are reduced to one colour:
+# "median" (per channel) or "trimmed_mean" (10% cut at each end, per channel)
+LAB_AGGREGATE = os.environ.get("LAB_AGGREGATE", "median")
+TRIM_PROPORTION = 0.1
+
 # ---------- LAB -> HEX ----------
+# Floor on display RGB (0..1): prevents very low RGB (avoids grey/black)
+HEX_RGB_FLOOR = 0.03
+_HEX_BYTES = ['%02X' % v for v in range(256)]
+
+def lab_to_rgb8(labs):
+    """Display RGB of (..., 3) Lab as uint8 codes: gamut-clipped, floored at
+    HEX_RGB_FLOOR, truncated like lab_to_hex_single."""
+    rgb = lab_to_srgb(np.asarray(labs, dtype=np.float64), scale=1.0)
+    np.maximum(rgb, HEX_RGB_FLOOR, out=rgb)
+    rgb *= 255.0
+    return rgb.astype(np.uint8)
+
+def lab_to_hex(labs):
+    """'#RRGGBB' for every row of an (N, 3) Lab array, one vectorized pass."""
+    rgb = lab_to_rgb8(labs).reshape(-1, 3)
+    return ['#' + _HEX_BYTES[r] + _HEX_BYTES[g] + _HEX_BYTES[b] for r, g, b in rgb.tolist()]
+
 def lab_to_hex_single(lab):
-    L, a, b = lab
-    # Lab -> XYZ
-    y = (L + 16.0) / 116.0
-    x = y + a / 500.0
-    z = y - b / 200.0
-
-    def inv_f(t):
-        t3 = t**3
-        return t3 if t3 > 0.008856 else (t - 16.0/116.0) / 7.787
-
-    X = inv_f(x) * 0.95047
-    Y = inv_f(y) * 1.00000
-    Z = inv_f(z) * 1.08883
-
-    # XYZ -> linear sRGB
-    M = np.array([
-        [ 3.2406, -1.5372, -0.4986],
-        [-0.9689,  1.8758,  0.0415],
-        [ 0.0557, -0.2040,  1.0570]
-    ])
-    rgb_lin = M @ np.array([X, Y, Z])
-    rgb_lin = np.clip(rgb_lin, 0.0, None)
-
-    # gamma correction
-    rgb = np.where(rgb_lin <= 0.0031308,
-                   12.92 * rgb_lin,
-                   1.055 * (rgb_lin ** (1.0/2.4)) - 0.055)
-    rgb = np.clip(rgb, 0.0, 1.0)
-
-    # optional tweak: prevent very low RGB (avoids grey/black)
-    rgb = np.maximum(rgb, 0.03)
-
-    r, g, b = (rgb * 255.0).astype(int)
-    return '#{:02X}{:02X}{:02X}'.format(r, g, b)
+    return lab_to_hex(np.reshape(lab, (1, 3)))[0]
 
 # ---------- FILTER SKIN PIXELS ----------
+# Pixel budget for skin statistics when the request deadline is about to run out
+DEGRADED_MAX_PIXELS = 4096
+
+def subsample_pixels(pixels, max_pixels):
+    """Evenly strided subset of at most `max_pixels` rows."""
+    pixels = np.asarray(pixels).reshape(-1, 3)
+    if pixels.shape[0] <= max_pixels:
+        return pixels
+    step = -(-pixels.shape[0] // max_pixels)
+    return pixels[::step]
+
 def filter_skin_pixels(rgb_pixels):
     arr = np.asarray(rgb_pixels).reshape(-1, 3)
     if arr.size == 0:
@@ -55,22 +73,79 @@ def filter_skin_pixels(rgb_pixels):
     mask = (R > 40) & (R > G) & (G > B - 10)
     filtered = arr[mask]
 
-    # remove top 5% luminance highlights
-    lum = 0.2126*filtered[:,0] + 0.7152*filtered[:,1] + 0.0722*filtered[:,2]
-    thresh = np.percentile(lum, 95)
-    filtered = filtered[lum <= thresh]
+    # remove top 5% luminance highlights (O(n) selection, no full sort)
+    if filtered.size:
+        filtered = filtered[below_luminance_percentile(filtered, 95)]
 
     if filtered.shape[0] < max(3, arr.shape[0] // 10):
         filtered = arr[mask] if arr[mask].size else arr
 
     return filtered
 
-# ---------- IMAGE -> HEX WITH BASE SKIN NORMALIZATION ----------
-def image_to_hex(image_path, debug=False):
-    skin_pixels, reference_rgb = analyze_image(image_path)
+# ---------- SKIN PIXELS -> LAB ----------
+def _correction(reference_rgb, profile):
+    """Lighting correction matrix from the chart patches (0..255), or None when
+    there is no chart or its patches do not support a fit."""
+    if reference_rgb is None or not reference_rgb.size:
+        return None
+    return correction_for(gamma_to_linear(_codes(reference_rgb)), solver=profile.solver)
+
+def _codes(rgb):
+    """8-bit codes stay uint8 (table lookup in gamma_to_linear), the rest float64."""
+    rgb = np.asarray(rgb)
+    return rgb if rgb.dtype == np.uint8 else rgb.astype(np.float64)
+
+def skin_pixels_to_lab(skin_pixels, reference_rgb=None, engine=None, profile=None):
+    """Lighting-corrected Lab for every (gamma-encoded 0..255) skin pixel.
+
+    `engine` (default LAB_ENGINE) "lut" interpolates uint8 pixels in the shared
+    3D table, after the photo's correction in linear RGB; see lab_lut. `profile` is the
+    calibration profile (default: calibration.CALIBRATION_PROFILE)."""
+    profile = profile or load_profile()
+    codes = _codes(skin_pixels)
+    correction = _correction(reference_rgb, profile)
+    if (engine or LAB_ENGINE) == "lut" and codes.dtype == np.uint8:
+        lut = lab_lut(LUT_NODES)
+        if correction is None:
+            return rgb8_to_lab(codes, lut)
+        return corrected_rgb8_to_lab(codes, correction, lut)
+
+    # linearize (gamma_to_linear expects 0..255 codes; uint8 goes through its LUT)
+    skin_lin = gamma_to_linear(codes)
+
+    # lighting correction using reference patches, one matmul in place
+    if correction is not None:
+        LightingSolver.apply(skin_lin, correction, out=skin_lin)
+
+    # convert linear -> XYZ -> Lab, in the buffer linearization allocated
+    return xyz_to_lab(linear_to_xyz(skin_lin, out=skin_lin), out=skin_lin)
+
+def aggregate_lab(lab, method=None):
+    """One Lab colour from per-pixel (N, 3) Lab values, see LAB_AGGREGATE."""
+    method = method or LAB_AGGREGATE
+    if method == "median":
+        return column_median(lab)
+    if method == "trimmed_mean":
+        return column_trimmed_mean(lab, TRIM_PROPORTION)
+    raise ValueError("Unknown Lab aggregate: %s" % method)
+
+def normalize_to_base_skin(lab_med):
+    # Scale Lab to match canonical skin tone
+    lab_corrected = BASE_SKIN_LAB * (lab_med / (lab_med + 1e-8))
+    # optional: blend with original to preserve hue slightly
+    return 0.4 * lab_med + 0.6 * lab_corrected
+
+# ---------- IMAGE -> LAB / HEX WITH BASE SKIN NORMALIZATION ----------
+def image_to_lab(image, debug=False, deadline=None, profile=None):
+    """Normalized median skin Lab for one image (see image_to_hex)."""
+    skin_pixels, reference_rgb = analyze_image(image, deadline=deadline)
     if skin_pixels is None or skin_pixels.size == 0:
         raise ValueError("No skin pixels detected")
 
+    if not allows(deadline, "skin_pixels") and len(skin_pixels) > DEGRADED_MAX_PIXELS:
+        skin_pixels = subsample_pixels(skin_pixels, DEGRADED_MAX_PIXELS)
+        deadline.degrade("skin_pixels", "sampled %d pixels" % DEGRADED_MAX_PIXELS)
+
     if reference_rgb is None or reference_rgb.size == 0 and debug:
         print("Warning: no reference patches detected; lighting correction skipped")
 
@@ -79,32 +154,123 @@ def image_to_hex(image_path, debug=False):
     if debug:
         print("Filtered skin count:", filtered.shape[0])
 
-    # normalize to 0..1
-    skin_norm = filtered.astype(np.float64) / 255.0
-    ref_norm = reference_rgb.astype(np.float64)/255.0 if reference_rgb is not None else None
-
-    # linearize
-    skin_lin = gamma_to_linear(skin_norm)
-    ref_lin = gamma_to_linear(ref_norm) if ref_norm is not None else None
+    lab = skin_pixels_to_lab(filtered, reference_rgb, profile=profile)
 
-    # lighting correction using reference patches
-    corrected_skin = lighting_correction(skin_lin, ref_lin) if ref_lin is not None else skin_lin
-
-    # convert linear -> XYZ -> Lab
-    xyz = linear_to_xyz(corrected_skin)
-    lab = xyz_to_lab(xyz)
-
-    # median Lab for image
-    lab_med = median_lab(lab)
+    # median (or trimmed mean) Lab for image
+    lab_med = aggregate_lab(lab)
 
     # -------- BASE SKIN NORMALIZATION --------
-    # Scale Lab to match canonical skin tone
-    lab_corrected = BASE_SKIN_LAB * (lab_med / (lab_med + 1e-8))
-    # optional: blend with original to preserve hue slightly
-    lab_med = 0.4 * lab_med + 0.6 * lab_corrected
+    return normalize_to_base_skin(lab_med)
+
+def image_to_hex(image, debug=False, deadline=None, profile=None):
+    """`image` may be a path, raw encoded bytes / buffer, or a decoded BGR array.
+    `deadline` (src.deadline.Deadline) lets slow stages degrade to meet a budget;
+    whatever was degraded is recorded on it. `profile`: see skin_pixels_to_lab."""
+    lab_med = image_to_lab(image, debug=debug, deadline=deadline, profile=profile)
 
     # convert to HEX
     hex_color = lab_to_hex_single(lab_med)
     if debug:
         print("lab_med:", lab_med, "hex:", hex_color)
     return hex_color
+
+# ---------- BATCH: MANY IMAGES OF ONE CUSTOMER ----------
+def segment_aggregate(values, segment_ids, n_segments, method=None):
+    """Per-segment aggregate_lab of `values` (N, C): the segments are laid out as
+    rows of one +inf-padded (C, n_segments, longest) grid and sorted in a single
+    call. `segment_ids` must be sorted (contiguous segments); empty segments give NaN."""
+    method = method or LAB_AGGREGATE
+    if method not in ("median", "trimmed_mean"):
+        raise ValueError("Unknown Lab aggregate: %s" % method)
+    counts = np.bincount(segment_ids, minlength=n_segments)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    ok = counts > 0
+    out = np.full((n_segments, values.shape[1]), np.nan)
+    if not ok.any():
+        return out
+
+    grid = np.full((values.shape[1], n_segments, counts.max()), np.inf)
+    grid[:, segment_ids, np.arange(len(segment_ids)) - starts[segment_ids]] = values.T
+    grid.sort(axis=2)
+
+    rows = np.flatnonzero(ok)
+    n = counts[ok]
+    if method == "median":
+        lo, hi = (n - 1) // 2, n // 2
+        out[ok] = (0.5 * (grid[:, rows, lo] + grid[:, rows, hi])).T
+    else:
+        # same cut as column_trimmed_mean: int(proportion * n) at each end
+        cut = (TRIM_PROPORTION * n).astype(np.int64)
+        if np.any(2 * cut >= n):
+            raise ValueError("trimmed mean: nothing left after trimming")
+        pos = np.arange(grid.shape[2])
+        kept = (pos >= cut[:, None]) & (pos < (n - cut)[:, None])
+        out[ok] = (np.where(kept, grid[:, rows], 0.0).sum(axis=2) / (n - 2 * cut)).T
+    return out
+
+def segment_median(values, segment_ids, n_segments):
+    """Per-segment, per-column median of `values` (N, C)."""
+    return segment_aggregate(values, segment_ids, n_segments, "median")
+
+def images_to_lab(images, debug=False, profile=None):
+    """Normalized median skin Lab for each image, converted as one batch.
+
+    Returns (labs, errors): labs is (K, 3) with NaN rows where an image failed,
+    errors[k] is None or the reason image k failed."""
+    filtered, references, errors = [], [], []
+    for image in images:
+        try:
+            skin_pixels, reference_rgb = analyze_image(image)
+        except ImageRejected as e:
+            errors.append(str(e))
+            continue
+        if skin_pixels is None or skin_pixels.size == 0:
+            errors.append("No skin pixels detected")
+            continue
+        errors.append(None)
+        filtered.append(filter_skin_pixels(skin_pixels))
+        references.append(reference_rgb)
+
+    labs = np.full((len(errors), 3), np.nan)
+    if not filtered:
+        return labs, errors
+
+    profile = profile or load_profile()
+    counts = [f.shape[0] for f in filtered]
+    if LAB_ENGINE == "lut":
+        # a table per image, its lighting correction baked in
+        lab = np.concatenate([skin_pixels_to_lab(f, r, profile=profile)
+                              for f, r in zip(filtered, references)])
+    else:
+        # one linearization pass for all pixels of all images
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        lin = gamma_to_linear(_codes(np.concatenate(filtered)))
+
+        # lighting correction differs per image: one 3x3 matmul per segment, in place
+        for k, r in enumerate(references):
+            correction = _correction(r, profile)
+            if correction is not None:
+                seg = lin[offsets[k]:offsets[k + 1]]
+                LightingSolver.apply(seg, correction, out=seg)
+
+        # one XYZ / Lab pass for the whole batch, in place
+        lab = xyz_to_lab(linear_to_xyz(lin, out=lin), out=lin)
+
+    # one selection per image
+    segment_ids = np.repeat(np.arange(len(filtered)), counts)
+    medians = segment_aggregate(lab, segment_ids, len(filtered))
+
+    ok_rows = [k for k, e in enumerate(errors) if e is None]
+    labs[ok_rows] = normalize_to_base_skin(medians)
+    if debug:
+        print("Batch Lab:\n", labs)
+    return labs, errors
+
+def combine_labs(labs):
+    """Robust combined shade over several images: per-channel median of the
+    successful rows. None if every image failed."""
+    labs = np.asarray(labs, dtype=np.float64)
+    ok = ~np.isnan(labs).any(axis=1)
+    if not ok.any():
+        return None
+    return np.median(labs[ok], axis=0)
@@ -0,0 +1,50 @@
+import math
+import time
+
+# A stage runs its full variant only if at least this much budget (ms) is left
+# when it starts: the full variant plus the cheapest form of everything after
+# it. Measured per stage (FrameContext.timings) on the test photos on a 1-core
+# x86 dev machine, rounded up; re-measure on the kiosk hardware, where every
+# stage is slower.
+STAGE_COST_MS = {
+    "decode": 250,           # full analysis-resolution decode (~135) + the rest
+    "face_refine": 120,      # coarse face pass (~75) + refinement (~12) + the rest
+    "chart_corners": 40,     # full-resolution chart corner search in the sheet (~9) + the rest
+    "chart_features": 320,   # keypoint matching against the reference chart (~300)
+    "skin_pixels": 25,       # filtering / converting every sampled skin pixel (~20)
+}
+
+class Deadline:
+    """Latency budget for one analysis request.
+
+    Stages ask `allows(stage)` before doing their expensive variant and call
+    `degrade(stage, strategy)` when they fall back to a cheaper one."""
+
+    def __init__(self, budget_ms=None):
+        self.start = time.perf_counter()
+        self.budget_ms = budget_ms
+        self.degraded = []
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.start) * 1000.0
+
+    def remaining_ms(self):
+        if self.budget_ms is None:
+            return math.inf
+        return self.budget_ms - self.elapsed_ms()
+
+    def allows(self, stage):
+        return self.remaining_ms() >= STAGE_COST_MS[stage]
+
+    def degrade(self, stage, strategy):
+        """Record a fallback; a stage degraded twice keeps one entry listing both."""
+        for entry in self.degraded:
+            if entry["stage"] == stage:
+                entry["strategy"] += "; " + strategy
+                return
+        self.degraded.append({"stage": stage, "strategy": strategy,
+                              "at_ms": round(self.elapsed_ms(), 1)})
+
+def allows(deadline, stage):
+    """True when there is no deadline or it still has room for `stage`."""
+    return deadline is None or deadline.allows(stage)
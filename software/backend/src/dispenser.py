@@ -23,6 +23,15 @@ RED_IND = 2
 BLUE_IND = 3
 YELLOW_IND = 4
 
+# (motor pins, end switch) per base, in the order of the mix proportions
+BASE_PINS = [
+    (WHITE_MOTOR_PINS, WHITE_SWITCH_PIN),
+    (BLACK_MOTOR_PINS, BLACK_SWITCH_PIN),
+    (RED_MOTOR_PINS, RED_SWITCH_PIN),
+    (BLUE_MOTOR_PINS, BLUE_SWITCH_PIN),
+    (YELLOW_MOTOR_PINS, YELLOW_SWITCH_PIN),
+]
+
 DISPENSE_SEQUENCE = [
     [1, 0, 0, 1],
     [0, 0, 0, 1],
@@ -46,6 +55,7 @@ EXTRACT_SEQUENCE = [
 
 STEPS_5ML = 825
 DELAY = 0.001
+BASE_INTERVAL = 5   # seconds between two bases in dispense_all
 
 def initialize_motor(motor_pins, chip):
     for mp in motor_pins:
@@ -54,10 +64,34 @@ def initialize_motor(motor_pins, chip):
 def initialize_switch(switch_pin, chip):
     lgpio.gpio_claim_input(chip, switch_pin, lgpio.SET_PULL_UP)
 
-def calculate_steps(lab_code):
-    prop = ltm.proportion_calculation(lab_code)
+def calculate_proportions(lab_code, profile=None):
+    # profile: calibration profile of this kiosk's pigment batch (default: constants)
+    if profile is None:
+        return ltm.proportion_calculation(lab_code)
+    return ltm.proportion_calculation(lab_code, profile.base_labs, profile.mix_gram)
+
+def proportions_to_steps(prop):
     return np.round(STEPS_5ML * prop).astype(int)
 
+def calculate_steps(lab_code, profile=None):
+    return proportions_to_steps(calculate_proportions(lab_code, profile))
+
+def estimate_duration(steps):
+    """Seconds dispense_all(steps) takes: its half-step sleeps and the pauses
+    between bases (the GPIO writes add a little on top)."""
+    return float(np.sum(steps)) * len(DISPENSE_SEQUENCE) * DELAY + (len(steps) - 1) * BASE_INTERVAL
+
+def plan_dispense(lab_code, profile=None):
+    """Everything /dispense needs for `lab_code`, JSON-ready."""
+    prop = calculate_proportions(lab_code, profile)
+    steps = proportions_to_steps(prop)
+    return {
+        "lab": np.asarray(lab_code, dtype=float).tolist(),
+        "proportions": prop.tolist(),
+        "steps": steps.tolist(),
+        "duration_s": round(estimate_duration(steps), 1),
+    }
+
 def disable_motors(motor_pins, chip):
     for mp in motor_pins:
         lgpio.gpio_write(chip, mp, 0)
@@ -85,4 +119,11 @@ def extract_foundation(motor_pins, steps, chip):
             for pin in range(4):
                 lgpio.gpio_write(chip, motor_pins[pin], halfstep[pin])
             time.sleep(DELAY)
-    disable_motors(motor_pins, chip)
\ No newline at end of file
+    disable_motors(motor_pins, chip)
+
+def dispense_all(steps, chip):
+    """Dispense steps[k] of every base in turn, BASE_INTERVAL apart."""
+    for k, (motor_pins, switch_pin) in enumerate(BASE_PINS):
+        if k:
+            time.sleep(BASE_INTERVAL)
+        dispense_foundation(motor_pins, switch_pin, int(steps[k]), chip)
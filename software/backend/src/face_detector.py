@@ -0,0 +1,205 @@
+import cv2
+import numpy as np
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Get the absolute path to the cascade file relative to this script
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CASCADE_PATH = os.path.join(SCRIPT_DIR, '..', 'data', 'haarcascade_frontalface_default.xml')
+CASCADE_PATH = os.path.abspath(CASCADE_PATH)
+
+# ---------- CASCADE REGISTRY ----------
+# CascadeClassifier is not safe to share between threads, and parsing the XML
+# is the expensive part. The XML is read once per process; parsed classifiers
+# are handed out one per concurrent caller and returned to an idle pool, so
+# short-lived request threads reuse them instead of re-parsing every time.
+
+_registry_lock = threading.Lock()
+_cascade_xml = {}     # path -> XML text
+_idle_cascades = {}   # path -> [CascadeClassifier, ...]
+
+def _read_cascade_xml(path):
+    with _registry_lock:
+        xml = _cascade_xml.get(path)
+        if xml is None:
+            with open(path, 'r') as f:
+                xml = f.read()
+            _cascade_xml[path] = xml
+    return xml
+
+def _parse_cascade(path):
+    try:
+        xml = _read_cascade_xml(path)
+    except OSError:
+        return cv2.CascadeClassifier()
+    fs = cv2.FileStorage(xml, cv2.FILE_STORAGE_READ | cv2.FILE_STORAGE_MEMORY)
+    cascade = cv2.CascadeClassifier()
+    if not cascade.read(fs.getFirstTopLevelNode()):
+        # old-style cascades can only be loaded from a file
+        cascade = cv2.CascadeClassifier(path)
+    fs.release()
+    return cascade
+
+@contextmanager
+def borrow_cascade(path=CASCADE_PATH):
+    """Check out a classifier for `path` for exclusive use by the calling thread."""
+    path = os.path.abspath(path)
+    with _registry_lock:
+        idle = _idle_cascades.setdefault(path, [])
+        cascade = idle.pop() if idle else None
+    if cascade is None:
+        cascade = _parse_cascade(path)
+    try:
+        yield cascade
+    finally:
+        if not cascade.empty():
+            with _registry_lock:
+                _idle_cascades[path].append(cascade)
+
+def preload_cascade(path=CASCADE_PATH, instances=1):
+    """Parse `instances` classifiers up front so the first callers find them idle."""
+    path = os.path.abspath(path)
+    cascades = [_parse_cascade(path) for _ in range(instances)]
+    with _registry_lock:
+        _idle_cascades.setdefault(path, []).extend(c for c in cascades if not c.empty())
+    return all(not c.empty() for c in cascades)
+
+# ---------- WARMUP ----------
+
+def warmup(path=CASCADE_PATH, size=(480, 640)):
+    """Parse the cascade and push a synthetic frame through the same OpenCV /
+    numpy calls a real request makes. Returns elapsed milliseconds."""
+    t0 = time.perf_counter()
+    preload_cascade(path)
+
+    h, w = size
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+    cv2.circle(frame, (w // 2, h // 3), min(h, w) // 5, (150, 170, 200), -1)
+
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    _, thresh = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, np.ones((5, 5), np.uint8), iterations=2)
+    with borrow_cascade(path) as cascade:
+        cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(80, 80))
+
+    # first BLAS / LAPACK calls (lighting correction path)
+    np.linalg.pinv(rng.random((24, 3))) @ rng.random((24, 3))
+    np.linalg.inv(np.eye(3) + rng.random((3, 3)))
+
+    return (time.perf_counter() - t0) * 1000.0
+
+# ---------- DETECTION ----------
+
+def detect_faces(gray, path=CASCADE_PATH, scaleFactor=1.1, minNeighbors=5, minSize=(80, 80),
+                 maxSize=None):
+    """Run the cascade on a grayscale frame. Returns None if the cascade failed to load."""
+    with borrow_cascade(path) as cascade:
+        if cascade.empty():
+            print("Error: Could not load Haar cascade XML file.")
+            return None
+        if maxSize is None:
+            return cascade.detectMultiScale(gray, scaleFactor=scaleFactor,
+                                            minNeighbors=minNeighbors, minSize=minSize)
+        return cascade.detectMultiScale(gray, scaleFactor=scaleFactor, minNeighbors=minNeighbors,
+                                        minSize=minSize, maxSize=maxSize)
+
+def iou(a, b):
+    """Intersection over union of two (x, y, w, h) boxes; NaN if both are None."""
+    if a is None or b is None:
+        return float('nan') if a is None and b is None else 0.0
+    ax0, ay0, aw, ah = a
+    bx0, by0, bw, bh = b
+    ix = max(0, min(ax0 + aw, bx0 + bw) - max(ax0, bx0))
+    iy = max(0, min(ay0 + ah, by0 + bh) - max(ay0, by0))
+    inter = ix * iy
+    return inter / float(aw * ah + bw * bh - inter)
+
+# ---------- COARSE-TO-FINE ----------
+# "pyramid": detect on a small copy, then re-detect only inside a padded ROI at
+# full resolution. "coarse": the small-copy pass only (deadline fallback).
+# "exhaustive": the original full-frame search, kept for A/B runs.
+FACE_DETECT_MODE = os.environ.get("FACE_DETECT_MODE", "pyramid")
+
+COARSE_LONG_EDGE = 320
+MIN_FACE_FRACTION = 0.12   # of the short image edge
+MAX_FACE_FRACTION = 0.95
+ROI_PADDING = 0.35         # of the coarse face size, on each side
+# A coarse hit only has to be good enough to aim the refinement pass; a box that
+# is returned as the answer gets the full search's minNeighbors
+COARSE_MIN_NEIGHBORS = 3
+MIN_NEIGHBORS = 5
+
+def face_size_limits(shape, min_px=20):
+    """(minSize, maxSize) for detectMultiScale derived from the frame size."""
+    short_edge = min(shape[:2])
+    lo = max(min_px, int(MIN_FACE_FRACTION * short_edge))
+    hi = max(lo + 1, int(MAX_FACE_FRACTION * short_edge))
+    return (lo, lo), (hi, hi)
+
+def _largest(faces):
+    if faces is None or len(faces) == 0:
+        return None
+    return max((tuple(int(v) for v in f) for f in faces), key=lambda f: f[2] * f[3])
+
+def coarse_face(gray, path=CASCADE_PATH, final=False):
+    """Largest face on a COARSE_LONG_EDGE copy of `gray`, as float (x, y, w, h)
+    in `gray` coordinates, or None. Cheap enough to run before anything else.
+    `final`: no refinement pass follows (also implied for frames that small)."""
+    H, W = gray.shape[:2]
+    scale = min(1.0, COARSE_LONG_EDGE / max(H, W))
+    small = gray if scale == 1.0 else cv2.resize(
+        gray, (max(1, round(W * scale)), max(1, round(H * scale))), interpolation=cv2.INTER_AREA)
+
+    min_size, max_size = face_size_limits(small.shape)
+    neighbors = MIN_NEIGHBORS if final or scale == 1.0 else COARSE_MIN_NEIGHBORS
+    coarse = _largest(detect_faces(small, path, scaleFactor=1.1, minNeighbors=neighbors,
+                                   minSize=min_size, maxSize=max_size))
+    if coarse is None:
+        return None
+    return tuple(v / scale for v in coarse)
+
+def face_roi(coarse, shape):
+    """Padded search window (x0, y0, x1, y1) around a coarse face box: the part
+    of the frame the face claims."""
+    H, W = shape[:2]
+    cx, cy, cw, ch = coarse
+    pad = ROI_PADDING * max(cw, ch)
+    return (max(0, int(cx - pad)), max(0, int(cy - pad)),
+            min(W, int(cx + cw + pad)), min(H, int(cy + ch + pad)))
+
+def refine_face(gray, coarse, path=CASCADE_PATH):
+    """Re-detect inside face_roi(coarse) at full resolution, sizes bracketed by
+    the coarse hit. Falls back to the coarse box."""
+    cx, cy, cw, ch = coarse
+    x0, y0, x1, y1 = face_roi(coarse, gray.shape)
+    roi = gray[y0:y1, x0:x1]
+    lo, hi = int(0.7 * min(cw, ch)), int(1.4 * max(cw, ch))
+    fine = _largest(detect_faces(roi, path, scaleFactor=1.1, minNeighbors=MIN_NEIGHBORS,
+                                 minSize=(lo, lo), maxSize=(hi, hi)))
+    if fine is None:
+        # the coarse hit is still a usable box
+        return int(cx), int(cy), int(cw), int(ch)
+    fx, fy, fw, fh = fine
+    return fx + x0, fy + y0, fw, fh
+
+def locate_face(gray, mode=None, path=CASCADE_PATH, coarse=None):
+    """Largest face (x, y, w, h) in a grayscale frame, or None. A `coarse` box
+    from coarse_face() skips the coarse pass."""
+    mode = mode or FACE_DETECT_MODE
+    if mode == "exhaustive":
+        return _largest(detect_faces(gray, path, scaleFactor=1.1, minNeighbors=MIN_NEIGHBORS,
+                                     minSize=(80, 80)))
+    if mode not in ("pyramid", "coarse"):
+        raise ValueError("Unknown face detection mode: %s" % mode)
+
+    if coarse is None:
+        coarse = coarse_face(gray, path, final=mode == "coarse")
+    if coarse is None:
+        return None
+    if mode == "coarse" or COARSE_LONG_EDGE >= max(gray.shape[:2]):
+        return tuple(int(v) for v in coarse)
+    return refine_face(gray, coarse, path)
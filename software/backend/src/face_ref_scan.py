@@ -2,6 +2,9 @@ import cv2
 import numpy as np
 import os
 
+from .face_detector import detect_faces
+from .frame_grabber import FrameGrabber
+
 # Get the absolute path to the cascade file relative to this script
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 CASCADE_PATH = os.path.join(SCRIPT_DIR, '..', 'data', 'haarcascade_frontalface_default.xml')
@@ -11,10 +14,9 @@ CASCADE_PATH = os.path.abspath(CASCADE_PATH)
 # ---------- LIVE FEED: CAPTURE FRAME WHEN SHEET IN BOX ----------
 
 def capture_frame_with_sheet_box():
-   
-    cap = cv2.VideoCapture(0)
-    if not cap.isOpened():
-        print("Error: Could not open camera.")
+    # frames are read on the grabber's thread; each pass works on the newest one
+    grabber = FrameGrabber(0)
+    if not grabber.start():
         return None, None
 
     captured = None
@@ -24,11 +26,12 @@ def capture_frame_with_sheet_box():
     STABLE_NEEDED = 10  
 
     while True:
-        ret, frame = cap.read()
+        latest = grabber.latest(timeout=2.0)
 
-        if not ret:
+        if latest is None:
             print("Error: Failed to read frame.")
             break
+        frame = latest.image
 
         display = cv2.flip(frame, 1)
         h, w, _ = frame.shape
@@ -64,7 +67,7 @@ def capture_frame_with_sheet_box():
                         cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 1)
             cv2.imshow("Live feed", display)
 
-            captured = frame.copy()
+            captured = frame
             box_coords = (x1, y1, x2, y2)
             break
 
@@ -74,11 +77,13 @@ def capture_frame_with_sheet_box():
         cv2.imshow("Live feed", display)
 
         key = cv2.waitKey(1) & 0xFF
+        grabber.done(latest)
         if key == ord('q'):
             break
 
-    cap.release()
+    grabber.stop()
     cv2.destroyAllWindows()
+    print("Capture stats:", grabber.stats())
     return captured, box_coords
 
 
@@ -125,19 +130,15 @@ def define_face(img):
         return
 
     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    face_cascade = cv2.CascadeClassifier(CASCADE_PATH)
-    if face_cascade.empty():
-        print("Error: Could not load Haar cascade XML file.")
-        return
-    else:
-        print("Cascade loaded successfully!")
-
-    faces = face_cascade.detectMultiScale(
+    faces = detect_faces(
         gray,
+        CASCADE_PATH,
         scaleFactor=1.1,
         minNeighbors=5,
         minSize=(80, 80)
     )
+    if faces is None:
+        return
     if len(faces) == 0:
         print("No faces detected.")
         return
@@ -1,73 +1,173 @@
 import cv2
 import numpy as np
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 
+from .chart_locator import CHART_LOCATOR, locate_chart_features, looks_like_chart
+from .deadline import allows
+from .face_detector import FACE_DETECT_MODE, coarse_face, face_roi, locate_face
+from .frame_context import context_for
+from .image_io import ANALYSIS_LONG_EDGE, load_image_for_analysis, to_original_box
+from .quality_gate import QUALITY_GATE, require_encoded_size, require_quality
+
 # Get the absolute path to the cascade file relative to this script
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 CASCADE_PATH = os.path.join(SCRIPT_DIR, '..', 'data', 'haarcascade_frontalface_default.xml')
 CASCADE_PATH = os.path.abspath(CASCADE_PATH)
 
+# Analysis resolution used when a request deadline is about to run out
+DEGRADED_LONG_EDGE = 640
+# ... and the scale of the chart corner search inside the sheet (corners within
+# ~2 px, patch means within ~1.5 codes on the test photos, 2-3x faster)
+DEGRADED_CHART_SCALE = 0.5
+
+# Face refinement and chart localization run side by side on this many threads
+# (the OpenCV calls involved release the GIL). 1 = one after the other, which
+# is faster on a single core.
+DETECT_THREADS = int(os.environ.get("DETECT_THREADS", 2 if (os.cpu_count() or 1) > 1 else 1))
+
+_detect_lock = threading.Lock()
+_detect_pool = None
+_detect_pool_pid = None
+
+def _detect_executor():
+    global _detect_pool, _detect_pool_pid
+    with _detect_lock:
+        # threads do not survive a fork, so every analysis worker builds its own
+        if _detect_pool is None or _detect_pool_pid != os.getpid():
+            _detect_pool = ThreadPoolExecutor(max_workers=DETECT_THREADS - 1,
+                                              thread_name_prefix="detect")
+            _detect_pool_pid = os.getpid()
+        return _detect_pool
+
+def run_side_by_side(*tasks):
+    """Run zero-argument callables concurrently, the first one on the calling
+    thread. Returns their results in order."""
+    if DETECT_THREADS <= 1 or len(tasks) < 2:
+        return [task() for task in tasks]
+    futures = [_detect_executor().submit(task) for task in tasks[1:]]
+    first = tasks[0]()
+    return [first] + [f.result() for f in futures]
+
+def _without(mask, exclude, origin=(0, 0)):
+    """`mask` with the (x0, y0, x1, y1) boxes in `exclude` cleared, on a copy.
+    Boxes are in frame coordinates; `origin` is where `mask` sits in the frame."""
+    if not exclude:
+        return mask
+    mask = mask.copy()
+    ox, oy = origin
+    for x0, y0, x1, y1 in exclude:
+        mask[max(0, y0 - oy):max(0, y1 - oy), max(0, x0 - ox):max(0, x1 - ox)] = 0
+    return mask
+
+def box_stats(img, boxes):
+    """Per-channel mean and variance, and pixel count, of `img` inside each
+    (x1, y1, x2, y2) row of `boxes`: one integral-image pass, then four
+    lookups per box."""
+    x1, y1, x2, y2 = np.asarray(boxes).T
+    sums, sq_sums = cv2.integral2(img, sdepth=cv2.CV_64F, sqdepth=cv2.CV_64F)
+
+    def box_sum(table):
+        return table[y2, x2] - table[y1, x2] - table[y2, x1] + table[y1, x1]
+
+    counts = (y2 - y1) * (x2 - x1)
+    safe = np.maximum(counts, 1)[:, None]
+    means = box_sum(sums) / safe
+    variances = np.maximum(box_sum(sq_sums) / safe - means ** 2, 0.0)
+    return means, variances, counts
+
 # ---------- SHEET DETECTION ----------
 
-def detect_sheet_presence(roi):
+def detect_sheet_presence(roi, ctx=None):
     if roi is None or roi.size == 0:
         return False
 
-    gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
-    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-    _, thresh = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-
-    kernel = np.ones((5, 5), np.uint8)
-    closed = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel, iterations=2)
-    closed = cv2.dilate(closed, kernel, iterations=1)
-
-    contours, _ = cv2.findContours(closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    ctx = context_for(roi, ctx)
+    contours, _ = cv2.findContours(ctx.sheet_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     if not contours:
         return False
 
-    roi_h, roi_w = gray.shape
+    roi_h, roi_w = roi.shape[:2]
     roi_area = roi_h * roi_w
     best_area = max([cv2.contourArea(c) for c in contours])
     return best_area > 0.25 * roi_area
 
 # ---------- FACE DETECTION & SKIN REGIONS ----------
 
-def define_face(img, show_windows=False):
+def define_face(img, show_windows=False, scale=1.0, mode=None, ctx=None, coarse=None):
+    """`mode` picks the face search: "pyramid" (coarse-to-fine) or "exhaustive".
+    `coarse` is an already found coarse_face() box to refine."""
     if img is None:
         print("define_face: no image passed in.")
         return None
 
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    face_cascade = cv2.CascadeClassifier(CASCADE_PATH)
-    if face_cascade.empty():
-        print("Error: Could not load Haar cascade XML file.")
-        return None
-
-    faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(80, 80))
-    if len(faces) == 0:
+    box = locate_face(context_for(img, ctx).gray, mode=mode, path=CASCADE_PATH, coarse=coarse)
+    if box is None:
         print("No faces detected.")
         return None
 
-    faces = list(faces)
-    faces.sort(key=lambda f: f[2] * f[3], reverse=True)
-    (x, y, w, h) = faces[0]
-    print("Face box:", x, y, w, h)
+    (x, y, w, h) = box
+    source_box = to_original_box((x, y, w, h), scale)
+    print("Face box:", *source_box)
 
     if show_windows:
+        # drawn on the analysis-resolution frame; the label is the source-pixel box
         face_dbg = img.copy()
         cv2.rectangle(face_dbg, (x, y), (x + w, y + h), (0, 255, 0), 2)
+        cv2.putText(face_dbg, "%d %d %d %d" % tuple(source_box), (x, max(12, y - 6)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
         cv2.imshow("Detected Face", face_dbg)
 
     face = img[y:y + h, x:x + w]
     return face
 
-def sample_skin_regions(face):
+# Skin regions as fractions of the face box: (x1, y1, x2, y2), point samples
+SKIN_REGIONS = (
+    ("forehead",    (0.25, 0.05, 0.75, 0.25), 2),
+    ("nose",        (0.40, 0.35, 0.60, 0.65), 2),
+    ("left_cheek",  (0.10, 0.45, 0.35, 0.75), 3),
+    ("right_cheek", (0.65, 0.45, 0.90, 0.75), 3),
+)
+
+# "dense": every pixel of every region, "points": the original 10 single pixels
+SKIN_SAMPLING = os.environ.get("SKIN_SAMPLING", "dense")
+
+def skin_region_boxes(face_shape):
+    """Pixel (x1, y1, x2, y2) of every skin region, one row per SKIN_REGIONS entry."""
+    h, w = face_shape[:2]
+    return np.array([(int(fx1 * w), int(fy1 * h), int(fx2 * w), int(fy2 * h))
+                     for _, (fx1, fy1, fx2, fy2), _ in SKIN_REGIONS], dtype=np.intp)
+
+def skin_region_stats(face):
+    """RGB mean, pixel count and variance of every skin region, O(1) per
+    region regardless of its size (box_stats)."""
+    if face is None or face.size == 0:
+        return None
+
+    means, variances, counts = box_stats(face, skin_region_boxes(face.shape))
+    return {
+        "regions": [name for name, _, _ in SKIN_REGIONS],
+        "means": means[:, ::-1],          # BGR → RGB
+        "counts": counts,
+        "variances": variances[:, ::-1],
+    }
+
+def sample_skin_regions(face, mode=None):
     if face is None or face.size == 0:
         print("No face ROI passed to sample_skin_regions.")
         return np.array([])
 
-    h, w, _ = face.shape
+    mode = mode or SKIN_SAMPLING
+    boxes = skin_region_boxes(face.shape)
+
+    if mode == "dense":
+        # every pixel, for the per-pixel filtering and median downstream;
+        # skin_region_stats gives per-region summaries without the copy
+        return np.concatenate([face[y1:y2, x1:x2].reshape(-1, 3)
+                               for x1, y1, x2, y2 in boxes])[:, ::-1]  # BGR → RGB
+
     samples = []
 
     def region_mean(x1, y1, x2, y2, n_samples=1):
@@ -80,25 +180,9 @@ def sample_skin_regions(face):
             rgb_points.append(sub[cy, cx, ::-1])  # BGR → RGB
         return np.array(rgb_points)
 
-    # Forehead (2 samples)
-    fh_y1, fh_y2 = int(0.05 * h), int(0.25 * h)
-    fh_x1, fh_x2 = int(0.25 * w), int(0.75 * w)
-    samples.append(region_mean(fh_x1, fh_y1, fh_x2, fh_y2, n_samples=2))
-
-    # Nose (2 samples)
-    ns_y1, ns_y2 = int(0.35 * h), int(0.65 * h)
-    ns_x1, ns_x2 = int(0.40 * w), int(0.60 * w)
-    samples.append(region_mean(ns_x1, ns_y1, ns_x2, ns_y2, n_samples=2))
-
-    # Left cheek (3 samples)
-    lc_y1, lc_y2 = int(0.45 * h), int(0.75 * h)
-    lc_x1, lc_x2 = int(0.10 * w), int(0.35 * w)
-    samples.append(region_mean(lc_x1, lc_y1, lc_x2, lc_y2, n_samples=3))
-
-    # Right cheek (3 samples)
-    rc_y1, rc_y2 = int(0.45 * h), int(0.75 * h)
-    rc_x1, rc_x2 = int(0.65 * w), int(0.90 * w)
-    samples.append(region_mean(rc_x1, rc_y1, rc_x2, rc_y2, n_samples=3))
+    # Forehead (2), nose (2), left cheek (3), right cheek (3) samples
+    for (x1, y1, x2, y2), (_, _, n_samples) in zip(boxes, SKIN_REGIONS):
+        samples.append(region_mean(x1, y1, x2, y2, n_samples=n_samples))
 
     all_samples = np.vstack(samples)
     print("Skin RGB samples:\n", all_samples)
@@ -106,108 +190,245 @@ def sample_skin_regions(face):
 
 # ---------- SHEET / MACBETH PROCESSING ----------
 
-def detect_sheet(img):
+def detect_sheet(img, ctx=None, exclude=()):
+    """Largest blob as the sheet, ignoring the `exclude` boxes (e.g. the face)."""
     if img is None:
         return img, None
 
-    orig = img.copy()
-    gray = cv2.cvtColor(orig, cv2.COLOR_BGR2GRAY)
-    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-    _, thresh = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    ctx = context_for(img, ctx)
+    mask = _without(ctx.sheet_mask, exclude, ctx.origin)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return img, None
 
-    kernel = np.ones((5, 5), np.uint8)
-    closed = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel, iterations=2)
-    closed = cv2.dilate(closed, kernel, iterations=1)
+    sheet_contour = max(contours, key=cv2.contourArea)
+    return img, sheet_contour
 
-    contours, _ = cv2.findContours(closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+def _chart_contour(sheet_roi, ctx=None, exclude=()):
+    ctx = context_for(sheet_roi, ctx)
+    mask = _without(ctx.chart_mask, exclude, ctx.origin)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     if not contours:
-        return orig, None
+        return None
+    return max(contours, key=cv2.contourArea)
 
-    sheet_contour = max(contours, key=cv2.contourArea)
-    return orig, sheet_contour
+def crop_to_chart_only(sheet_roi, debug=False, ctx=None):
+    if sheet_roi is None:
+        return None
+
+    chart_cnt = _chart_contour(sheet_roi, ctx)
+    if chart_cnt is None:
+        return sheet_roi
 
-def crop_to_chart_only(sheet_roi, debug=False):
+    x, y, w, h = cv2.boundingRect(chart_cnt)
+    return sheet_roi[y:y + h, x:x + w]
+
+def order_corners(pts):
+    """Four points as float32 top-left, top-right, bottom-right, bottom-left."""
+    pts = np.asarray(pts, dtype=np.float32).reshape(4, 2)
+    s = pts.sum(axis=1)
+    d = np.diff(pts, axis=1).ravel()  # y - x
+    return np.array([pts[np.argmin(s)], pts[np.argmin(d)],
+                     pts[np.argmax(s)], pts[np.argmax(d)]], dtype=np.float32)
+
+def locate_chart(sheet_roi, ctx=None, exclude=()):
+    """Corners (TL, TR, BR, BL) of the chart inside `sheet_roi`, or the corners
+    of the whole ROI if no chart blob is found. `exclude` as for detect_sheet."""
     if sheet_roi is None:
         return None
 
-    orig = sheet_roi.copy()
-    gray = cv2.cvtColor(orig, cv2.COLOR_BGR2GRAY)
-    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-    _, thresh = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    if np.mean(gray[thresh == 255]) > np.mean(gray[thresh == 0]):
-        thresh = 255 - thresh
+    chart_cnt = _chart_contour(sheet_roi, ctx, exclude)
+    if chart_cnt is None:
+        h, w = sheet_roi.shape[:2]
+        return order_corners([(0, 0), (w, 0), (w, h), (0, h)])
+
+    quad = cv2.approxPolyDP(chart_cnt, 0.02 * cv2.arcLength(chart_cnt, True), True)
+    if len(quad) != 4:
+        # rounded or partly occluded outline: fall back to its rotated bounding box
+        quad = cv2.boxPoints(cv2.minAreaRect(chart_cnt))
+    return order_corners(quad)
+
+# Size of the rectified chart: 6 x 4 cells of 100 px
+CHART_WARP_SIZE = (600, 400)
+
+def rectify_chart(img, corners, size=CHART_WARP_SIZE):
+    """Warp the quadrilateral `corners` of `img` to an upright `size` (w, h) image."""
+    w, h = size
+    target = np.array([(0, 0), (w, 0), (w, h), (0, h)], dtype=np.float32)
+    M = cv2.getPerspectiveTransform(np.asarray(corners, dtype=np.float32), target)
+    return cv2.warpPerspective(img, M, (w, h), flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+
+def macbeth_patch_boxes(shape, rows=4, cols=6, outer_margin=0.08, inner_margin=0.08):
+    """Pixel (x1, y1, x2, y2) of the trimmed patch cells, row-major."""
+    H, W = shape[:2]
+    x0, x1 = int(outer_margin * W), int((1.0 - outer_margin) * W)
+    y0, y1 = int(outer_margin * H), int((1.0 - outer_margin) * H)
+    patch_h = (y1 - y0) // rows
+    patch_w = (x1 - x0) // cols
+    inner_h_margin = int(patch_h * inner_margin)
+    inner_w_margin = int(patch_w * inner_margin)
 
-    kernel = np.ones((5, 5), np.uint8)
-    mask = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel, iterations=2)
+    r, c = np.divmod(np.arange(rows * cols), cols)
+    return np.stack([x0 + c * patch_w + inner_w_margin,
+                     y0 + r * patch_h + inner_h_margin,
+                     x0 + (c + 1) * patch_w - inner_w_margin,
+                     y0 + (r + 1) * patch_h - inner_h_margin], axis=1)
 
-    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    if not contours:
-        return sheet_roi
+def macbeth_patch_stats(warped, rows=4, cols=6, outer_margin=0.08, inner_margin=0.08):
+    """BGR mean, variance and pixel count of every patch of a rectified chart
+    (box_stats). A high variance flags a patch with glare or an edge in it."""
+    if warped is None or warped.size == 0:
+        return None
 
-    chart_cnt = max(contours, key=cv2.contourArea)
-    x, y, w, h = cv2.boundingRect(chart_cnt)
-    chart_only = orig[y:y + h, x:x + w]
-    return chart_only
+    boxes = macbeth_patch_boxes(warped.shape, rows, cols, outer_margin, inner_margin)
+    means, variances, counts = box_stats(warped, boxes)
+    return {"means": means, "variances": variances, "counts": counts, "boxes": boxes}
 
 def extract_macbeth_patches(warped, rows=4, cols=6, outer_margin=0.08, inner_margin=0.08, debug=False):
     if warped is None:
         return []
 
-    H, W, _ = warped.shape
-    x0, x1 = int(outer_margin * W), int((1.0 - outer_margin) * W)
-    y0, y1 = int(outer_margin * H), int((1.0 - outer_margin) * H)
-    chart = warped[y0:y1, x0:x1].copy()
-    ch, cw, _ = chart.shape
+    stats = macbeth_patch_stats(warped, rows, cols, outer_margin, inner_margin)
+    return [{
+        "index": k + 1,
+        "row": k // cols + 1,
+        "col": k % cols + 1,
+        "mean_bgr": stats["means"][k],
+        "var_bgr": stats["variances"][k],
+    } for k in range(rows * cols)]
 
-    patch_h = ch // rows
-    patch_w = cw // cols
-    inner_h_margin = int(patch_h * inner_margin)
-    inner_w_margin = int(patch_w * inner_margin)
+# ---------- IMAGE ANALYSIS ENTRY POINT ----------
 
-    patches = []
-    for r in range(rows):
-        for c in range(cols):
-            py0 = r * patch_h + inner_h_margin
-            py1 = (r + 1) * patch_h - inner_h_margin
-            px0 = c * patch_w + inner_w_margin
-            px1 = (c + 1) * patch_w - inner_w_margin
-            patch = chart[py0:py1, px0:px1]
-            mean_bgr = patch.mean(axis=(0, 1))
-            patches.append({
-                "index": r * cols + c + 1,
-                "row": r + 1,
-                "col": c + 1,
-                "mean_bgr": mean_bgr
-            })
-    return patches
+def analyze_image(image, long_edge=ANALYSIS_LONG_EDGE, deadline=None):
+    """Analyze a static image instead of live feed.
 
-# ---------- IMAGE ANALYSIS ENTRY POINT ----------
+    `image` may be a path, raw encoded bytes / buffer, or a decoded BGR array.
+    It is decoded / resampled to `long_edge` px first (None = full resolution),
+    then has to pass the quality gate (raises quality_gate.ImageRejected).
+    With a `deadline`, stages fall back to cheaper variants as the budget runs out."""
+    if not allows(deadline, "decode") and (long_edge is None or long_edge > DEGRADED_LONG_EDGE):
+        long_edge = DEGRADED_LONG_EDGE
+        deadline.degrade("decode", "%dpx analysis resolution" % DEGRADED_LONG_EDGE)
+
+    # an upload that is too small is turned away from its header, before decoding
+    if QUALITY_GATE and isinstance(image, (bytes, bytearray, memoryview)):
+        require_encoded_size(image)
 
-def analyze_image(image_path):
-    """Analyze a static image instead of live feed."""
-    img = cv2.imread(image_path)
+    img, scale, source_size = load_image_for_analysis(image, long_edge)
     if img is None:
         print("Failed to load image.")
         return None, None
 
-    face_roi = define_face(img)
-    if face_roi is None:
-        print("No face detected.")
-        return None, None
-
-    skin_rgb = sample_skin_regions(face_roi)
-
-    # Assume the Macbeth sheet is the largest contour in the image
-    _, sheet_contour = detect_sheet(img)
+    # a few ms on a thumbnail, instead of running detection on a photo that
+    # has to be retaken anyway
+    if QUALITY_GATE:
+        require_quality(img, source_size)
+
+    return analyze_frame(img, scale=scale, deadline=deadline)
+
+def _locate_chart_coarse(sheet_ctx, exclude=(), factor=DEGRADED_CHART_SCALE):
+    """locate_chart on the sheet crop downscaled by `factor`, corners mapped
+    back to the crop's coordinates."""
+    small = cv2.resize(sheet_ctx.img, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+    ox, oy = sheet_ctx.origin
+    small_exclude = [tuple(int((v - o) * factor) for v, o in zip(box, (ox, oy, ox, oy))) for box in exclude]
+    return locate_chart(small, exclude=small_exclude) / np.float32(factor)
+
+def _locate_chart_contour(img, ctx, deadline, exclude=()):
+    """Chart corners in frame coordinates: largest contour as the sheet, then
+    the chart blob inside its bounding box. None if there is no sheet."""
+    # Assume the Macbeth sheet is the largest contour in the image; the chart
+    # search then runs on a view of the sheet's bounding box
+    with ctx.timed("sheet"):
+        _, sheet_contour = detect_sheet(img, ctx=ctx, exclude=exclude)
     if sheet_contour is None:
         print("No sheet detected.")
-        return skin_rgb, None
+        return None
     print("Sheet contour detected.")
+    sheet_ctx = ctx.crop(*cv2.boundingRect(sheet_contour))
+
+    with ctx.timed("chart"):
+        if allows(deadline, "chart_corners"):
+            corners = locate_chart(sheet_ctx.img, ctx=sheet_ctx, exclude=exclude)
+        else:
+            deadline.degrade("chart", "chart corners at %g x resolution" % DEGRADED_CHART_SCALE)
+            corners = _locate_chart_coarse(sheet_ctx, exclude)
+    return corners + np.float32(sheet_ctx.origin)
+
+def _chart_patch_stats(img, corners, ctx):
+    with ctx.timed("patches"):
+        chart = rectify_chart(img, corners)
+        return macbeth_patch_stats(chart, outer_margin=0.08, inner_margin=0.05)
+
+def _locate_chart(img, ctx, deadline, exclude=()):
+    """(corners, patch stats) of the chart per CHART_LOCATOR, (None, None) if not found."""
+    mode = CHART_LOCATOR
+    corners, stats = None, None
+    if mode in ("contour", "auto"):
+        corners = _locate_chart_contour(img, ctx, deadline, exclude)
+        if corners is not None:
+            stats = _chart_patch_stats(img, corners, ctx)
+
+    # keypoint matching when asked for, or when the contour path found something
+    # that is not a chart (wrong blob in a cluttered scene)
+    if mode == "features" or (mode == "auto" and not looks_like_chart(corners, stats, img.shape)):
+        # a rejected contour is never the answer, even if matching is skipped or fails
+        corners, stats = None, None
+        if allows(deadline, "chart_features"):
+            with ctx.timed("chart_features"):
+                matched = locate_chart_features(img, exclude=exclude)
+            if matched is not None:
+                print("Chart matched against reference.")
+                corners, stats = matched, _chart_patch_stats(img, matched, ctx)
+        else:
+            deadline.degrade("chart", "skipped reference chart matching")
+    return corners, stats
+
+def analyze_frame(img, scale=1.0, deadline=None, ctx=None):
+    """Analyze an already decoded BGR frame. `scale` is frame px per source px,
+    only used to report boxes in source coordinates. Pass a FrameContext as `ctx`
+    to read back its per-stage `timings`."""
+    ctx = context_for(img, ctx)
+    mode = None
+    if not allows(deadline, "face_refine"):
+        mode = "coarse"
+        deadline.degrade("face", "coarse detection only")
+
+    # The coarse face pass is cheap. It claims the face's part of the frame, the
+    # chart search skips that part and the face refinement looks nowhere else,
+    # so the two can then run side by side on disjoint regions.
+    gray = ctx.gray  # shared by both threads, computed before they start
+    coarse, claimed = None, ()
+    if (mode or FACE_DETECT_MODE) != "exhaustive":
+        with ctx.timed("face_coarse"):
+            coarse = coarse_face(gray, CASCADE_PATH, final=mode == "coarse")
+        if coarse is None:
+            print("No face detected.")
+            return None, None
+        claimed = (face_roi(coarse, img.shape),)
+
+    def face_task():
+        with ctx.timed("face"):
+            face_roi_img = define_face(img, scale=scale, mode=mode, ctx=ctx, coarse=coarse)
+        if face_roi_img is None:
+            return None
+        with ctx.timed("skin"):
+            return sample_skin_regions(face_roi_img)
+
+    def chart_task():
+        return _locate_chart(img, ctx, deadline, exclude=claimed)
+
+    skin_rgb, (corners, stats) = run_side_by_side(face_task, chart_task)
+    if skin_rgb is None:
+        print("No face detected.")
+        return None, None
+    if stats is None:
+        print("No chart detected.")
+        return skin_rgb, None
 
-    sheet_roi = img  # Could crop to contour if needed
-    chart = crop_to_chart_only(sheet_roi, debug=False)
-    patches = extract_macbeth_patches(chart, outer_margin=0.08, inner_margin=0.05, debug=False)
-    reference_rgb = np.array([p['mean_bgr'][::-1] for p in patches])  # BGR → RGB
+    ctx.results["chart_corners"] = corners
+    ctx.results["patches"] = stats
+    reference_rgb = stats["means"][:, ::-1]  # BGR → RGB
 
     return skin_rgb, reference_rgb
 
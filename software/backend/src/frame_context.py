@@ -0,0 +1,103 @@
+import time
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+MORPH_KERNEL = np.ones((5, 5), np.uint8)
+
+class FrameContext:
+    """Preprocessing intermediates of one BGR frame, shared by every stage.
+
+    Face, sheet and chart detection all start from the same
+    grayscale → blur → Otsu → morphology chain. Each intermediate is computed on
+    first use and reused afterwards. `timings` holds the ms spent per
+    intermediate and per `timed()` stage; stage times include whatever
+    intermediates the stage was first to ask for. `results` collects stage
+    outputs worth inspecting afterwards, e.g. the per-patch chart statistics.
+
+    Not locked: when stages run on several threads, compute the intermediates
+    they share before fanning out."""
+
+    def __init__(self, img, timings=None):
+        self.img = img
+        self.timings = {} if timings is None else timings
+        self.results = {}
+        self.origin = (0, 0)   # top-left of `img` in the original frame
+        self._cache = {}
+
+    def crop(self, x, y, w, h):
+        """Context for the (x, y, w, h) region. The image and any grayscale
+        already computed are views into this context's buffers; thresholds
+        are recomputed, since Otsu depends on the region. Timings accumulate
+        into this context's `timings`."""
+        H, W = self.img.shape[:2]
+        if (x, y, w, h) == (0, 0, W, H):
+            return self
+        child = FrameContext(self.img[y:y + h, x:x + w], self.timings)
+        child.origin = (self.origin[0] + x, self.origin[1] + y)
+        if "gray" in self._cache:
+            child._cache["gray"] = self._cache["gray"][y:y + h, x:x + w]
+        return child
+
+    @contextmanager
+    def timed(self, stage):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            ms = (time.perf_counter() - t0) * 1000.0
+            self.timings[stage] = self.timings.get(stage, 0.0) + ms
+
+    def _lazy(self, name, compute, *inputs):
+        # inputs are evaluated by the caller, so their cost is not billed to `name`
+        if name not in self._cache:
+            with self.timed(name):
+                self._cache[name] = compute(*inputs)
+        return self._cache[name]
+
+    @property
+    def gray(self):
+        return self._lazy("gray", lambda img: cv2.cvtColor(img, cv2.COLOR_BGR2GRAY), self.img)
+
+    @property
+    def blurred(self):
+        return self._lazy("blur", lambda g: cv2.GaussianBlur(g, (5, 5), 0), self.gray)
+
+    @property
+    def otsu(self):
+        """Otsu threshold of the blurred frame (bright side = 255)."""
+        return self._lazy("threshold", lambda b: cv2.threshold(
+            b, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1], self.blurred)
+
+    @property
+    def sheet_mask(self):
+        """Otsu mask closed and dilated: the sheet shows up as the largest blob."""
+        def compute(thresh):
+            closed = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, MORPH_KERNEL, iterations=2)
+            return cv2.dilate(closed, MORPH_KERNEL, dst=closed, iterations=1)
+        return self._lazy("sheet_mask", compute, self.otsu)
+
+    @property
+    def chart_mask(self):
+        """Otsu mask with the darker side as foreground, closed: the chart blob."""
+        def compute(gray, thresh):
+            # compare the mean gray level of both sides without materialising
+            # boolean masks; an empty side never flips the mask
+            n_on = cv2.countNonZero(thresh)
+            n_off = thresh.size - n_on
+            mask = thresh
+            if n_on and n_off:
+                sum_on = cv2.mean(gray, mask=thresh)[0] * n_on
+                sum_off = float(gray.sum(dtype=np.uint64)) - sum_on
+                if sum_on / n_on > sum_off / n_off:
+                    mask = cv2.bitwise_not(thresh)
+            dst = None if mask is thresh else mask
+            return cv2.morphologyEx(mask, cv2.MORPH_CLOSE, MORPH_KERNEL, dst=dst, iterations=2)
+        return self._lazy("chart_mask", compute, self.gray, self.otsu)
+
+def context_for(img, ctx=None):
+    """`ctx` if it was built for `img`, else a fresh context."""
+    if ctx is not None and ctx.img is img:
+        return ctx
+    return FrameContext(img)
@@ -0,0 +1,168 @@
+import os
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+# Live capture: a dedicated thread keeps reading the camera, so however long a
+# consumer spends per frame (sheet detection, imshow) the driver's queue never
+# fills up and what the consumer gets is the newest frame, not one from seconds
+# ago. Frames the consumer was too slow for are dropped, and counted.
+FRAME_BUFFER = int(os.environ.get("FRAME_BUFFER", "2"))   # frames kept
+LATENCY_WINDOW = 256                                      # samples in the latency stats
+
+class Frame:
+    """One camera frame: BGR `image`, `seq` (1, 2, ... per grabber) and
+    `timestamp` (time.monotonic() when the read returned)."""
+    __slots__ = ("image", "seq", "timestamp")
+
+    def __init__(self, image, seq, timestamp):
+        self.image = image
+        self.seq = seq
+        self.timestamp = timestamp
+
+    def age_ms(self, now=None):
+        return ((time.monotonic() if now is None else now) - self.timestamp) * 1000.0
+
+def _summary(samples):
+    if not samples:
+        return None
+    values = np.fromiter(samples, dtype=np.float64)
+    return {"mean": round(float(values.mean()), 1), "p95": round(float(np.percentile(values, 95)), 1),
+            "max": round(float(values.max()), 1)}
+
+class FrameGrabber:
+    """Reads `source` (a camera index, a path, or an opened cv2.VideoCapture)
+    on its own thread into a ring of the newest `buffer_size` frames.
+
+        with FrameGrabber(0) as grabber:
+            frame = grabber.latest(timeout=1.0)
+            ...                                  # process frame.image
+            grabber.done(frame)                  # records read -> done latency
+    """
+
+    def __init__(self, source=0, buffer_size=FRAME_BUFFER):
+        self.source = source
+        self._frames = deque(maxlen=max(1, buffer_size))
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._cap = None
+        self.error = None
+        # counters
+        self.frames = 0          # frames read
+        self.delivered = 0       # frames handed out by latest()
+        self.dropped = 0         # frames nobody took before newer ones replaced them
+        self.read_failures = 0
+        self._last_delivered_seq = 0
+        self._pickup_ms = deque(maxlen=LATENCY_WINDOW)
+        self._end_to_end_ms = deque(maxlen=LATENCY_WINDOW)
+
+    # ---------- LIFECYCLE ----------
+
+    def start(self):
+        """Open the source and start reading; False if it cannot be opened."""
+        if self._running:
+            return True
+        cap = self.source if hasattr(self.source, "read") else cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            print("Error: Could not open camera.")
+            return False
+        # ask the driver to queue as little as it can; we keep our own buffer
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self._cap = cap
+        self._running = True
+        self._thread = threading.Thread(target=self._read_loop, name="frame-grabber", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+    def __enter__(self):
+        if not self.start():
+            raise RuntimeError("Could not open camera %r" % (self.source,))
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def running(self):
+        return self._running
+
+    def _read_loop(self):
+        seq = 0
+        try:
+            while self._running:
+                ok, image = self._cap.read()
+                now = time.monotonic()
+                if not ok:
+                    # end of a file, or the camera went away
+                    self.read_failures += 1
+                    break
+                seq += 1
+                with self._cond:
+                    self._frames.append(Frame(image, seq, now))
+                    self.frames = seq
+                    self._cond.notify_all()
+        except Exception as e:
+            print("Frame grabber error:", e)
+            self.error = e
+        finally:
+            with self._cond:
+                self._running = False
+                self._cond.notify_all()
+
+    # ---------- CONSUMER SIDE ----------
+
+    def latest(self, timeout=None):
+        """Newest frame not handed out yet, waiting up to `timeout` seconds
+        (None: forever) for one. None on timeout or once reading has stopped."""
+        with self._cond:
+            ready = lambda: (self._frames and self._frames[-1].seq > self._last_delivered_seq) or not self._running
+            if not self._cond.wait_for(ready, timeout):
+                return None
+            if not self._frames or self._frames[-1].seq <= self._last_delivered_seq:
+                return None
+            frame = self._frames[-1]
+            self.dropped += frame.seq - self._last_delivered_seq - 1
+            self.delivered += 1
+            self._last_delivered_seq = frame.seq
+            self._pickup_ms.append(frame.age_ms())
+            return frame
+
+    def recent(self):
+        """Every buffered frame, oldest first (already delivered ones too)."""
+        with self._cond:
+            return list(self._frames)
+
+    def done(self, frame):
+        """Mark `frame` as fully handled (shown, analyzed); its age now is the
+        end-to-end capture latency."""
+        latency = frame.age_ms()
+        with self._cond:
+            self._end_to_end_ms.append(latency)
+        return latency
+
+    def stats(self):
+        with self._cond:
+            return {
+                "frames": self.frames,
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+                "read_failures": self.read_failures,
+                "buffer_size": self._frames.maxlen,
+                "pickup_ms": _summary(self._pickup_ms),
+                "end_to_end_ms": _summary(self._end_to_end_ms),
+            }
@@ -0,0 +1,156 @@
+import cv2
+import numpy as np
+import os
+
+# Long edge (px) frames are normalized to before analysis. None keeps full resolution.
+# Face box, skin regions and patch means are all stable well below phone resolution.
+ANALYSIS_LONG_EDGE = 1280
+
+# JPEG can be decoded straight to 1/2, 1/4 or 1/8 scale (DCT scaling in libjpeg)
+REDUCED_DECODE_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+JPEG_MAGIC = b"\xff\xd8\xff"
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+
+# ---------- IMAGE DECODING ----------
+
+def load_image(image, flags=cv2.IMREAD_COLOR):
+    """Decode an image held in memory (bytes, bytearray, memoryview, file-like)
+    or on disk (path). Already decoded BGR arrays are passed through untouched."""
+    if image is None:
+        return None
+
+    if isinstance(image, np.ndarray) and image.ndim == 3:
+        return image
+    if isinstance(image, np.ndarray) and image.ndim == 2:
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+
+    if isinstance(image, (str, os.PathLike)):
+        return cv2.imread(os.fspath(image), flags)
+
+    if hasattr(image, "read"):
+        image = image.read()
+
+    buf = as_byte_buffer(image)
+    if buf is None or buf.size == 0:
+        return None
+    return cv2.imdecode(buf, flags)
+
+def as_byte_buffer(data):
+    """Zero-copy uint8 view over any object exposing the buffer protocol."""
+    if isinstance(data, np.ndarray):
+        return data.reshape(-1).view(np.uint8) if data.flags.c_contiguous else None
+    try:
+        view = memoryview(data)
+    except TypeError:
+        return None
+    if view.format != "B" or view.ndim != 1:
+        view = view.cast("B")
+    return np.frombuffer(view, dtype=np.uint8)
+
+# ---------- ANALYSIS RESOLUTION ----------
+
+def encoded_image_size(buf):
+    """(width, height) read from a JPEG or PNG header without decoding, else None."""
+    head = bytes(buf[:8])
+    if head.startswith(PNG_MAGIC) and len(buf) >= 24:
+        w = int.from_bytes(bytes(buf[16:20]), "big")
+        h = int.from_bytes(bytes(buf[20:24]), "big")
+        return w, h
+    if head.startswith(JPEG_MAGIC):
+        return _jpeg_size(buf)
+    return None
+
+def _jpeg_size(buf):
+    i, n = 2, len(buf)
+    while i + 9 < n:
+        if buf[i] != 0xFF:
+            i += 1
+            continue
+        marker = buf[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:  # no payload
+            i += 2
+            continue
+        seg_len = (int(buf[i + 2]) << 8) | int(buf[i + 3])
+        # SOF0..SOF15 except DHT (C4), JPG (C8) and DAC (CC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            h = (int(buf[i + 5]) << 8) | int(buf[i + 6])
+            w = (int(buf[i + 7]) << 8) | int(buf[i + 8])
+            return w, h
+        i += 2 + seg_len
+    return None
+
+def pick_reduction(long_edge, target_long_edge):
+    """Largest JPEG reduction factor that still keeps the long edge >= target."""
+    if not target_long_edge:
+        return 1
+    for factor in (8, 4, 2):
+        if long_edge / factor >= target_long_edge:
+            return factor
+    return 1
+
+def resize_to_long_edge(img, target_long_edge):
+    """Area-resample so the long edge equals the target; never upsamples."""
+    h, w = img.shape[:2]
+    long_edge = max(h, w)
+    if not target_long_edge or long_edge <= target_long_edge:
+        return img
+    scale = target_long_edge / long_edge
+    size = (max(1, round(w * scale)), max(1, round(h * scale)))
+    return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+def load_image_for_analysis(image, long_edge=ANALYSIS_LONG_EDGE):
+    """Decode `image` at (about) analysis resolution.
+
+    Returns (img, scale, original_size) where scale is analysis px per original px
+    and original_size is (width, height) of the source. JPEGs use reduced DCT
+    decoding (long edge ends up in [long_edge, 2 * long_edge)), everything else
+    is decoded and area-resampled to `long_edge`."""
+    if isinstance(image, (str, os.PathLike)):
+        # same contract as cv2.imread: an unreadable path is just a failed load
+        try:
+            image = np.fromfile(os.fspath(image), dtype=np.uint8)
+        except OSError:
+            return None, 1.0, None
+    elif hasattr(image, "read"):
+        image = image.read()
+
+    if isinstance(image, np.ndarray) and image.ndim >= 2:
+        img = load_image(image)
+    else:
+        buf = as_byte_buffer(image)
+        if buf is None or buf.size == 0:
+            return None, 1.0, None
+        flags = cv2.IMREAD_COLOR
+        size = encoded_image_size(buf)
+        if size is not None and bytes(buf[:3]) == JPEG_MAGIC:
+            factor = pick_reduction(max(size), long_edge)
+            flags = REDUCED_DECODE_FLAGS.get(factor, cv2.IMREAD_COLOR)
+        img = cv2.imdecode(buf, flags)
+        if img is not None and size is not None and flags != cv2.IMREAD_COLOR:
+            # reduced decode lands within 2x of the target, which is close enough;
+            # a fractional area resample on top costs more than it saves. The
+            # header size is pre-EXIF-rotation, so orient it like the decoded frame.
+            h, w = img.shape[:2]
+            if (w > h) != (size[0] > size[1]):
+                size = (size[1], size[0])
+            return img, w / size[0], size
+
+    if img is None:
+        return None, 1.0, None
+    orig_h, orig_w = img.shape[:2]
+    img = resize_to_long_edge(img, long_edge)
+    return img, img.shape[1] / orig_w, (orig_w, orig_h)
+
+def to_original_box(box, scale):
+    """Map an (x, y, w, h) box from analysis coordinates back to the source image."""
+    if scale == 1.0:
+        return tuple(int(v) for v in box)
+    return tuple(int(round(v / scale)) for v in box)
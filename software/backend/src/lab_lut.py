@@ -0,0 +1,154 @@
+import functools
+import hashlib
+import os
+import threading
+
+import numpy as np
+
+from .lib import constants as const
+from .color import linear_to_srgb, linear_to_xyz, srgb_to_linear, xyz_to_lab
+
+# 8-bit sRGB -> Lab through a precomputed 3D table with trilinear interpolation,
+# one pass instead of srgb_to_linear -> linear_to_xyz -> xyz_to_lab.
+#
+# dE76 against the exact path (bench/bench_lab_lut.py), over all 2^24 codes and
+# over skin-like codes (R >= 60, R > G):
+#   nodes   max    mean    skin max   skin mean   table
+#     17    1.17   0.12      0.52       0.11        58 KB
+#     33    0.44   0.032     0.26       0.030      421 KB
+#     65    0.13   0.008     0.07       0.007      3.2 MB
+# With numpy the eight row gathers cost more than the exact path now that
+# gamma_to_linear is a lookup for uint8 (2-3x slower at face-ROI sizes, same
+# bench), so "exact" stays the default.
+
+# "exact": the three-step path, "lut": this table
+LAB_ENGINE = os.environ.get("LAB_ENGINE", "exact")
+LUT_NODES = int(os.environ.get("LAB_LUT_NODES", "33"))
+LUT_CACHE_DIR = os.environ.get("LAB_LUT_CACHE", os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")), "foundation-fix"))
+
+# Bump when what gets stored changes; old cache files are ignored
+LUT_VERSION = 1
+
+# ---------- BUILDING ----------
+
+def build_lut(nodes=LUT_NODES, correction=None):
+    """(nodes, nodes, nodes, 3) float32 Lab at evenly spaced RGB codes 0..255.
+
+    `correction` is a lighting_correction_matrix; it is applied in linear RGB
+    exactly where the exact path applies it, so the table is one device's
+    corrected conversion. Per-photo corrections go through corrected_rgb8_to_lab
+    and the uncorrected table instead of a table each."""
+    axis = np.linspace(0.0, 255.0, nodes)
+    rgb = np.stack(np.meshgrid(axis, axis, axis, indexing="ij"), axis=-1).reshape(-1, 3)
+    lin = srgb_to_linear(rgb)
+    if correction is not None:
+        lin = lin @ correction
+    lab = xyz_to_lab(linear_to_xyz(lin))
+    return lab.astype(np.float32).reshape(nodes, nodes, nodes, 3)
+
+def _cache_file(nodes, correction, cache_dir):
+    h = hashlib.sha1()
+    for arr in (const.RGB_TO_XYZ_MATRIX, const.WHITEPOINT_D65, np.float64(const.GAMMA),
+                np.eye(3) if correction is None else correction):
+        h.update(np.ascontiguousarray(arr, dtype=np.float64).tobytes())
+    return os.path.join(cache_dir, "lablut-%d-v%d-%s.npy" % (nodes, LUT_VERSION, h.hexdigest()[:16]))
+
+_luts_lock = threading.Lock()
+_luts = {}   # cache file (or nodes when not cached) -> table
+
+def lab_lut(nodes=LUT_NODES, correction=None, cache_dir=None):
+    """Shared table for `nodes` and a fixed (per-device) `correction`.
+
+    Built once, saved as .npy in `cache_dir` (default LUT_CACHE_DIR, "" for no
+    file) and memory-mapped from there, so restarts and forked workers share the
+    pages instead of each building and holding a copy. Only for fixed
+    corrections; see corrected_rgb8_to_lab for per-photo ones."""
+    cache_dir = LUT_CACHE_DIR if cache_dir is None else cache_dir
+    cache_file = _cache_file(nodes, correction, cache_dir) if cache_dir else None
+    key = cache_file or (nodes, None if correction is None else correction.tobytes())
+    with _luts_lock:
+        if key in _luts:
+            return _luts[key]
+
+        lut = None
+        if cache_file and os.path.exists(cache_file):
+            try:
+                lut = np.load(cache_file, mmap_mode="r")
+            except (OSError, ValueError) as e:
+                print("Ignoring unreadable Lab LUT:", e)
+        if lut is None or lut.shape != (nodes, nodes, nodes, 3):
+            lut = build_lut(nodes, correction)
+            if cache_file:
+                try:
+                    os.makedirs(cache_dir, exist_ok=True)
+                    tmp = cache_file + ".%d.tmp" % os.getpid()
+                    with open(tmp, 'wb') as f:
+                        np.save(f, lut)
+                    os.replace(tmp, cache_file)
+                    lut = np.load(cache_file, mmap_mode="r")
+                except OSError as e:
+                    print("Could not cache Lab LUT:", e)
+        _luts[key] = lut
+        return lut
+
+# ---------- LOOKUP ----------
+
+@functools.lru_cache(maxsize=8)
+def _node_tables(nodes):
+    # lower node and weight of the upper one, for every 8-bit code
+    pos = np.arange(256) * ((nodes - 1) / 255.0)
+    lower = np.minimum(pos.astype(np.intp), nodes - 2)
+    return lower, (pos - lower).astype(np.float32)
+
+def _interpolate(lut, i, t, shape):
+    """Trilinear interpolation in `lut` from lower node indices `i` and weights
+    `t` of the upper nodes, both (N, 3)."""
+    nodes = lut.shape[0]
+    table = lut.reshape(-1, 3)
+    tr, tg, tb = t[:, 0:1], t[:, 1:2], t[:, 2:3]
+
+    base = (i[:, 0] * nodes + i[:, 1]) * nodes + i[:, 2]
+    step_r, step_g = nodes * nodes, nodes
+
+    def corner(offset):
+        # np.take on rows is several times faster than table[...] fancy indexing
+        return np.take(table, base + offset, axis=0)
+
+    def lerp(a, b, w):
+        b -= a
+        b *= w
+        b += a
+        return b
+
+    b00 = lerp(corner(0), corner(1), tb)
+    b01 = lerp(corner(step_g), corner(step_g + 1), tb)
+    b10 = lerp(corner(step_r), corner(step_r + 1), tb)
+    b11 = lerp(corner(step_r + step_g), corner(step_r + step_g + 1), tb)
+    return lerp(lerp(b00, b01, tg), lerp(b10, b11, tg), tr).reshape(shape)
+
+def rgb8_to_lab(rgb, lut):
+    """Lab (float32) of uint8 RGB codes of any (..., 3) shape, interpolated in `lut`."""
+    rgb = np.asarray(rgb)
+    if rgb.dtype != np.uint8:
+        raise ValueError("rgb8_to_lab expects uint8 codes, got %s" % rgb.dtype)
+    lower, weight = _node_tables(lut.shape[0])
+    codes = rgb.reshape(-1, 3)
+    return _interpolate(lut, lower[codes], weight[codes], rgb.shape)
+
+def codes_to_lab(codes, lut):
+    """Lab (float32) of fractional sRGB codes (..., 3), interpolated in `lut`.
+    Codes past 0..255 are extrapolated from the edge cells of the table."""
+    codes = np.asarray(codes, dtype=np.float32)
+    nodes = lut.shape[0]
+    pos = codes.reshape(-1, 3) * np.float32((nodes - 1) / 255.0)
+    lower = np.clip(pos.astype(np.intp), 0, nodes - 2)
+    return _interpolate(lut, lower, pos - lower, codes.shape)
+
+def corrected_rgb8_to_lab(rgb, correction, lut):
+    """Lab (float32) of uint8 RGB codes under a per-photo lighting `correction`,
+    through the uncorrected shared table: the correction is applied in linear
+    RGB, exactly where the exact path applies it, and the result re-encoded."""
+    lin = srgb_to_linear(np.asarray(rgb).reshape(-1, 3), dtype=np.float32) @ np.float32(correction)
+    np.maximum(lin, 0.0, out=lin)
+    return codes_to_lab(linear_to_srgb(lin, dtype=np.float32, out=lin), lut).reshape(np.shape(rgb))
@@ -1,7 +1,13 @@
+import functools
+import itertools
+
 import numpy as np
 
+from .color import delta_e2000
 from .lib import constants as const
 
+GRID_STEPS = 20   # grid_proportion_calculation: proportions in multiples of 5%
+
 def simplex_projection(prop_0):
     prop_sort = np.sort(prop_0)[::-1]
     sort_cumsum = np.cumsum(prop_sort)
@@ -14,13 +20,51 @@ def simplex_projection(prop_0):
     prop = np.maximum(prop_0 - theta, 0.0)
     return prop
 
-def proportion_calculation(lab_code):
-    BBt = const.BASE_LABS.dot(const.BASE_LABS.T)
-    Bt = const.BASE_LABS.dot(lab_code)
-    eps = 1e-8
+def proportion_calculation(lab_code, base_labs=None, mix_gram=None):
+    """Base proportions for `lab_code`. `base_labs` / `mix_gram` come from a
+    calibration profile (mix_gram = B B^T + eps I, precomputed there); default
+    the constants."""
+    if base_labs is None:
+        base_labs = const.BASE_LABS
+    if mix_gram is None:
+        eps = 1e-8
+        mix_gram = base_labs.dot(base_labs.T) + eps * np.eye(base_labs.shape[0])
+    Bt = base_labs.dot(lab_code)
     try:
-        prop_0 = np.linalg.solve(BBt + eps * np.eye(BBt.shape[0]), Bt)
+        prop_0 = np.linalg.solve(mix_gram, Bt)
     except np.linalg.LinAlgError:
-        prop_0 = np.linalg.lstsq(BBt + eps * np.eye(BBt.shape[0]), Bt, rcond=None)[0]
+        prop_0 = np.linalg.lstsq(mix_gram, Bt, rcond=None)[0]
     prop = simplex_projection(prop_0)
-    return prop
\ No newline at end of file
+    return prop
+
+# ---------- MATCH QUALITY ----------
+# The model proportion_calculation inverts: a mix with proportions p has Lab
+# p @ base_labs. Differences are CIEDE2000.
+
+def mix_lab(prop, base_labs=None):
+    """Lab the model predicts for proportions `prop` (..., n_bases)."""
+    return np.asarray(prop) @ (const.BASE_LABS if base_labs is None else base_labs)
+
+def mix_delta_e(lab_code, prop, base_labs=None):
+    """CIEDE2000 between the target and the mix(es) `prop` predicts."""
+    return delta_e2000(lab_code, mix_lab(prop, base_labs))
+
+@functools.lru_cache(maxsize=4)
+def simplex_grid(n_bases, steps=GRID_STEPS):
+    """(M, n_bases) every proportion vector in multiples of 1 / steps."""
+    # stars and bars: n_bases - 1 bars among steps + n_bases - 1 slots
+    bars = np.array(list(itertools.combinations(range(steps + n_bases - 1), n_bases - 1)))
+    edges = np.hstack([np.full((len(bars), 1), -1), bars, np.full((len(bars), 1), steps + n_bases - 1)])
+    grid = (np.diff(edges, axis=1) - 1) / steps
+    grid.flags.writeable = False
+    return grid
+
+def grid_proportion_calculation(lab_code, steps=GRID_STEPS, base_labs=None):
+    """(proportions, dE2000) of the grid mix closest to `lab_code`, every
+    candidate on the 1 / steps grid scored at once."""
+    if base_labs is None:
+        base_labs = const.BASE_LABS
+    grid = simplex_grid(len(base_labs), steps)
+    scores = delta_e2000(lab_code, grid @ base_labs)
+    best = np.argmin(scores)
+    return grid[best].copy(), float(scores[best])
@@ -1,5 +1,8 @@
 import numpy as np
 
+# Bump whenever the reference / base values below change (cached results depend on them)
+CALIBRATION_VERSION = 1
+
 GAMMA = 2.4
 EPSILON = 216 / 24389
 KAPPA = 24389 / 27
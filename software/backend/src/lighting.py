@@ -0,0 +1,109 @@
+import os
+import threading
+
+import numpy as np
+
+from .lib import constants as const
+
+# Lighting correction: the 3x3 matrix M with reference_linear @ M ~= captured
+# (both 24 chart patches in linear RGB) is fitted, and skin pixels are mapped
+# back to the reference lighting with inv(M).
+#
+# "robust": Tukey-weighted IRLS over the patches, so glare, shadow or a finger
+# on a few patches does not drag the fit; clipped patches start at weight 0.
+# "lstsq": the original unweighted pseudo-inverse fit.
+LIGHTING_FIT = os.environ.get("LIGHTING_FIT", "robust")
+
+TUKEY_C = 4.685                 # 95% efficiency at Gaussian noise
+MIN_RESIDUAL_SCALE = 2e-3       # linear RGB; patch mean noise on the test photos ~1e-3
+IRLS_MAX_ITERATIONS = 30
+IRLS_TOLERANCE = 1e-7
+CLIPPED_LINEAR = 0.95           # any channel above this: highlight clipped (~250 / 255)
+MIN_PATCHES = 8                 # patches left with weight > 0
+MAX_CONDITION = 100.0           # of M; real lighting is close to a scaled identity
+
+class LightingFitError(ValueError):
+    """The chart patches do not support a usable correction."""
+
+class LightingSolver:
+    """Fits lighting matrices against one set of reference patches.
+
+    Everything that depends only on the reference (its pseudo-inverse and the
+    per-patch outer products the weighted normal equations are built from) is
+    computed once here, so a fit is a few 3x3 solves."""
+
+    def __init__(self, reference_linear=const.REFERENCE_LINEAR_RGB, pinv=None, outer=None):
+        # pinv / outer: precomputed (a compiled calibration profile), else derived here
+        r = self.reference = np.asarray(reference_linear, dtype=np.float64)
+        self.pinv = np.linalg.pinv(r) if pinv is None else pinv
+        self.outer = r[:, :, None] * r[:, None, :] if outer is None else outer   # (P, 3, 3) r_i r_i^T
+
+    def fit(self, captured, weights=None):
+        """Weighted least-squares M (3x3). No weights: the pseudo-inverse fit."""
+        captured = np.asarray(captured, dtype=np.float64)
+        if weights is None:
+            return self.pinv @ captured
+        gram = np.einsum("i,ijk->jk", weights, self.outer)
+        rhs = (self.reference * weights[:, None]).T @ captured
+        return np.linalg.solve(gram, rhs)
+
+    def residuals(self, captured, matrix):
+        return np.linalg.norm(self.reference @ matrix - captured, axis=1)
+
+    def robust_fit(self, captured):
+        """(M, weights) by iteratively reweighted least squares, Tukey bisquare
+        weights on the per-patch residual norm scaled by its median."""
+        captured = np.asarray(captured, dtype=np.float64)
+        weights = (captured.max(axis=1) <= CLIPPED_LINEAR).astype(np.float64)
+        matrix = None
+        for _ in range(IRLS_MAX_ITERATIONS):
+            if np.count_nonzero(weights) < MIN_PATCHES:
+                raise LightingFitError("only %d usable chart patches" % np.count_nonzero(weights))
+            previous, matrix = matrix, self.fit(captured, weights)
+            if previous is not None and np.abs(matrix - previous).max() < IRLS_TOLERANCE:
+                break
+            res = self.residuals(captured, matrix)
+            scale = max(1.4826 * np.median(res[weights > 0]), MIN_RESIDUAL_SCALE)
+            u = np.minimum(res / (TUKEY_C * scale), 1.0)
+            weights = (1.0 - u ** 2) ** 2
+        return matrix, weights
+
+    def correction_matrix(self, captured, method=None):
+        """inv(M) for `captured` (P, 3) linear patches; skin @ it is corrected.
+
+        Raises LightingFitError when too few patches are usable or M is close
+        to singular."""
+        if (method or LIGHTING_FIT) == "robust":
+            matrix, _ = self.robust_fit(captured)
+        else:
+            matrix = self.fit(captured)
+        cond = np.linalg.cond(matrix)
+        if not np.isfinite(cond) or cond > MAX_CONDITION:
+            raise LightingFitError("lighting matrix is ill-conditioned (cond %.3g)" % cond)
+        return np.linalg.inv(matrix)
+
+    @staticmethod
+    def apply(pixels, correction, out=None):
+        """Corrected (N, 3) linear pixels in one matmul; `out` may be `pixels`."""
+        return np.matmul(pixels, correction, out=out)
+
+_solvers_lock = threading.Lock()
+_solvers = {}   # reference bytes -> LightingSolver
+
+def solver_for(reference_linear=const.REFERENCE_LINEAR_RGB):
+    """Shared solver per calibration profile (set of reference patches)."""
+    reference = np.ascontiguousarray(reference_linear, dtype=np.float64)
+    key = reference.tobytes()
+    with _solvers_lock:
+        if key not in _solvers:
+            _solvers[key] = LightingSolver(reference)
+        return _solvers[key]
+
+def correction_for(captured_linear, solver=None, method=None):
+    """correction_matrix, or None (with a message) when the chart is unusable.
+    `solver` defaults to the one for the stored reference patches."""
+    try:
+        return (solver or solver_for()).correction_matrix(captured_linear, method)
+    except (LightingFitError, np.linalg.LinAlgError) as e:
+        print("Lighting correction skipped:", e)
+        return None
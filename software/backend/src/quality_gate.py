@@ -0,0 +1,102 @@
+import os
+
+import cv2
+import numpy as np
+
+from .image_io import as_byte_buffer, encoded_image_size
+
+# Reason codes returned to the client so it can ask for the right retake
+UNREADABLE = "unreadable"
+TOO_SMALL = "too_small"
+BLURRY = "blurry"
+UNDEREXPOSED = "underexposed"
+OVEREXPOSED = "overexposed"
+
+QUALITY_GATE = os.environ.get("QUALITY_GATE", "1") != "0"
+
+# All checks run on a thumbnail of this long edge (~1-5 ms)
+GATE_LONG_EDGE = 256
+
+MIN_LONG_EDGE = 640      # source resolution
+MIN_SHORT_EDGE = 480
+
+# Laplacian variance divided by the gray variance, so exposure and contrast
+# cancel out. Sharp test photos score 0.22-0.29; a Gaussian blur of sigma 2 px
+# at analysis resolution ~0.1, sigma 4 px ~0.04.
+MIN_SHARPNESS = 0.06
+
+DARK_LEVEL, BRIGHT_LEVEL = 8, 247   # clipped shadows / highlights
+MIN_MEAN, MAX_MEAN = 40.0, 220.0
+MAX_DARK_FRACTION = 0.35
+MAX_BRIGHT_FRACTION = 0.25
+
+class ImageRejected(ValueError):
+    """Raised when a photo fails the quality gate. `reasons` are the codes above."""
+
+    def __init__(self, reasons, metrics=None):
+        super().__init__(reasons, metrics)
+        self.reasons = list(reasons)
+        self.metrics = metrics or {}
+
+    def __str__(self):
+        return "Image rejected: " + ", ".join(self.reasons)
+
+def thumbnail(img, long_edge=GATE_LONG_EDGE):
+    scale = min(1.0, long_edge / max(img.shape[:2]))
+    if scale == 1.0:
+        return img
+    return cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+def assess(img, source_size=None):
+    """Quality checks on a decoded BGR frame.
+
+    `source_size` is the (w, h) of the photo before any downscaling; defaults to
+    the frame's own size. Returns {"ok", "reasons", "metrics"}."""
+    if img is None or img.size == 0:
+        return {"ok": False, "reasons": [UNREADABLE], "metrics": {}}
+
+    h, w = img.shape[:2]
+    src_w, src_h = source_size or (w, h)
+    reasons = []
+    if max(src_w, src_h) < MIN_LONG_EDGE or min(src_w, src_h) < MIN_SHORT_EDGE:
+        reasons.append(TOO_SMALL)
+
+    gray = cv2.cvtColor(thumbnail(img), cv2.COLOR_BGR2GRAY)
+    hist = np.bincount(gray.ravel(), minlength=256) / gray.size
+    mean = float(hist @ np.arange(256))
+    variance = float(hist @ (np.arange(256) - mean) ** 2)
+    sharpness = cv2.Laplacian(gray, cv2.CV_64F).var() / max(variance, 1.0)
+    dark = float(hist[:DARK_LEVEL + 1].sum())
+    bright = float(hist[BRIGHT_LEVEL:].sum())
+
+    if sharpness < MIN_SHARPNESS:
+        reasons.append(BLURRY)
+    if mean < MIN_MEAN or dark > MAX_DARK_FRACTION:
+        reasons.append(UNDEREXPOSED)
+    if mean > MAX_MEAN or bright > MAX_BRIGHT_FRACTION:
+        reasons.append(OVEREXPOSED)
+
+    metrics = {
+        "source_size": [int(src_w), int(src_h)],
+        "sharpness": round(float(sharpness), 4),
+        "mean": round(mean, 1),
+        "dark_fraction": round(dark, 4),
+        "bright_fraction": round(bright, 4),
+    }
+    return {"ok": not reasons, "reasons": reasons, "metrics": metrics}
+
+def require_encoded_size(data):
+    """Raise ImageRejected (too_small) if the header of encoded photo `data` says
+    it is below the minimum resolution, without decoding it. Anything else is
+    left to assess() on the decoded frame."""
+    buf = as_byte_buffer(data)
+    size = encoded_image_size(buf) if buf is not None else None
+    if size is not None and (max(size) < MIN_LONG_EDGE or min(size) < MIN_SHORT_EDGE):
+        raise ImageRejected([TOO_SMALL], {"source_size": [int(size[0]), int(size[1])]})
+
+def require_quality(img, source_size=None):
+    """Raise ImageRejected if `img` fails assess()."""
+    result = assess(img, source_size)
+    if not result["ok"]:
+        raise ImageRejected(result["reasons"], result["metrics"])
+    return result
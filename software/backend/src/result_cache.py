@@ -0,0 +1,138 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+# ---------- CONTENT-ADDRESSED KEYS ----------
+
+def content_key(data, *versions):
+    """sha256 of the raw bytes plus whatever versions the result depends on."""
+    h = hashlib.sha256()
+    h.update(memoryview(data))
+    for v in versions:
+        h.update(b"\0")
+        h.update(str(v).encode())
+    return h.hexdigest()
+
+# ---------- LRU + TTL CACHE WITH REQUEST COALESCING ----------
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class ResultCache:
+    """Bounded LRU cache with a TTL. Concurrent `get_or_compute` calls for the
+    same key share one computation ("singleflight")."""
+
+    def __init__(self, max_entries=256, ttl_s=900.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (expires_at, value)
+        self._inflight = {}             # key -> _Call
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.coalesced = 0
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            self.expirations += 1
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def get(self, key):
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return value
+
+    def _store(self, key, value):
+        self._entries[key] = (self._clock() + self.ttl_s, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def put(self, key, value):
+        with self._lock:
+            self._store(key, value)
+
+    def get_or_compute(self, key, compute, cacheable=None, group=None):
+        """Return the cached value for `key`, or run `compute()` once for all
+        concurrent callers of the same `group` (callers whose computations may
+        differ, e.g. under different latency budgets, pass different groups).
+        Results failing `cacheable(result)` are handed to the waiting callers
+        but not stored; exceptions are re-raised in every caller."""
+        flight = (key, group)
+        with self._lock:
+            found, value = self._lookup(key)
+            if found:
+                self.hits += 1
+                return value
+            call = self._inflight.get(flight)
+            leader = call is None
+            if leader:
+                call = self._inflight[flight] = _Call()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = compute()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            try:
+                store = call.error is None and (cacheable is None or cacheable(call.result))
+            except Exception as e:
+                # a broken predicate only costs the caching, never the waiters
+                print("Result cache: cacheable() failed, not storing:", e)
+                store = False
+            try:
+                with self._lock:
+                    # publish before dropping the in-flight marker so no caller
+                    # slips in between and recomputes
+                    if store:
+                        self._store(key, call.result)
+                    del self._inflight[flight]
+            finally:
+                call.done.set()
+        return call.result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -0,0 +1,58 @@
+import numpy as np
+
+# ---------- O(n) ORDER STATISTICS ----------
+# np.percentile / np.median already partition, but copy, NaN-check and
+# re-dispatch per call. Here: one bare np.partition per column. Gives exactly
+# what np.percentile(..., method="linear") gives.
+
+def _ranks(n, q):
+    pos = (n - 1) * (q / 100.0)
+    lo = int(np.floor(pos))
+    return lo, min(lo + 1, n - 1), pos - lo
+
+def _percentile_partition(values, q):
+    values = np.asarray(values, dtype=np.float64).ravel()
+    lo, hi, frac = _ranks(values.size, q)
+    part = np.partition(values, [lo, hi])
+    return part[lo] + (part[hi] - part[lo]) * frac
+
+def percentile(values, q):
+    """q-th percentile (0..100) of all of `values`, linear interpolation."""
+    values = np.asarray(values)
+    if values.size == 0:
+        raise ValueError("percentile of an empty array")
+    return float(_percentile_partition(values, q))
+
+def column_percentile(values, q):
+    """Per-column percentile of an (N, C) array."""
+    values = np.asarray(values).reshape(len(values), -1)
+    return np.array([percentile(values[:, c], q) for c in range(values.shape[1])])
+
+def column_median(values):
+    """Per-column median of an (N, C) array (same as np.median(axis=0))."""
+    return column_percentile(values, 50.0)
+
+def column_trimmed_mean(values, proportion=0.1):
+    """Per-column mean after dropping int(proportion * N) values at each end
+    (same cut as scipy.stats.trim_mean)."""
+    values = np.asarray(values, dtype=np.float64).reshape(len(values), -1)
+    n = values.shape[0]
+    cut = int(proportion * n)
+    if n == 0 or 2 * cut >= n:
+        raise ValueError("trimmed mean: nothing left after trimming")
+    if cut == 0:
+        return values.mean(axis=0)
+    part = np.partition(values, [cut, n - cut - 1], axis=0)
+    return part[cut:n - cut].mean(axis=0)
+
+# ---------- SKIN PIXEL HELPERS ----------
+
+def luminance(rgb):
+    """Rec. 709 luma of (N, 3) RGB codes."""
+    rgb = np.asarray(rgb)
+    return 0.2126 * rgb[:, 0] + 0.7152 * rgb[:, 1] + 0.0722 * rgb[:, 2]
+
+def below_luminance_percentile(rgb, q=95.0):
+    """Boolean mask of the rows at or below the q-th luminance percentile."""
+    lum = luminance(rgb)
+    return lum <= percentile(lum, q)
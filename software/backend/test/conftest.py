@@ -0,0 +1,16 @@
+import pytest
+
+from src import calibration, lab_lut
+
+
+@pytest.fixture(autouse=True, scope="session")
+def private_caches(tmp_path_factory):
+    """Profiles compiled and Lab tables built by the tests (any call without an
+    explicit cache_dir) go to a temporary directory instead of ~/.cache."""
+    patch = pytest.MonkeyPatch()
+    patch.setattr(calibration, "PROFILE_CACHE_DIR", str(tmp_path_factory.mktemp("profiles")))
+    patch.setattr(lab_lut, "LUT_CACHE_DIR", str(tmp_path_factory.mktemp("lab_lut")))
+    patch.setattr(calibration, "_profiles", {})
+    patch.setattr(lab_lut, "_luts", {})
+    yield
+    patch.undo()
@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+from src.analysis_pool import AnalysisPool
+from src.color_algorithm import image_to_hex, image_to_lab
+
+PHOTO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'test-photos')
+
+
+def _read(name):
+    with open(os.path.join(PHOTO_DIR, name), 'rb') as f:
+        return f.read()
+
+
+@pytest.fixture(scope='module')
+def pool():
+    pool = AnalysisPool(workers=2, cv_threads=1)
+    yield pool
+    pool.shutdown()
+
+
+def test_pool_matches_in_process_analysis(pool):
+    data = _read('test1.png')
+    result = pool.analyze(data).result()
+    assert result == {"hex": image_to_hex(data), "lab": image_to_lab(data).tolist(), "degraded": []}
+
+
+def test_pool_reports_degraded_stages(pool):
+    result = pool.analyze(_read('test3.png'), 1).result()
+    assert [d["stage"] for d in result["degraded"]] == ["decode", "face", "chart", "skin_pixels"]
+
+
+def test_pool_propagates_analysis_errors(pool):
+    with pytest.raises(ValueError):
+        pool.analyze(_read('test2.png')).result()
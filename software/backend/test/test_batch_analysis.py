@@ -0,0 +1,51 @@
+import os
+
+import numpy as np
+
+from src import color_algorithm as ca
+
+PHOTO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'test-photos')
+PHOTOS = [os.path.join(PHOTO_DIR, 'test%d.png' % i) for i in (1, 2, 3)]
+
+
+def test_segment_median_matches_numpy():
+    rng = np.random.default_rng(1)
+    counts = [1, 4, 7, 2]
+    values = rng.normal(size=(sum(counts), 3))
+    ids = np.repeat(np.arange(len(counts)), counts)
+    med = ca.segment_median(values, ids, len(counts))
+    start = 0
+    for k, n in enumerate(counts):
+        assert np.allclose(med[k], np.median(values[start:start + n], axis=0))
+        start += n
+
+
+def test_segment_trimmed_mean_matches_per_segment():
+    rng = np.random.default_rng(2)
+    counts = [3, 0, 25, 40, 1]
+    values = rng.normal(size=(sum(counts), 3))
+    ids = np.repeat(np.arange(len(counts)), counts)
+    out = ca.segment_aggregate(values, ids, len(counts), "trimmed_mean")
+    start = 0
+    for k, n in enumerate(counts):
+        if n == 0:
+            assert np.isnan(out[k]).all()
+        else:
+            expected = ca.column_trimmed_mean(values[start:start + n], ca.TRIM_PROPORTION)
+            assert np.allclose(out[k], expected)
+        start += n
+
+
+def test_batch_matches_single_image_pipeline():
+    labs, errors = ca.images_to_lab(PHOTOS)
+    assert errors[1] == "Image rejected: underexposed"  # test2 is too dark to use
+    assert np.isnan(labs[1]).all()
+    for k in (0, 2):
+        assert errors[k] is None
+        assert np.allclose(labs[k], ca.image_to_lab(PHOTOS[k]))
+
+
+def test_combine_labs_ignores_failed_images():
+    labs = np.array([[60.0, 10.0, 20.0], [np.nan] * 3, [70.0, 12.0, 18.0], [65.0, 30.0, 19.0]])
+    assert np.allclose(ca.combine_labs(labs), [65.0, 12.0, 19.0])
+    assert ca.combine_labs(np.full((2, 3), np.nan)) is None
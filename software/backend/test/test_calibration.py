@@ -0,0 +1,87 @@
+import csv
+import os
+
+import numpy as np
+import pytest
+
+from src import calibration, color, lab_to_mix
+from src.color_algorithm import skin_pixels_to_lab
+from src.lib import constants as const
+
+
+def write_csv(path, header, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+@pytest.fixture
+def kiosk(tmp_path, monkeypatch):
+    """A second profile, "kiosk2", with its own chart reference and pigments."""
+    monkeypatch.setattr(calibration, "CALIBRATION_DIR", str(tmp_path / "calibration"))
+    folder = tmp_path / "calibration" / "kiosk2"
+    folder.mkdir(parents=True)
+    gamma = np.clip(const.REFERENCE_GAMMA_RGB * [1.05, 0.95, 0.9], 0, 255).round()
+    write_csv(folder / calibration.REFERENCE_CSV, ["R", "G", "B"], gamma.tolist())
+    write_csv(folder / calibration.BASES_CSV, ["L", "a", "b"], (const.BASE_LABS + 1.0).tolist())
+    return str(tmp_path / "cache"), gamma
+
+
+def compiled(name, cache_dir):
+    return calibration.CalibrationProfile(calibration.compile_profile(name, cache_dir))
+
+
+def test_default_profile_is_the_constants(tmp_path):
+    profile = compiled("default", str(tmp_path))
+    assert isinstance(profile.reference_pinv, np.memmap)
+    assert np.array_equal(profile.reference_linear_rgb, const.REFERENCE_LINEAR_RGB)
+    assert np.array_equal(profile.reference_gamma_rgb, const.REFERENCE_GAMMA_RGB)
+    assert np.array_equal(profile.base_labs, const.BASE_LABS)
+    assert np.allclose(profile.reference_pinv, np.linalg.pinv(const.REFERENCE_LINEAR_RGB))
+    assert "lab_lut" not in profile.arrays   # one shared table, not one per profile
+
+
+def test_compiled_once_per_fingerprint(tmp_path):
+    path = calibration.compile_profile("default", str(tmp_path))
+    mtime = os.path.getmtime(os.path.join(path, "profile.json"))
+    assert calibration.compile_profile("default", str(tmp_path)) == path
+    assert os.path.getmtime(os.path.join(path, "profile.json")) == mtime
+    assert os.listdir(str(tmp_path)) == [os.path.basename(path)]
+
+
+def test_device_profile_from_csvs(kiosk):
+    cache_dir, gamma = kiosk
+    assert calibration.profile_names() == ["default", "kiosk2"]
+    profile = compiled("kiosk2", cache_dir)
+    default = compiled("default", cache_dir)
+    assert profile.fingerprint != default.fingerprint
+    assert np.allclose(profile.reference_linear_rgb, color.srgb_to_linear(gamma))
+    assert np.array_equal(profile.base_labs, const.BASE_LABS + 1.0)
+    assert np.allclose(profile.mix_gram, profile.base_labs @ profile.base_labs.T + 1e-8 * np.eye(5))
+
+    lab = np.array([62.0, 12.0, 22.0])
+    assert np.allclose(lab_to_mix.proportion_calculation(lab, default.base_labs, default.mix_gram),
+                       lab_to_mix.proportion_calculation(lab))
+    assert not np.allclose(lab_to_mix.proportion_calculation(lab, profile.base_labs, profile.mix_gram),
+                           lab_to_mix.proportion_calculation(lab))
+
+
+def test_profile_drives_lighting_correction(kiosk):
+    cache_dir, _ = kiosk
+    skin = np.random.default_rng(0).integers(60, 230, (500, 3)).astype(np.uint8)
+    chart = const.REFERENCE_GAMMA_RGB * 0.9
+    default = compiled("default", cache_dir)
+    assert np.array_equal(skin_pixels_to_lab(skin, chart, profile=default), skin_pixels_to_lab(skin, chart))
+    other = skin_pixels_to_lab(skin, chart, profile=compiled("kiosk2", cache_dir))
+    assert np.abs(other - skin_pixels_to_lab(skin, chart)).max() > 0.5
+
+
+def test_bad_sources_are_reported(kiosk):
+    cache_dir, _ = kiosk
+    folder = os.path.join(calibration.CALIBRATION_DIR, "kiosk2")
+    write_csv(os.path.join(folder, calibration.BASES_CSV), ["L", "a", "b"], [[50, 0, 0]])
+    with pytest.raises(ValueError, match="expected 5 rows"):
+        calibration.compile_profile("kiosk2", cache_dir)
+    with pytest.raises(KeyError):
+        calibration.compile_profile("nowhere", cache_dir)
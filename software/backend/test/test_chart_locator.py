@@ -0,0 +1,89 @@
+import os
+
+import cv2
+import numpy as np
+
+from src import chart_locator
+from src import face_ref_scan_static as frs
+from src.frame_context import FrameContext
+from src.lib import constants as const
+
+
+def _scene():
+    """Reference chart pasted with a mild perspective onto a textured background."""
+    ref = cv2.imread(chart_locator.REF_PATH)
+    h, w = ref.shape[:2]
+    rng = np.random.default_rng(5)
+    scene = cv2.GaussianBlur(rng.integers(90, 170, (480, 640, 3), dtype=np.uint8), (9, 9), 0)
+    dst = np.float32([(150, 110), (470, 130), (455, 360), (140, 340)])
+    M = cv2.getPerspectiveTransform(np.float32([(0, 0), (w, 0), (w, h), (0, h)]), dst)
+    cv2.warpPerspective(ref, M, (640, 480), dst=scene, flags=cv2.INTER_CUBIC,
+                        borderMode=cv2.BORDER_TRANSPARENT)
+    return scene, M
+
+
+def test_reference_features_are_cached_on_disk(tmp_path, monkeypatch):
+    monkeypatch.setattr(chart_locator, "_features", {})
+    pts, desc = chart_locator.reference_features(cache_dir=str(tmp_path))
+    files = os.listdir(tmp_path)
+    assert len(files) == 1 and files[0].endswith(".npz")
+    assert len(pts) == len(desc) > 0
+
+    monkeypatch.setattr(chart_locator, "_features", {})
+    monkeypatch.setattr(chart_locator, "compute_features", None)  # must not be needed
+    cached_pts, cached_desc = chart_locator.reference_features(cache_dir=str(tmp_path))
+    assert np.array_equal(cached_pts, pts) and np.array_equal(cached_desc, desc)
+
+
+def test_features_recover_the_chart_quad():
+    scene, M = _scene()
+    quad = chart_locator.locate_chart_features(scene)
+    assert quad is not None
+    expected = cv2.perspectiveTransform(chart_locator.ref_quad().reshape(-1, 1, 2), M).reshape(4, 2)
+    assert np.abs(quad - expected).max() < 8
+
+
+def test_no_chart_no_quad():
+    rng = np.random.default_rng(2)
+    noise = cv2.GaussianBlur(rng.integers(0, 256, (480, 640, 3), dtype=np.uint8), (5, 5), 0)
+    assert chart_locator.locate_chart_features(noise) is None
+
+
+def test_looks_like_chart():
+    corners = np.float32([(100, 100), (400, 100), (400, 300), (100, 300)])
+    chart_bgr = const.REFERENCE_GAMMA_RGB[:, ::-1]
+    flat = {"means": chart_bgr, "variances": np.full((24, 3), 25.0)}
+    busy = {"means": chart_bgr, "variances": np.full((24, 3), 900.0)}
+    assert chart_locator.looks_like_chart(corners, flat, (480, 640))
+    assert not chart_locator.looks_like_chart(corners, busy, (480, 640))
+    assert not chart_locator.looks_like_chart(corners[[0, 2, 1, 3]], flat, (480, 640))
+    assert not chart_locator.looks_like_chart(None, None, (480, 640))
+
+
+def test_flat_rectangle_is_not_a_chart(monkeypatch):
+    scene, M = _scene()
+    # a dark, even, chart-shaped rectangle elsewhere in the frame, with a little noise
+    rect = np.float32([(20, 380), (200, 380), (200, 470), (20, 470)])
+    noise = np.random.default_rng(3).integers(-3, 4, (90, 180, 3))
+    scene[380:470, 20:200] = np.clip(45 + noise, 0, 255).astype(np.uint8)
+    ctx = FrameContext(scene)
+    stats = frs._chart_patch_stats(scene, rect, ctx)
+    assert np.sqrt(stats["variances"].mean(axis=1)).max() < chart_locator.MAX_PATCH_STD
+    assert not chart_locator.looks_like_chart(rect, stats, scene.shape)
+    with monkeypatch.context() as m:  # rejected for its colours, not its shape or texture
+        m.setattr(chart_locator, "MIN_REFERENCE_CORRELATION", -1.0)
+        assert chart_locator.looks_like_chart(rect, stats, scene.shape)
+
+    # auto mode then falls through to keypoint matching, which finds the real chart
+    monkeypatch.setattr(frs, "CHART_LOCATOR", "auto")
+    monkeypatch.setattr(frs, "_locate_chart_contour", lambda *args: rect)
+    corners, stats = frs._locate_chart(scene, ctx, None)
+    expected = cv2.perspectiveTransform(chart_locator.ref_quad().reshape(-1, 1, 2), M).reshape(4, 2)
+    assert corners is not None and np.abs(corners - expected).max() < 8
+
+
+def test_features_skip_excluded_boxes():
+    scene, _ = _scene()
+    # a claim elsewhere does not matter; one over the chart leaves nothing to match
+    assert chart_locator.locate_chart_features(scene, exclude=[(520, 20, 630, 100)]) is not None
+    assert chart_locator.locate_chart_features(scene, exclude=[(100, 80, 520, 400)]) is None
@@ -0,0 +1,114 @@
+import numpy as np
+import pytest
+
+from src import color
+from src.color_algorithm import lab_to_hex, lab_to_hex_single, lab_to_rgb8
+from src.lib import constants as const
+
+# The conversions as they were before src.color, copied verbatim; color must
+# reproduce them
+
+
+def legacy_gamma_to_linear(gamma_codes):
+    norm_rgb = gamma_codes / const.WHITEPOINT_D65
+    return np.where(norm_rgb <= 0.04045, norm_rgb / 12.92,
+                    ((norm_rgb + 0.055) / 1.055) ** const.GAMMA)
+
+
+def legacy_linear_to_xyz(linear_codes):
+    return np.transpose(const.RGB_TO_XYZ_MATRIX @ np.transpose(linear_codes))
+
+
+def legacy_xyz_to_lab(xyz_codes):
+    f = np.where(xyz_codes > const.EPSILON, np.cbrt(xyz_codes), (const.KAPPA * xyz_codes + 16) / 116)
+    L = 116 * f[:, 1] - 16
+    a = 500 * (f[:, 0] - f[:, 1])
+    b = 200 * (f[:, 1] - f[:, 2])
+    return np.stack((L, a, b), axis=1)
+
+
+def legacy_lab_to_hex(lab):
+    L, a, b = lab
+    y = (L + 16.0) / 116.0
+    x = y + a / 500.0
+    z = y - b / 200.0
+
+    def inv_f(t):
+        t3 = t**3
+        return t3 if t3 > 0.008856 else (t - 16.0/116.0) / 7.787
+
+    X = inv_f(x) * 0.95047
+    Y = inv_f(y) * 1.00000
+    Z = inv_f(z) * 1.08883
+    M = np.array([[3.2406, -1.5372, -0.4986], [-0.9689, 1.8758, 0.0415], [0.0557, -0.2040, 1.0570]])
+    rgb_lin = np.clip(M @ np.array([X, Y, Z]), 0.0, None)
+    rgb = np.where(rgb_lin <= 0.0031308, 12.92 * rgb_lin, 1.055 * (rgb_lin ** (1.0/2.4)) - 0.055)
+    rgb = np.maximum(np.clip(rgb, 0.0, 1.0), 0.03)
+    r, g, b = (rgb * 255.0).astype(int)
+    return '#{:02X}{:02X}{:02X}'.format(r, g, b)
+
+
+@pytest.fixture
+def codes():
+    return np.random.default_rng(0).uniform(0, 255, (5000, 3))
+
+
+def test_forward_path_pinned(codes):
+    lin = color.srgb_to_linear(codes)
+    assert np.array_equal(lin, legacy_gamma_to_linear(codes))
+    xyz = color.linear_to_xyz(lin)
+    assert np.allclose(xyz, legacy_linear_to_xyz(lin), rtol=0, atol=1e-15)
+    assert np.allclose(color.xyz_to_lab(xyz), legacy_xyz_to_lab(xyz), rtol=0, atol=1e-12)
+    assert np.allclose(color.srgb_to_lab(codes), legacy_xyz_to_lab(legacy_linear_to_xyz(
+        legacy_gamma_to_linear(codes))), rtol=0, atol=1e-12)
+
+
+def test_uint8_table_pinned():
+    codes = np.repeat(np.arange(256, dtype=np.uint8)[:, None], 3, axis=1)
+    assert np.array_equal(color.srgb_to_linear(codes), legacy_gamma_to_linear(codes.astype(float)))
+
+
+def test_hex_pinned():
+    rng = np.random.default_rng(1)
+    labs = np.column_stack((rng.uniform(0, 100, 20000), rng.uniform(-80, 80, (20000, 2))))
+    for lab in labs:
+        assert lab_to_hex_single(lab) == legacy_lab_to_hex(lab)
+    assert lab_to_hex_single(np.array([67.33, 13.72, 20.01])) == legacy_lab_to_hex([67.33, 13.72, 20.01])
+
+
+def test_batched_hex_matches_scalar():
+    rng = np.random.default_rng(3)
+    labs = np.column_stack((rng.uniform(0, 100, 5000), rng.uniform(-80, 80, (5000, 2))))
+    labs[:3] = [[0.0, 0.0, 0.0], [100.0, 0.0, 0.0], [2.0, 0.0, 0.0]]  # floor / clip edges
+    hexes = lab_to_hex(labs)
+    assert hexes == [legacy_lab_to_hex(lab) for lab in labs]
+    rgb = lab_to_rgb8(labs)
+    assert rgb.dtype == np.uint8 and rgb.shape == (5000, 3)
+    assert hexes[:2] == ['#070707', '#FFFFFE']  # truncation, as before
+    assert ['#%02X%02X%02X' % tuple(c) for c in rgb] == hexes
+    assert lab_to_hex(np.empty((0, 3))) == []
+
+
+def test_any_shape_and_out_in_place(codes):
+    img = codes.reshape(50, 100, 3)
+    expected = color.srgb_to_lab(codes).reshape(50, 100, 3)
+    buf = img.copy()
+    assert color.srgb_to_lab(buf, out=buf) is buf
+    assert np.allclose(buf, expected, rtol=0, atol=1e-12)
+    with pytest.raises(ValueError):
+        color.srgb_to_linear(codes, out=np.empty((3, 3)))
+
+
+def test_float32(codes):
+    lab32 = color.srgb_to_lab(codes.astype(np.uint8), dtype=np.float32)
+    assert lab32.dtype == np.float32
+    assert np.abs(lab32 - color.srgb_to_lab(codes.astype(np.uint8))).max() < 1e-3
+
+
+def test_round_trips():
+    rgb = np.random.default_rng(2).uniform(0, 1, (1000, 3))
+    assert np.allclose(color.srgb_to_linear(color.linear_to_srgb(rgb, scale=1.0), scale=1.0), rgb)
+    xyz = color.linear_to_xyz(rgb)
+    assert np.allclose(color.xyz_to_linear(xyz), rgb, atol=1e-3)   # rounded inverse matrix
+    lab = np.array([[50.0, 10.0, -20.0], [80.0, -5.0, 30.0]])
+    assert np.allclose(color.gamma_lab_to_lab(color.lab_to_gamma_lab(lab)), lab)
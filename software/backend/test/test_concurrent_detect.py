@@ -0,0 +1,57 @@
+import contextlib
+import io
+import os
+import threading
+
+import cv2
+import numpy as np
+
+from src import face_ref_scan_static as frs
+
+TEST_PHOTO = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          '..', 'data', 'test-photos', 'test1.png')
+
+
+def test_run_side_by_side_is_concurrent_and_ordered(monkeypatch):
+    monkeypatch.setattr(frs, "DETECT_THREADS", 2)
+    second_started = threading.Event()
+
+    def first():
+        # only returns True if the second task runs while this one waits
+        return second_started.wait(timeout=5)
+
+    def second():
+        second_started.set()
+        return "chart"
+
+    assert frs.run_side_by_side(first, second) == [True, "chart"]
+
+
+def test_run_side_by_side_serial(monkeypatch):
+    monkeypatch.setattr(frs, "DETECT_THREADS", 1)
+    order = []
+    assert frs.run_side_by_side(lambda: order.append(1) or 1, lambda: order.append(2) or 2) == [1, 2]
+    assert order == [1, 2]
+
+
+def test_sheet_search_skips_claimed_area():
+    img = np.full((300, 400, 3), 20, np.uint8)
+    cv2.rectangle(img, (10, 10), (250, 150), (240, 240, 240), -1)    # bigger blob, claimed
+    cv2.rectangle(img, (220, 180), (390, 290), (240, 240, 240), -1)
+    _, sheet = frs.detect_sheet(img)
+    assert cv2.boundingRect(sheet)[1] < 20
+    _, sheet = frs.detect_sheet(img, exclude=[(0, 0, 260, 160)])
+    x, y, _, _ = cv2.boundingRect(sheet)
+    assert x > 200 and y > 170
+
+
+def test_side_by_side_matches_serial(monkeypatch):
+    img = cv2.imread(TEST_PHOTO)
+    results = []
+    for threads in (1, 2):
+        monkeypatch.setattr(frs, "DETECT_THREADS", threads)
+        with contextlib.redirect_stdout(io.StringIO()):
+            results.append(frs.analyze_frame(img))
+    (skin1, ref1), (skin2, ref2) = results
+    assert np.array_equal(skin1, skin2)
+    assert np.array_equal(ref1, ref2)
@@ -0,0 +1,63 @@
+import math
+import os
+
+import numpy as np
+
+from src import face_ref_scan_static as frs
+from src.deadline import Deadline, allows
+from src.frame_context import FrameContext
+
+TEST_PHOTO = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          '..', 'data', 'test-photos', 'test1.png')
+
+
+def test_no_budget_never_degrades():
+    deadline = Deadline()
+    assert deadline.remaining_ms() == math.inf
+    assert allows(None, "face_refine")
+    assert allows(deadline, "face_refine")
+
+
+def test_exhausted_budget_blocks_every_stage():
+    deadline = Deadline(0)
+    assert not deadline.allows("decode")
+    assert not deadline.allows("skin_pixels")
+
+
+def test_repeated_stage_is_recorded_once():
+    deadline = Deadline(0)
+    deadline.degrade("chart", "first")
+    deadline.degrade("chart", "second")
+    assert [(d["stage"], d["strategy"]) for d in deadline.degraded] == [("chart", "first; second")]
+
+
+def test_tight_budget_degrades_and_still_answers():
+    deadline = Deadline(1)
+    skin, reference = frs.analyze_image(TEST_PHOTO, deadline=deadline)
+    stages = [d["stage"] for d in deadline.degraded]
+    assert stages == ["decode", "face", "chart"]
+    assert skin is not None and skin.shape[1] == 3
+    assert reference is not None and reference.shape == (24, 3)
+
+
+def test_tight_budget_still_requires_a_sheet():
+    blank = np.zeros((480, 640, 3), np.uint8)
+    deadline = Deadline(1)
+    assert frs._locate_chart_contour(blank, FrameContext(blank), deadline) is None
+
+
+def test_rejected_chart_is_not_returned_when_matching_is_skipped():
+    # with the face claimed, the contour path finds test3's chart at full budget;
+    # under a 1 ms budget the 0.5x corner search yields a quad that fails
+    # looks_like_chart, and keypoint matching is skipped, so there is no reference
+    photo = os.path.join(os.path.dirname(TEST_PHOTO), 'test3.png')
+    deadline = Deadline(1)
+    _, reference = frs.analyze_image(photo, deadline=deadline)
+    assert reference is None
+    assert "skipped reference chart matching" in deadline.degraded[2]["strategy"]
+
+
+def test_generous_budget_runs_full_pipeline():
+    deadline = Deadline(60000)
+    frs.analyze_image(TEST_PHOTO, deadline=deadline)
+    assert deadline.degraded == []
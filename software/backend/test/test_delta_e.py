@@ -0,0 +1,122 @@
+import numpy as np
+import pytest
+
+from src import color, lab_to_mix
+
+# Sharma, Wu & Dalal (2005), "The CIEDE2000 color-difference formula:
+# implementation notes, supplementary test data, and mathematical observations",
+# Table 1: L1 a1 b1 L2 a2 b2 dE00
+SHARMA = np.array([
+    [50.0000, 2.6772, -79.7751, 50.0000, 0.0000, -82.7485, 2.0425],
+    [50.0000, 3.1571, -77.2803, 50.0000, 0.0000, -82.7485, 2.8615],
+    [50.0000, 2.8361, -74.0200, 50.0000, 0.0000, -82.7485, 3.4412],
+    [50.0000, -1.3802, -84.2814, 50.0000, 0.0000, -82.7485, 1.0000],
+    [50.0000, -1.1848, -84.8006, 50.0000, 0.0000, -82.7485, 1.0000],
+    [50.0000, -0.9009, -85.5211, 50.0000, 0.0000, -82.7485, 1.0000],
+    [50.0000, 0.0000, 0.0000, 50.0000, -1.0000, 2.0000, 2.3669],
+    [50.0000, -1.0000, 2.0000, 50.0000, 0.0000, 0.0000, 2.3669],
+    [50.0000, 2.4900, -0.0010, 50.0000, -2.4900, 0.0009, 7.1792],
+    [50.0000, 2.4900, -0.0010, 50.0000, -2.4900, 0.0010, 7.1792],
+    [50.0000, 2.4900, -0.0010, 50.0000, -2.4900, 0.0011, 7.2195],
+    [50.0000, 2.4900, -0.0010, 50.0000, -2.4900, 0.0012, 7.2195],
+    [50.0000, -0.0010, 2.4900, 50.0000, 0.0009, -2.4900, 4.8045],
+    [50.0000, -0.0010, 2.4900, 50.0000, 0.0010, -2.4900, 4.8045],
+    [50.0000, -0.0010, 2.4900, 50.0000, 0.0011, -2.4900, 4.7461],
+    [50.0000, 2.5000, 0.0000, 50.0000, 0.0000, -2.5000, 4.3065],
+    [50.0000, 2.5000, 0.0000, 73.0000, 25.0000, -18.0000, 27.1492],
+    [50.0000, 2.5000, 0.0000, 61.0000, -5.0000, 29.0000, 22.8977],
+    [50.0000, 2.5000, 0.0000, 56.0000, -27.0000, -3.0000, 31.9030],
+    [50.0000, 2.5000, 0.0000, 58.0000, 24.0000, 15.0000, 19.4535],
+    [50.0000, 2.5000, 0.0000, 50.0000, 3.1736, 0.5854, 1.0000],
+    [50.0000, 2.5000, 0.0000, 50.0000, 3.2972, 0.0000, 1.0000],
+    [50.0000, 2.5000, 0.0000, 50.0000, 1.8634, 0.5757, 1.0000],
+    [50.0000, 2.5000, 0.0000, 50.0000, 3.2592, 0.3350, 1.0000],
+    [60.2574, -34.0099, 36.2677, 60.4626, -34.1751, 39.4387, 1.2644],
+    [63.0109, -31.0961, -5.8663, 62.8187, -29.7946, -4.0864, 1.2630],
+    [61.2901, 3.7196, -5.3901, 61.4292, 2.2480, -4.9620, 1.8731],
+    [35.0831, -44.1164, 3.7933, 35.0232, -40.0716, 1.5901, 1.8645],
+    [22.7233, 20.0904, -46.6940, 23.0331, 14.9730, -42.5619, 2.0373],
+    [36.4612, 47.8580, 18.3852, 36.2715, 50.5065, 21.2231, 1.4146],
+    [90.8027, -2.0831, 1.4410, 91.1528, -1.6435, 0.0447, 1.4441],
+    [90.9257, -0.5406, -0.9208, 88.6381, -0.8985, -0.7239, 1.5381],
+    [6.7747, -0.2908, -2.4247, 5.8714, -0.0985, -2.2286, 0.6377],
+    [2.0776, 0.0795, -1.1350, 0.9033, -0.0636, -0.5514, 0.9082],
+])
+
+
+def test_ciede2000_sharma_data():
+    lab1, lab2, expected = SHARMA[:, :3], SHARMA[:, 3:6], SHARMA[:, 6]
+    assert np.allclose(color.delta_e2000(lab1, lab2), expected, atol=5e-5)
+    assert np.allclose(color.delta_e2000(lab2, lab1), expected, atol=5e-5)   # symmetric
+
+
+def test_ciede2000_one_row_at_a_time():
+    for row in SHARMA:
+        assert color.delta_e2000(row[:3], row[3:6]) == pytest.approx(row[6], abs=5e-5)
+
+
+def test_broadcast_one_target_against_a_grid():
+    grid = np.random.default_rng(0).uniform((0, -60, -60), (100, 60, 60), (50, 40, 3))
+    target = np.array([62.0, 12.0, 22.0])
+    for fn in (color.delta_e76, color.delta_e94, color.delta_e2000):
+        d = fn(target, grid)
+        assert d.shape == (50, 40)
+        assert np.allclose(d[7, 3], fn(target, grid[7, 3]))
+    assert color.delta_e2000(target, target) == 0.0
+    # float32 agrees except near opposite hues, where the mean hue is ill-conditioned
+    hue_gap = np.degrees(np.arctan2(grid[..., 2], grid[..., 1]) - np.arctan2(target[2], target[1])) % 360
+    away = np.abs(hue_gap - 180) > 1
+    assert np.allclose(color.delta_e2000(target, grid, dtype=np.float32)[away],
+                       color.delta_e2000(target, grid)[away], atol=1e-3)
+
+
+def test_inputs_are_left_unchanged():
+    target = np.array([60.0, 12.0, 20.0])
+    other = np.array([55.0, -3.0, 31.0])
+    color.delta_e2000(target, other)
+    assert target.tolist() == [60.0, 12.0, 20.0] and other.tolist() == [55.0, -3.0, 31.0]
+    lab_to_mix.mix_delta_e(target, [0.2] * 5)
+    assert target.tolist() == [60.0, 12.0, 20.0]
+    # last block of one row
+    grid = np.random.default_rng(1).uniform((0, -60, -60), (100, 60, 60), (color.DELTA_E_BLOCK + 1, 3))
+    before = grid.copy()
+    color.delta_e2000(target, grid)
+    color.delta_e2000(grid, target)
+    assert target.tolist() == [60.0, 12.0, 20.0]
+    assert np.array_equal(grid, before)
+
+
+def test_delta_e76_and_94():
+    lab1 = np.array([50.0, 2.6772, -79.7751])
+    lab2 = np.array([50.0, 0.0, -82.7485])
+    assert color.delta_e76(lab1, lab2) == pytest.approx(np.linalg.norm(lab1 - lab2))
+    # CIE94 graphic arts: chroma and hue differences scaled by the reference chroma
+    C1 = np.hypot(*lab1[1:])
+    dC = C1 - np.hypot(*lab2[1:])
+    dH2 = np.sum((lab1[1:] - lab2[1:]) ** 2) - dC ** 2
+    expected = np.sqrt((dC / (1 + 0.045 * C1)) ** 2 + dH2 / (1 + 0.015 * C1) ** 2)
+    assert color.delta_e94(lab1, lab2) == pytest.approx(expected)
+    assert color.delta_e94(lab1, lab2, textiles=True) < color.delta_e94(lab1, lab2) * 1.1
+
+
+def test_simplex_grid():
+    grid = lab_to_mix.simplex_grid(5, 4)
+    assert grid.shape == (70, 5)                      # C(4 + 4, 4)
+    assert np.allclose(grid.sum(axis=1), 1.0)
+    assert len({tuple(row) for row in grid}) == len(grid)
+    assert set(np.unique(grid * 4)) == {0, 1, 2, 3, 4}
+
+
+def test_grid_search_recovers_a_grid_mix():
+    prop = np.array([0.25, 0.05, 0.2, 0.2, 0.3])
+    found, de = lab_to_mix.grid_proportion_calculation(lab_to_mix.mix_lab(prop))
+    assert np.allclose(found, prop)
+    assert de == pytest.approx(0.0, abs=1e-6)
+
+
+def test_grid_search_no_worse_than_the_rounded_solve():
+    target = np.array([62.0, 12.0, 22.0])
+    _, de = lab_to_mix.grid_proportion_calculation(target)
+    rounded = np.round(lab_to_mix.proportion_calculation(target) * 20) / 20
+    rounded[np.argmax(rounded)] += 1.0 - rounded.sum()
+    assert de <= lab_to_mix.mix_delta_e(target, rounded)
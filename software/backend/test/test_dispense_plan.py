@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from src import calibration
+from src import dispenser as disp
+
+LAB = np.array([65.66, 14.54, 22.57])
+
+
+def test_plan_matches_calculate_steps():
+    plan = disp.plan_dispense(LAB)
+    assert plan["steps"] == disp.calculate_steps(LAB).tolist()
+    assert plan["lab"] == LAB.tolist()
+    assert sum(plan["proportions"]) == pytest.approx(1.0)
+    assert plan["duration_s"] == round(disp.estimate_duration(plan["steps"]), 1)
+
+
+def test_plan_uses_the_profile():
+    profile = calibration.load_profile(calibration.DEFAULT_PROFILE)
+    assert disp.plan_dispense(LAB, profile)["steps"] == disp.calculate_steps(LAB, profile).tolist()
+
+
+def test_estimate_duration():
+    # 8 half-steps of DELAY per step, BASE_INTERVAL between the five bases
+    assert disp.estimate_duration([0] * 5) == 4 * disp.BASE_INTERVAL
+    assert disp.estimate_duration([100, 0, 0, 0, 25]) == pytest.approx(125 * 8 * disp.DELAY + 4 * disp.BASE_INTERVAL)
+
+
+def test_dispense_all_runs_every_base_in_order(monkeypatch):
+    calls, sleeps = [], []
+    monkeypatch.setattr(disp, "dispense_foundation", lambda pins, switch, steps, chip: calls.append((switch, steps)))
+    monkeypatch.setattr(disp.time, "sleep", sleeps.append)
+    disp.dispense_all([5, 4, 3, 2, 1], chip=None)
+    assert calls == [(disp.WHITE_SWITCH_PIN, 5), (disp.BLACK_SWITCH_PIN, 4), (disp.RED_SWITCH_PIN, 3),
+                     (disp.BLUE_SWITCH_PIN, 2), (disp.YELLOW_SWITCH_PIN, 1)]
+    assert sleeps == [disp.BASE_INTERVAL] * 4
@@ -0,0 +1,83 @@
+import os
+import threading
+
+import cv2
+import numpy as np
+
+from src import face_detector as fd
+
+TEST_PHOTO = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          '..', 'data', 'test-photos', 'test1.png')
+
+
+def test_warmup_reports_time_and_leaves_idle_cascade():
+    elapsed_ms = fd.warmup()
+    assert elapsed_ms > 0
+    assert len(fd._idle_cascades[fd.CASCADE_PATH]) >= 1
+
+
+def test_cascade_instances_are_reused():
+    with fd.borrow_cascade() as first:
+        pass
+    with fd.borrow_cascade() as second:
+        assert second is first
+
+
+def test_concurrent_callers_get_distinct_instances():
+    seen = []
+    barrier = threading.Barrier(3)
+
+    def worker():
+        with fd.borrow_cascade() as cascade:
+            seen.append(id(cascade))
+            barrier.wait()
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(set(seen)) == 3
+
+
+def test_detect_faces_matches_fresh_classifier():
+    gray = cv2.cvtColor(cv2.imread(TEST_PHOTO), cv2.COLOR_BGR2GRAY)
+    fresh = cv2.CascadeClassifier(fd.CASCADE_PATH).detectMultiScale(
+        gray, scaleFactor=1.1, minNeighbors=5, minSize=(80, 80))
+    pooled = fd.detect_faces(gray)
+    assert [tuple(f) for f in pooled] == [tuple(f) for f in fresh]
+
+
+def test_missing_cascade_is_reported():
+    assert fd.detect_faces(np.zeros((8, 8), np.uint8), path='/nonexistent.xml') is None
+
+
+def test_pyramid_agrees_with_exhaustive_search():
+    gray = cv2.cvtColor(cv2.imread(TEST_PHOTO), cv2.COLOR_BGR2GRAY)
+    exhaustive = fd.locate_face(gray, mode="exhaustive")
+    pyramid = fd.locate_face(gray, mode="pyramid")
+    assert fd.iou(exhaustive, pyramid) > 0.8
+
+
+def test_face_size_limits_follow_frame_size():
+    (lo, _), (hi, _) = fd.face_size_limits((1000, 800))
+    assert lo == 96 and hi == 760
+    (lo, _), _ = fd.face_size_limits((100, 80))
+    assert lo == 20
+
+
+def test_unrefined_coarse_hits_use_full_min_neighbors(monkeypatch):
+    calls = []
+    real = fd.detect_faces
+    monkeypatch.setattr(fd, "detect_faces", lambda *a, **kw: calls.append(kw["minNeighbors"]) or real(*a, **kw))
+    gray = cv2.cvtColor(cv2.imread(TEST_PHOTO), cv2.COLOR_BGR2GRAY)
+    fd.locate_face(gray, mode="pyramid")
+    assert calls == [fd.COARSE_MIN_NEIGHBORS, fd.MIN_NEIGHBORS]   # coarse pass, then refinement
+    calls.clear()
+    fd.locate_face(gray, mode="coarse")
+    assert calls == [fd.MIN_NEIGHBORS]
+    calls.clear()
+    scale = fd.COARSE_LONG_EDGE / max(gray.shape)
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    fd.locate_face(small, mode="pyramid")
+    assert calls == [fd.MIN_NEIGHBORS]
@@ -0,0 +1,58 @@
+import cv2
+import numpy as np
+
+from src import face_ref_scan_static as frs
+from src.frame_context import FrameContext, context_for
+
+
+def _frame():
+    img = np.full((240, 320, 3), 230, np.uint8)
+    cv2.rectangle(img, (60, 40), (260, 200), (40, 50, 60), -1)
+    return img
+
+
+def test_intermediates_match_the_direct_chain():
+    img = _frame()
+    ctx = FrameContext(img)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    _, thresh = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    assert np.array_equal(ctx.gray, gray)
+    assert np.array_equal(ctx.blurred, blurred)
+    assert np.array_equal(ctx.otsu, thresh)
+
+
+def test_intermediates_are_computed_once():
+    ctx = FrameContext(_frame())
+    first = ctx.sheet_mask
+    assert ctx.sheet_mask is first
+    assert ctx.chart_mask is ctx.chart_mask
+    assert set(ctx.timings) == {"gray", "blur", "threshold", "sheet_mask", "chart_mask"}
+
+
+def test_context_is_only_reused_for_its_own_frame():
+    img = _frame()
+    ctx = FrameContext(img)
+    assert context_for(img, ctx) is ctx
+    assert context_for(img.copy(), ctx) is not ctx
+
+
+def test_stages_agree_with_and_without_shared_context():
+    img = _frame()
+    ctx = FrameContext(img)
+    _, shared = frs.detect_sheet(img, ctx=ctx)
+    _, alone = frs.detect_sheet(img)
+    assert np.array_equal(shared, alone)
+    assert np.array_equal(frs.crop_to_chart_only(img, ctx=ctx), frs.crop_to_chart_only(img))
+    assert frs.detect_sheet_presence(img, ctx=ctx) == frs.detect_sheet_presence(img)
+
+
+def test_crop_context_views_parent_buffers():
+    img = _frame()
+    ctx = FrameContext(img)
+    gray = ctx.gray
+    child = ctx.crop(50, 30, 220, 180)
+    assert child.img.base is img
+    assert child.gray.base is gray
+    assert np.array_equal(child.chart_mask, FrameContext(img[30:210, 50:270].copy()).chart_mask)
+    assert ctx.crop(0, 0, 320, 240) is ctx
@@ -0,0 +1,87 @@
+import threading
+import time
+
+import numpy as np
+
+from src.frame_grabber import FrameGrabber
+
+
+class FakeCapture:
+    """cv2.VideoCapture stand-in: `n` frames (pixel value = frame number),
+    one every `interval` seconds."""
+
+    def __init__(self, n, interval=0.002):
+        self.n = n
+        self.interval = interval
+        self.count = 0
+        self.released = False
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def isOpened(self):
+        return True
+
+    def set(self, prop, value):
+        return True
+
+    def read(self):
+        self.gate.wait()
+        if self.count >= self.n:
+            return False, None
+        time.sleep(self.interval)
+        self.count += 1
+        return True, np.full((4, 4, 3), self.count % 256, dtype=np.uint8)
+
+    def release(self):
+        self.released = True
+
+
+def test_slow_consumer_gets_the_newest_frame_and_drops_are_counted():
+    cap = FakeCapture(200)
+    with FrameGrabber(cap, buffer_size=2) as grabber:
+        seqs = []
+        while True:
+            frame = grabber.latest(timeout=1.0)
+            if frame is None:
+                break
+            assert frame.image[0, 0, 0] == frame.seq % 256
+            seqs.append(frame.seq)
+            time.sleep(0.01)          # processing much slower than the camera
+            grabber.done(frame)
+        stats = grabber.stats()
+    assert cap.released
+    assert seqs == sorted(set(seqs))
+    assert seqs[-1] == 200
+    assert stats["frames"] == 200
+    assert stats["read_failures"] == 1          # end of the stream
+    assert stats["delivered"] == len(seqs)
+    assert stats["dropped"] == 200 - len(seqs) > 0
+    assert stats["end_to_end_ms"]["mean"] >= stats["pickup_ms"]["mean"]
+
+
+def test_latest_waits_for_a_new_frame():
+    cap = FakeCapture(1000)
+    grabber = FrameGrabber(cap, buffer_size=3)
+    assert grabber.start()
+    try:
+        first = grabber.latest(timeout=1.0)
+        cap.gate.clear()                       # camera stalls
+        time.sleep(0.02)
+        pending = grabber.latest(timeout=0)    # at most the one read in flight
+        assert grabber.latest(timeout=0.05) is None
+        assert pending is None or pending.seq > first.seq
+        assert len(grabber.recent()) <= 3
+        cap.gate.set()
+        assert grabber.latest(timeout=1.0).seq > first.seq
+    finally:
+        cap.gate.set()
+        grabber.stop()
+    assert not grabber.running
+
+
+def test_unopened_source():
+    class Closed(FakeCapture):
+        def isOpened(self):
+            return False
+
+    assert not FrameGrabber(Closed(1)).start()
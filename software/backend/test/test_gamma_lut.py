@@ -0,0 +1,24 @@
+import numpy as np
+
+from src import rgb_to_lab as rtl
+from src.color_algorithm import skin_pixels_to_lab
+
+
+def test_uint8_lut_matches_float_path():
+    codes = np.repeat(np.arange(256, dtype=np.uint8)[:, None], 3, axis=1)
+    lut = rtl.gamma_to_linear(codes)
+    assert lut.dtype == np.float64
+    assert np.array_equal(lut, rtl.gamma_to_linear(codes.astype(np.float64)))
+
+
+def test_uint8_keeps_shape():
+    codes = np.random.default_rng(0).integers(0, 256, (4, 5, 3)).astype(np.uint8)
+    assert np.array_equal(rtl.gamma_to_linear(codes), rtl.gamma_to_linear(codes.astype(np.float64)))
+
+
+def test_skin_lab_unchanged_for_uint8_pixels():
+    rng = np.random.default_rng(1)
+    skin = rng.integers(60, 230, (500, 3)).astype(np.uint8)
+    reference = rng.uniform(30, 220, (24, 3))
+    assert np.array_equal(skin_pixels_to_lab(skin, reference),
+                          skin_pixels_to_lab(skin.astype(np.float64), reference))
@@ -0,0 +1,91 @@
+import os
+
+import cv2
+import numpy as np
+
+from src import image_io
+
+TEST_PHOTO = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          '..', 'data', 'test-photos', 'test1.png')
+
+
+def _encoded_photo():
+    with open(TEST_PHOTO, 'rb') as f:
+        return f.read()
+
+
+def test_load_image_from_bytes_matches_path():
+    from_path = image_io.load_image(TEST_PHOTO)
+    from_bytes = image_io.load_image(_encoded_photo())
+    assert from_path is not None
+    assert np.array_equal(from_path, from_bytes)
+
+
+def test_load_image_from_buffers():
+    data = _encoded_photo()
+    expected = image_io.load_image(data)
+    assert np.array_equal(image_io.load_image(bytearray(data)), expected)
+    assert np.array_equal(image_io.load_image(memoryview(data)), expected)
+    assert np.array_equal(image_io.load_image(np.frombuffer(data, np.uint8)), expected)
+
+
+def test_load_image_passes_decoded_frames_through():
+    frame = np.zeros((8, 8, 3), np.uint8)
+    assert image_io.load_image(frame) is frame
+    gray = np.zeros((8, 8), np.uint8)
+    assert image_io.load_image(gray).shape == (8, 8, 3)
+
+
+def test_load_image_rejects_garbage():
+    assert image_io.load_image(b'') is None
+    assert image_io.load_image(b'not an image') is None
+    assert image_io.load_image(None) is None
+
+
+def test_missing_path_is_a_failed_load(tmp_path):
+    missing = str(tmp_path / "missing.png")
+    assert image_io.load_image(missing) is None
+    assert image_io.load_image_for_analysis(missing) == (None, 1.0, None)
+
+
+def test_jpeg_roundtrip_in_memory():
+    frame = np.full((32, 48, 3), 128, np.uint8)
+    ok, enc = cv2.imencode('.jpg', frame)
+    assert ok
+    decoded = image_io.load_image(enc.tobytes())
+    assert decoded.shape == frame.shape
+
+
+def test_encoded_image_size_reads_headers():
+    frame = np.zeros((30, 50, 3), np.uint8)
+    for ext in ('.jpg', '.png'):
+        ok, enc = cv2.imencode(ext, frame)
+        assert image_io.encoded_image_size(enc.tobytes()) == (50, 30)
+
+
+def test_pick_reduction():
+    assert image_io.pick_reduction(4000, 1280) == 2
+    assert image_io.pick_reduction(8000, 1280) == 4
+    assert image_io.pick_reduction(1000, 1280) == 1
+    assert image_io.pick_reduction(8000, None) == 1
+
+
+def test_analysis_resolution_decode_maps_back():
+    frame = np.random.default_rng(0).integers(0, 255, (3000, 4000, 3), dtype=np.uint8)
+    ok, enc = cv2.imencode('.jpg', frame)
+    img, scale, size = image_io.load_image_for_analysis(enc.tobytes(), long_edge=1000)
+    assert size == (4000, 3000)
+    assert img.shape[:2] == (750, 1000)  # reduced 1/4 decode
+    assert scale == 0.25
+    assert image_io.to_original_box((10, 20, 30, 40), scale) == (40, 80, 120, 160)
+
+    img, scale, size = image_io.load_image_for_analysis(frame, long_edge=1000)
+    assert img.shape[:2] == (750, 1000)
+    assert size == (4000, 3000)
+
+
+def test_analysis_resolution_can_be_disabled():
+    data = _encoded_photo()
+    img, scale, _ = image_io.load_image_for_analysis(data, long_edge=None)
+    assert scale == 1.0
+    assert np.array_equal(img, image_io.load_image(data))
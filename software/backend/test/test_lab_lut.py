@@ -0,0 +1,53 @@
+import numpy as np
+
+from src import lab_lut
+from src.color_algorithm import skin_pixels_to_lab
+from src.lib import constants as const
+from src.rgb_to_lab import gamma_to_linear, linear_to_xyz, xyz_to_lab
+
+
+def exact(rgb):
+    return xyz_to_lab(linear_to_xyz(gamma_to_linear(rgb)))
+
+
+def test_exact_on_the_nodes():
+    # 18 nodes: every 15th code is a node, interpolation weights are 0
+    codes = np.arange(0, 256, 15, dtype=np.uint8)
+    rgb = np.stack(np.meshgrid(codes, codes, codes, indexing="ij"), axis=-1).reshape(-1, 3)
+    lut = lab_lut.build_lut(18)
+    assert np.allclose(lab_lut.rgb8_to_lab(rgb, lut), exact(rgb), atol=1e-4)
+
+
+def test_error_bound_and_shape():
+    rgb = np.random.default_rng(0).integers(0, 256, (20, 30, 3)).astype(np.uint8)
+    lab = lab_lut.rgb8_to_lab(rgb, lab_lut.build_lut(33))
+    assert lab.shape == rgb.shape
+    de = np.linalg.norm(lab.reshape(-1, 3) - exact(rgb.reshape(-1, 3)), axis=1)
+    assert de.max() < 0.5
+
+
+def test_cached_table_is_memory_mapped(tmp_path):
+    lut = lab_lut.lab_lut(17, cache_dir=str(tmp_path))
+    assert isinstance(lut, np.memmap)
+    assert lab_lut.lab_lut(17, cache_dir=str(tmp_path)) is lut
+    lab_lut._luts.clear()
+    again = lab_lut.lab_lut(17, cache_dir=str(tmp_path))
+    assert again is not lut and np.array_equal(again, lab_lut.build_lut(17))
+
+
+def test_lut_engine_with_lighting_correction(monkeypatch):
+    rng = np.random.default_rng(2)
+    skin = rng.integers(60, 240, (2000, 3)).astype(np.uint8)
+    reference = const.REFERENCE_GAMMA_RGB * 0.9 + 5
+    lab_lut.lab_lut()
+    # the per-photo correction goes through the shared table, no table per photo
+    monkeypatch.setattr(lab_lut, "build_lut", None)
+    de = np.linalg.norm(skin_pixels_to_lab(skin, reference, engine="lut")
+                        - skin_pixels_to_lab(skin, reference, engine="exact"), axis=1)
+    assert de.max() < 0.5
+
+
+def test_fractional_codes_match_the_uint8_lookup():
+    lut = lab_lut.build_lut(33)
+    rgb = np.random.default_rng(3).integers(0, 256, (500, 3)).astype(np.uint8)
+    assert np.allclose(lab_lut.codes_to_lab(rgb.astype(np.float32), lut), lab_lut.rgb8_to_lab(rgb, lut), atol=1e-4)
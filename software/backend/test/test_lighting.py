@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from src import lighting
+from src.lib import constants as const
+
+REF = const.REFERENCE_LINEAR_RGB
+TRUE_M = np.array([[0.80, 0.05, 0.02],
+                   [0.04, 0.70, 0.06],
+                   [0.01, 0.03, 0.55]])
+
+
+def captured(noise=0.002, seed=0):
+    rng = np.random.default_rng(seed)
+    return REF @ TRUE_M + rng.normal(0, noise, REF.shape)
+
+
+def test_plain_fit_is_the_pseudo_inverse_fit():
+    c = captured()
+    solver = lighting.LightingSolver()
+    assert np.allclose(solver.fit(c), np.linalg.pinv(REF) @ c)
+    assert np.allclose(solver.fit(c, np.ones(len(REF))), solver.fit(c))
+
+
+def test_robust_fit_ignores_glare_and_occlusion():
+    c = captured()
+    c[3] = 0.97            # glare: clipped
+    c[7] += 0.25           # glare, not clipped
+    c[12] *= 0.1           # finger over the patch
+    solver = lighting.LightingSolver()
+    matrix, weights = solver.robust_fit(c)
+    assert np.abs(matrix - TRUE_M).max() < 0.01
+    assert np.abs(solver.fit(c) - TRUE_M).max() > 0.05
+    assert weights[3] == 0 and weights[7] == 0 and weights[12] == 0
+    assert (weights[[0, 1, 2, 4, 5]] > 0.5).all()
+
+
+def test_correction_matrix_maps_back_to_reference():
+    c = captured(noise=0)
+    correction = lighting.solver_for().correction_matrix(c)
+    assert np.allclose(lighting.LightingSolver.apply(c, correction), REF, atol=1e-9)
+    pixels = np.random.default_rng(1).random((1000, 3))
+    expected = pixels @ correction
+    assert lighting.LightingSolver.apply(pixels, correction, out=pixels) is pixels
+    assert np.allclose(pixels, expected)
+
+
+def test_unusable_charts_are_rejected():
+    flat = np.tile(REF.mean(axis=1, keepdims=True), 3) * 0.5   # gray world: rank 1
+    with pytest.raises(lighting.LightingFitError):
+        lighting.solver_for().correction_matrix(flat)
+    assert lighting.correction_for(flat) is None
+    assert lighting.correction_for(np.full(REF.shape, 0.99)) is None   # all clipped
+
+
+def test_one_solver_per_reference():
+    assert lighting.solver_for() is lighting.solver_for(REF.copy())
+    assert lighting.solver_for(REF * 0.5) is not lighting.solver_for()
@@ -0,0 +1,70 @@
+import cv2
+import numpy as np
+
+from src import face_ref_scan_static as frs
+
+ROWS, COLS = 4, 6
+
+
+def _chart(cell=60, border=24):
+    """Upright synthetic chart: dark frame around 24 flat, distinct patches."""
+    rng = np.random.default_rng(7)
+    colors = rng.integers(70, 230, (ROWS * COLS, 3))
+    h, w = ROWS * cell + 2 * border, COLS * cell + 2 * border
+    chart = np.full((h, w, 3), 30, np.uint8)
+    for k, color in enumerate(colors):
+        r, c = divmod(k, COLS)
+        y, x = border + r * cell + 4, border + c * cell + 4
+        chart[y:y + cell - 8, x:x + cell - 8] = color
+    return chart, colors
+
+
+def _loop_means(warped, outer_margin, inner_margin):
+    # the original per-patch loop
+    H, W, _ = warped.shape
+    x0, x1 = int(outer_margin * W), int((1.0 - outer_margin) * W)
+    y0, y1 = int(outer_margin * H), int((1.0 - outer_margin) * H)
+    chart = warped[y0:y1, x0:x1]
+    patch_h, patch_w = chart.shape[0] // ROWS, chart.shape[1] // COLS
+    mh, mw = int(patch_h * inner_margin), int(patch_w * inner_margin)
+    return np.array([chart[r * patch_h + mh:(r + 1) * patch_h - mh,
+                           c * patch_w + mw:(c + 1) * patch_w - mw].mean(axis=(0, 1))
+                     for r in range(ROWS) for c in range(COLS)])
+
+
+def test_vectorized_stats_match_patch_loop():
+    warped = np.random.default_rng(1).integers(0, 256, (403, 611, 3), dtype=np.uint8)
+    stats = frs.macbeth_patch_stats(warped, outer_margin=0.08, inner_margin=0.05)
+    assert np.allclose(stats["means"], _loop_means(warped, 0.08, 0.05))
+    x1, y1, x2, y2 = stats["boxes"][7]
+    patch = warped[y1:y2, x1:x2].reshape(-1, 3).astype(np.float64)
+    assert stats["counts"][7] == len(patch)
+    assert np.allclose(stats["variances"][7], patch.var(axis=0))
+
+
+def test_extract_macbeth_patches_keeps_its_layout():
+    chart, colors = _chart()
+    patches = frs.extract_macbeth_patches(chart, inner_margin=0.2)
+    assert [(p["index"], p["row"], p["col"]) for p in patches[:7]] == \
+        [(1, 1, 1), (2, 1, 2), (3, 1, 3), (4, 1, 4), (5, 1, 5), (6, 1, 6), (7, 2, 1)]
+    assert np.allclose(patches[0]["mean_bgr"], colors[0], atol=2)
+
+
+def test_order_corners():
+    pts = [(90, 10), (5, 95), (100, 100), (0, 0)]
+    assert frs.order_corners(pts).tolist() == [[0, 0], [90, 10], [100, 100], [5, 95]]
+
+
+def test_perspective_chart_is_rectified():
+    chart, colors = _chart()
+    h, w = chart.shape[:2]
+    sheet = np.full((500, 700, 3), 235, np.uint8)
+    dst = np.float32([(120, 60), (590, 95), (560, 430), (90, 400)])
+    M = cv2.getPerspectiveTransform(np.float32([(0, 0), (w, 0), (w, h), (0, h)]), dst)
+    cv2.warpPerspective(chart, M, (700, 500), dst=sheet, borderMode=cv2.BORDER_TRANSPARENT)
+
+    corners = frs.locate_chart(sheet)
+    assert np.abs(corners - dst).max() < 6
+    stats = frs.macbeth_patch_stats(frs.rectify_chart(sheet, corners), inner_margin=0.2)
+    assert np.abs(stats["means"] - colors).max() < 6
+    assert stats["variances"].max() < 30
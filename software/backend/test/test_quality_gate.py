@@ -0,0 +1,68 @@
+import os
+import pickle
+
+import cv2
+import numpy as np
+import pytest
+
+from src import quality_gate as qg
+from src import face_ref_scan_static as frs
+from src import image_io
+
+PHOTO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'test-photos')
+
+
+def _photo(name='test1.png'):
+    img, _, size = image_io.load_image_for_analysis(os.path.join(PHOTO_DIR, name))
+    return img, size
+
+
+def test_good_photos_pass():
+    for name in ('test1.png', 'test3.png', 'test4.png'):
+        result = qg.assess(*_photo(name))
+        assert result["ok"], (name, result)
+
+
+def test_dark_photo_is_underexposed():
+    assert qg.assess(*_photo('test2.png'))["reasons"] == [qg.UNDEREXPOSED]
+
+
+def test_degraded_photos_get_reason_codes():
+    img, size = _photo()
+    assert qg.assess(cv2.GaussianBlur(img, (0, 0), 5), size)["reasons"] == [qg.BLURRY]
+    assert qg.assess((img * 0.25).astype(np.uint8), size)["reasons"] == [qg.UNDEREXPOSED]
+    assert qg.assess(cv2.convertScaleAbs(img, alpha=2.5), size)["reasons"] == [qg.OVEREXPOSED]
+    assert qg.assess(img, (320, 240))["reasons"] == [qg.TOO_SMALL]
+    assert qg.assess(None)["reasons"] == [qg.UNREADABLE]
+
+
+def test_tiny_encoded_photo_rejected_from_header():
+    ok, enc = cv2.imencode('.jpg', np.full((240, 320, 3), 128, np.uint8))
+    with pytest.raises(qg.ImageRejected) as info:
+        qg.require_encoded_size(enc.tobytes())
+    assert info.value.reasons == [qg.TOO_SMALL]
+    assert info.value.metrics == {"source_size": [320, 240]}
+    ok, enc = cv2.imencode('.jpg', np.full((480, 640, 3), 128, np.uint8))
+    qg.require_encoded_size(enc.tobytes())
+
+
+def test_analyze_image_checks_header_before_decoding():
+    # a bare PNG header: only the header check can reject it, it does not decode
+    header = image_io.PNG_MAGIC + (13).to_bytes(4, "big") + b"IHDR" + (320).to_bytes(4, "big") + (240).to_bytes(4, "big")
+    with pytest.raises(qg.ImageRejected) as info:
+        frs.analyze_image(header)
+    assert info.value.reasons == [qg.TOO_SMALL]
+
+
+def test_rejection_survives_process_boundary():
+    e = pickle.loads(pickle.dumps(qg.ImageRejected([qg.BLURRY], {"sharpness": 0.01})))
+    assert isinstance(e, ValueError)
+    assert e.reasons == [qg.BLURRY] and e.metrics == {"sharpness": 0.01}
+    assert str(e) == "Image rejected: blurry"
+
+
+def test_analyze_image_rejects_before_detection():
+    img, _ = _photo()
+    with pytest.raises(qg.ImageRejected) as info:
+        frs.analyze_image(cv2.GaussianBlur(img, (0, 0), 6))
+    assert info.value.reasons == [qg.BLURRY]
@@ -0,0 +1,137 @@
+import threading
+import time
+
+import pytest
+
+from src.result_cache import ResultCache, content_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_content_key_depends_on_bytes_and_versions():
+    assert content_key(b'abc', 1, 1) == content_key(bytearray(b'abc'), 1, 1)
+    assert content_key(b'abc', 1, 1) != content_key(b'abd', 1, 1)
+    assert content_key(b'abc', 1, 1) != content_key(b'abc', 2, 1)
+
+
+def test_hits_misses_and_lru_eviction():
+    cache = ResultCache(max_entries=2)
+    assert cache.get_or_compute('a', lambda: 1) == 1
+    assert cache.get_or_compute('a', lambda: 99) == 1
+    cache.get_or_compute('b', lambda: 2)
+    cache.get_or_compute('a', lambda: 99)      # refresh a
+    cache.get_or_compute('c', lambda: 3)       # evicts b
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    stats = cache.stats()
+    assert stats['evictions'] == 1
+    assert stats['hits'] == 3
+    assert stats['misses'] == 4
+
+
+def test_entries_expire():
+    clock = FakeClock()
+    cache = ResultCache(ttl_s=10.0, clock=clock)
+    cache.put('k', 'v')
+    clock.now = 9.9
+    assert cache.get('k') == 'v'
+    clock.now = 10.0
+    assert cache.get('k') is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_uncacheable_results_and_errors_are_not_stored():
+    cache = ResultCache()
+    assert cache.get_or_compute('k', lambda: 'partial', cacheable=lambda r: False) == 'partial'
+    assert cache.get('k') is None
+
+    def boom():
+        raise ValueError("No skin pixels detected")
+
+    with pytest.raises(ValueError):
+        cache.get_or_compute('k', boom)
+    assert cache.get_or_compute('k', lambda: 'ok') == 'ok'
+
+
+def test_concurrent_identical_requests_are_coalesced():
+    cache = ResultCache()
+    calls = []
+    started = threading.Event()
+
+    def slow():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return 'hex'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(cache.get_or_compute('k', slow)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(cache.get_or_compute('k', slow)))
+                 for _ in range(4)]
+    for t in followers:
+        t.start()
+    for t in [leader] + followers:
+        t.join()
+
+    assert results == ['hex'] * 5
+    assert len(calls) == 1
+    assert cache.stats()['coalesced'] == 4
+
+
+def test_only_callers_of_the_same_group_are_coalesced():
+    cache = ResultCache()
+    started = threading.Event()
+    release = threading.Event()
+
+    def degraded():
+        started.set()
+        release.wait()
+        return 'degraded'
+
+    results = {}
+    leader = threading.Thread(target=lambda: results.update(budget=cache.get_or_compute(
+        'k', degraded, cacheable=lambda r: r != 'degraded', group=300.0)))
+    leader.start()
+    started.wait()
+    # an unbudgeted caller does not join the budgeted run, it computes its own
+    results['full'] = cache.get_or_compute('k', lambda: 'full')
+    release.set()
+    leader.join()
+
+    assert results == {'budget': 'degraded', 'full': 'full'}
+    assert cache.stats()['coalesced'] == 0
+    assert cache.get('k') == 'full'
+
+
+def test_failing_cacheable_releases_the_followers():
+    cache = ResultCache()
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        time.sleep(0.2)
+        return 'hex'
+
+    def broken(result):
+        raise KeyError('degraded')
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(cache.get_or_compute('k', slow, cacheable=broken)))
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=lambda: results.append(cache.get_or_compute('k', slow)))
+    follower.start()
+    leader.join(5)
+    follower.join(5)
+
+    assert not follower.is_alive()
+    assert results == ['hex', 'hex']
+    assert cache.get('k') is None   # treated as not cacheable
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from src import robust_stats as rs
+
+
+@pytest.mark.parametrize("n", [1, 2, 7, 100, 1001])
+def test_percentile_matches_numpy(n):
+    rng = np.random.default_rng(n)
+    floats = rng.normal(size=n)
+    codes = rng.integers(0, 256, n).astype(np.uint8)
+    for q in (0, 5, 50, 95, 100):
+        assert rs.percentile(floats, q) == pytest.approx(np.percentile(floats, q))
+        assert rs.percentile(codes, q) == pytest.approx(np.percentile(codes, q))
+
+
+def test_column_median_matches_numpy():
+    values = np.random.default_rng(0).normal(size=(999, 3))
+    assert np.allclose(rs.column_median(values), np.median(values, axis=0))
+    assert np.allclose(rs.column_median(values[:998]), np.median(values[:998], axis=0))
+
+
+def test_trimmed_mean_drops_the_tails():
+    values = np.random.default_rng(1).normal(size=(200, 3))
+    values[:5] = 1e6  # outliers
+    cut = int(0.1 * 200)
+    expected = np.sort(values, axis=0)[cut:200 - cut].mean(axis=0)
+    assert np.allclose(rs.column_trimmed_mean(values, 0.1), expected)
+    assert np.allclose(rs.column_trimmed_mean(values[:3], 0.1), values[:3].mean(axis=0))
+    with pytest.raises(ValueError):
+        rs.column_trimmed_mean(values[:2], 0.5)
+
+
+def test_luminance_cutoff_matches_percentile_filter():
+    rgb = np.random.default_rng(2).integers(0, 256, (5000, 3)).astype(np.uint8)
+    lum = 0.2126 * rgb[:, 0] + 0.7152 * rgb[:, 1] + 0.0722 * rgb[:, 2]
+    assert np.array_equal(rs.below_luminance_percentile(rgb, 95), lum <= np.percentile(lum, 95))
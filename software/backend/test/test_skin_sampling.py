@@ -0,0 +1,37 @@
+import numpy as np
+
+from src import face_ref_scan_static as frs
+
+
+def _face():
+    rng = np.random.default_rng(3)
+    return rng.integers(0, 256, (157, 131, 3), dtype=np.uint8)
+
+
+def test_region_stats_match_direct_reductions():
+    face = _face()
+    stats = frs.skin_region_stats(face)
+    for k, (x1, y1, x2, y2) in enumerate(frs.skin_region_boxes(face.shape)):
+        region = face[y1:y2, x1:x2, ::-1].reshape(-1, 3).astype(np.float64)
+        assert stats["counts"][k] == region.shape[0]
+        assert np.allclose(stats["means"][k], region.mean(axis=0))
+        assert np.allclose(stats["variances"][k], region.var(axis=0))
+
+
+def test_dense_sampling_returns_every_region_pixel():
+    face = _face()
+    dense = frs.sample_skin_regions(face, mode="dense")
+    stats = frs.skin_region_stats(face)
+    assert dense.shape == (stats["counts"].sum(), 3)
+    assert np.allclose(dense.mean(axis=0),
+                       (stats["means"] * stats["counts"][:, None]).sum(axis=0) / stats["counts"].sum())
+
+
+def test_point_sampling_is_unchanged():
+    face = _face()
+    points = frs.sample_skin_regions(face, mode="points")
+    assert points.shape == (10, 3)
+    # forehead, first sample: centre column, quarter height of the region
+    x1, y1, x2, y2 = frs.skin_region_boxes(face.shape)[0]
+    cy, cx = int(0.5 * (y2 - y1) / 2), int((x2 - x1) / 2)
+    assert np.array_equal(points[0], face[y1 + cy, x1 + cx, ::-1])
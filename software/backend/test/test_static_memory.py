@@ -0,0 +1,37 @@
+import contextlib
+import io
+import os
+import tracemalloc
+
+import cv2
+
+from src import face_detector
+from src import face_ref_scan_static as frs
+
+TEST_PHOTO = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          '..', 'data', 'test-photos', 'test1.png')
+
+# Peak Python/numpy allocation allowed while analysing a frame, as a multiple of
+# the frame's own size. The grayscale / threshold / mask buffers are a third of
+# the frame each; full-frame copies were what pushed this past 4x.
+PEAK_FRAME_MULTIPLE = 2.5
+
+
+def test_static_pipeline_peak_allocation_on_24mp_frame():
+    photo = cv2.imread(TEST_PHOTO)
+    # upscaled to ~24 MP keeping the aspect ratio: a stretched chart is not a chart
+    scale = (24e6 / (photo.shape[0] * photo.shape[1])) ** 0.5
+    frame = cv2.resize(photo, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+    face_detector.warmup()
+
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            skin, reference = frs.analyze_frame(frame)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert skin is not None and reference is not None
+    assert peak <= PEAK_FRAME_MULTIPLE * frame.nbytes, \
+        "peak %.2fx frame size" % (peak / frame.nbytes)